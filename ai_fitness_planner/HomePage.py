@@ -1,7 +1,7 @@
 import streamlit as st
 import os
 from PIL import Image
-from backend.database import create_table
+from backend import app_cache, metrics
 
 # ✅ MUST BE FIRST STREAMLIT COMMAND
 st.set_page_config(
@@ -10,7 +10,11 @@ st.set_page_config(
     layout="centered"
 )
 
-create_table()
+# Rerun timing (see backend/metrics.py)
+metrics.begin_page_run("HomePage")
+
+# Schema + DB pool + calorie model, loaded once per process
+app_cache.warm_resources()
 
 # ✅ Load Logo
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -45,4 +49,6 @@ st.write("""
 - Progress tracking dashboard  
 """)
 
-st.success("🚀 Internship-Ready AI Project")
\ No newline at end of file
+st.success("🚀 Internship-Ready AI Project")
+
+metrics.end_page_run()
@@ -0,0 +1,158 @@
+"""
+Streamlit caching layer shared by the pages.
+
+Process-wide objects (LLM client, calorie model, DB pool) are held with
+st.cache_resource. Values derived from the profile (plans, ML estimate,
+macro table) are held with st.cache_data, keyed on the profile fields, so
+widget interactions and repeat visits do not redo backend work.
+New details are new cache keys, so the shared caches are never cleared;
+invalidate_profile() only resets the session's own derived state.
+"""
+import functools
+import threading
+from collections import Counter
+
+import streamlit as st
+
+from backend import database, llm_service, metrics, ml_model, pdf_service
+from backend.diet_logic import diet_plan
+from backend.meal_solver import solve_meal_plan
+from backend.workout_logic import workout_plan
+
+MAX_ENTRIES = 1024
+
+
+# -------------------------------------------------
+# RESOURCES
+@st.cache_resource(show_spinner=False)
+def llm_client():
+    return llm_service.get_client()
+
+
+@st.cache_resource(show_spinner=False)
+def calorie_model():
+    return ml_model.get_model()
+
+
+@st.cache_resource(show_spinner=False)
+def db_pool():
+    return database.get_pool()
+
+
+@st.cache_resource(show_spinner=False)
+def pdf_pool():
+    # Render processes start in the background; the first download skips their startup
+    pdf_service.warm_pool()
+    return pdf_service.get_render_pool()
+
+
+def warm_resources():
+    """Loads the model, DB pool and PDF processes once per process, before any page needs them."""
+    calorie_model()
+    db_pool()
+    pdf_pool()
+
+
+# -------------------------------------------------
+# HIT-RATE TRACKING
+_lookups = Counter()
+_misses = Counter()
+_stats_lock = threading.Lock()
+
+
+def _tracked_cache_data(name):
+    """st.cache_data that also counts lookups and misses for `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def compute(*args):
+            # Only runs on a cache miss
+            with _stats_lock:
+                _misses[name] += 1
+            metrics.increment("app_cache_misses_total", cache=name)
+            return fn(*args)
+
+        cached = st.cache_data(max_entries=MAX_ENTRIES, show_spinner=False)(compute)
+
+        @functools.wraps(fn)
+        def lookup(*args):
+            with _stats_lock:
+                _lookups[name] += 1
+            metrics.increment("app_cache_lookups_total", cache=name)
+            return cached(*args)
+
+        lookup.clear = cached.clear
+        return lookup
+    return decorator
+
+
+def cache_hit_rates():
+    with _stats_lock:
+        return {
+            name: {
+                "lookups": lookups,
+                "misses": _misses[name],
+                "hit_rate": round(1 - _misses[name] / lookups, 3) if lookups else 0.0
+            }
+            for name, lookups in _lookups.items()
+        }
+
+
+# -------------------------------------------------
+# DERIVED DATA (KEYED ON PROFILE FIELDS)
+@_tracked_cache_data("workout_plan")
+def workout_plan_for(goal, bmi):
+    return workout_plan(goal, bmi)
+
+
+@_tracked_cache_data("diet_plan")
+def diet_plan_for(goal, calories, diet):
+    return diet_plan(goal, calories, diet)
+
+
+@_tracked_cache_data("meal_plan")
+def meal_plan_for(calories, diet):
+    return solve_meal_plan(calories, diet)
+
+
+@_tracked_cache_data("ml_calories")
+def ml_calories_for(age, weight, height, activity_factor):
+    return int(calorie_model().predict_one(age, weight, height, activity_factor))
+
+
+@_tracked_cache_data("macro_table")
+def macro_table_for(calories):
+    import pandas as pd
+
+    return pd.DataFrame({
+        "Macronutrient": ["Protein", "Carbs", "Fats"],
+        "Calories": [
+            calories * 0.30,
+            calories * 0.45,
+            calories * 0.25
+        ]
+    })
+
+
+# -------------------------------------------------
+# INVALIDATION
+PROFILE_FIELDS = ["age", "gender", "height", "weight", "activity", "goal", "diet"]
+
+# Session keys that hold results computed from the previous profile
+SESSION_DERIVED_KEYS = [
+    "active_workout_plan_id", "plan_source", "progress_rows", "workout_job", "diet_job"
+]
+
+
+def profile_changed(old, new):
+    return any(old.get(field) != new.get(field) for field in PROFILE_FIELDS)
+
+
+def invalidate_profile(session_state):
+    """Drops this session's results derived from the previous profile; shared caches stay valid."""
+    for key in SESSION_DERIVED_KEYS:
+        session_state.pop(key, None)
+
+    session_state["diet_active_plan_id"] = None
+    session_state["diet_plan_source"] = None
+
+    metrics.increment("app_cache_invalidations_total")
@@ -0,0 +1,242 @@
+"""
+Headless plan generation for a whole cohort (e.g. a gym onboarding its members).
+
+    python -m backend.bulk_planner members.csv -o plans.jsonl
+    python -m backend.bulk_planner members.parquet -o plans.jsonl --ai --ai-workers 4
+
+The cohort is read in chunks; each chunk is scored with vectorized numpy,
+its progress rows are written in one transaction and its plans are streamed
+to the output as JSON Lines, so memory stays bounded by the chunk size.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+
+from backend.calculations import (
+    activity_factor_array,
+    calculate_bmi_array,
+    calculate_bmr_array,
+    calculate_daily_calories_array,
+)
+from backend.database import insert_progress_many
+from backend.diet_logic import diet_plan
+from backend.ml_model import predict_calories_batch
+from backend.workout_logic import workout_plan
+
+REQUIRED_COLUMNS = ["age", "gender", "height", "weight", "activity", "goal", "diet"]
+DEFAULT_CHUNK_SIZE = 5000
+
+
+# -------------------------------------------------
+# INPUT
+def read_cohort(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the cohort as DataFrames of at most chunk_size rows."""
+    import pandas as pd
+
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet cohorts requires pyarrow.")
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+# -------------------------------------------------
+# VECTORIZED METRICS
+def _calculate_metrics(chunk):
+    bmi = calculate_bmi_array(chunk["weight"], chunk["height"])
+
+    # Rows with an invalid BMI are rejected, so their other metrics are blanked too
+    bmr = calculate_bmr_array(chunk["gender"], chunk["weight"], chunk["height"], chunk["age"])
+    bmr = np.where(np.isnan(bmi), np.nan, bmr)
+
+    factor = activity_factor_array(chunk["activity"])
+
+    return {
+        "bmi": bmi,
+        "bmr": bmr,
+        "calories": calculate_daily_calories_array(bmr, chunk["activity"]),
+        "ml_calories": predict_calories_batch({
+            "age": chunk["age"], "weight": chunk["weight"],
+            "height": chunk["height"], "activity": factor
+        }),
+    }
+
+
+def _as_int(values):
+    return [None if np.isnan(v) else int(v) for v in values]
+
+
+def _as_float(values):
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+# -------------------------------------------------
+# PLANS
+def build_plans(chunk, start_index=0, cohort=None):
+    """Returns one plan record per row of the chunk."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Cohort is missing columns: {', '.join(missing)}")
+
+    metrics = _calculate_metrics(chunk)
+
+    if "user_id" in chunk.columns:
+        user_ids = chunk["user_id"].astype(str).tolist()
+    else:
+        prefix = cohort or uuid.uuid4().hex[:8]
+        user_ids = [f"{prefix}-{start_index + i}" for i in range(len(chunk))]
+
+    profiles = chunk[REQUIRED_COLUMNS].to_dict("records")
+    bmis = _as_float(metrics["bmi"])
+    bmrs = _as_float(metrics["bmr"])
+    calories = _as_int(metrics["calories"])
+    ml_calories = _as_int(metrics["ml_calories"])
+
+    # Rule engines are called once per distinct input, not once per row
+    workouts = {}
+    diets = {}
+
+    records = []
+    for i, profile in enumerate(profiles):
+        record = {"user_id": user_ids[i], **profile}
+
+        if bmis[i] is None:
+            record["error"] = "Invalid height or weight"
+            records.append(record)
+            continue
+
+        workout_key = (profile["goal"], bmis[i])
+        if workout_key not in workouts:
+            workouts[workout_key] = workout_plan(*workout_key)
+
+        diet_key = (profile["goal"], calories[i], profile["diet"])
+        if diet_key not in diets:
+            diets[diet_key] = diet_plan(*diet_key)
+
+        record.update({
+            "bmi": bmis[i],
+            "bmr": bmrs[i],
+            "calories": calories[i],
+            "ml_calories": ml_calories[i],
+            "workout_plan": workouts[workout_key],
+            "diet_plan": diets[diet_key],
+        })
+        records.append(record)
+
+    return records
+
+
+def _progress_rows(records, today):
+    return [
+        (r["user_id"], r["age"], r["gender"], r["height"], r["weight"],
+         r["goal"], r["calories"], today)
+        for r in records if "error" not in r
+    ]
+
+
+def _add_ai_plans(record):
+    from backend.plan_buckets import generate_plan
+
+    if "error" in record:
+        return record
+
+    try:
+        # Profiles in the same bucket share one stored plan
+        record["ai_workout_plan"] = generate_plan("workout", record, record["bmi"])
+        record["ai_diet_plan"] = generate_plan(
+            "diet", record, record["bmi"], record["diet_plan"]["Calories"]
+        )
+    except Exception as exc:
+        record["ai_error"] = str(exc)
+
+    return record
+
+
+# -------------------------------------------------
+# DRIVER
+def run_bulk(path, output, chunk_size=DEFAULT_CHUNK_SIZE, write_progress=True,
+             ai=False, ai_workers=4, cohort=None, log=sys.stderr):
+    """
+    Streams plans for every row of the cohort file to `output` (a text file
+    object) and returns throughput stats.
+    """
+    today = date.today().isoformat()
+    cohort = cohort or os.path.splitext(os.path.basename(path))[0]
+
+    stats = {"rows": 0, "failed": 0, "ai_failed": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    # AI calls additionally pass through the process-wide LLM dispatcher
+    pool = ThreadPoolExecutor(max_workers=ai_workers) if ai else None
+
+    try:
+        for chunk in read_cohort(path, chunk_size):
+            records = build_plans(chunk, start_index=stats["rows"], cohort=cohort)
+
+            if write_progress:
+                insert_progress_many(_progress_rows(records, today))
+
+            if pool is not None:
+                records = list(pool.map(_add_ai_plans, records))
+
+            for record in records:
+                output.write(json.dumps(record) + "\n")
+
+            stats["rows"] += len(records)
+            stats["failed"] += sum(1 for r in records if "error" in r)
+            stats["ai_failed"] += sum(1 for r in records if "ai_error" in r)
+
+            elapsed = time.perf_counter() - start
+            if log is not None:
+                log.write(f"{stats['rows']} rows, {stats['rows'] / elapsed:.0f} rows/sec\n")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate plans for a cohort file")
+    parser.add_argument("cohort", help="CSV or Parquet file with one member per row")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output ('-' for stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-db", action="store_true", help="do not record progress rows")
+    parser.add_argument("--ai", action="store_true", help="also generate AI plans")
+    parser.add_argument("--ai-workers", type=int, default=4)
+    parser.add_argument("--cohort-name", help="prefix for generated user ids")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        stats = run_bulk(
+            args.cohort, output,
+            chunk_size=args.chunk_size,
+            write_progress=not args.no_db,
+            ai=args.ai,
+            ai_workers=args.ai_workers,
+            cohort=args.cohort_name
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,15 @@
 #         return 10 * weight + 6.25 * height - 5 * age - 161
 
 # backend/calculations.py
+import numpy as np
+
+ACTIVITY_FACTORS = {
+    "Sedentary": 1.2,
+    "Lightly Active": 1.375,
+    "Moderately Active": 1.55,
+    "Very Active": 1.725
+}
+
 
 def calculate_bmi(weight, height):
     if height is None or height <= 0:
@@ -39,11 +48,66 @@ def calculate_bmr(gender, weight, height, age):
 
 
 def calculate_daily_calories(bmr, activity):
-    activity_factor = {
-        "Sedentary": 1.2,
-        "Lightly Active": 1.375,
-        "Moderately Active": 1.55,
-        "Very Active": 1.725
-    }
-
-    return int(bmr * activity_factor.get(activity, 1.2))
+    return int(bmr * ACTIVITY_FACTORS.get(activity, 1.2))
+
+
+def bmi_category(bmi):
+    if bmi < 18.5:
+        return "Underweight"
+    elif bmi < 25:
+        return "Normal"
+    elif bmi < 30:
+        return "Overweight"
+    else:
+        return "Obese"
+
+
+# -------------------------------------------------
+# ARRAY VARIANTS (numpy arrays or pandas Series in, numpy arrays out)
+# Invalid rows become NaN instead of None.
+def calculate_bmi_array(weight, height):
+    weight = np.asarray(weight, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+
+    valid = (height > 0) & (weight > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.round(weight / (height / 100) ** 2, 2)
+
+    return np.where(valid, bmi, np.nan)
+
+
+def _lookup(values, table, default):
+    # Categorical data already carries codes: map each category once
+    categorical = getattr(values, "cat", None)
+    if categorical is not None:
+        # Extra trailing slot catches the -1 code pandas uses for missing values
+        mapped = np.array([table.get(c, default) for c in categorical.categories] + [default])
+        return mapped[categorical.codes.to_numpy()]
+
+    # Otherwise one vectorized equality mask per known level
+    values = np.asarray(values)
+    result = np.full(values.shape, default, dtype=np.float64)
+    for level, value in table.items():
+        result[values == level] = value
+    return result
+
+
+def calculate_bmr_array(gender, weight, height, age):
+    weight = np.asarray(weight, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+    age = np.asarray(age, dtype=np.float64)
+
+    offset = _lookup(gender, {"Male": 5.0}, -161.0)
+    return 10 * weight + 6.25 * height - 5 * age + offset
+
+
+def activity_factor_array(activity):
+    return _lookup(activity, ACTIVITY_FACTORS, 1.2)
+
+
+def calculate_daily_calories_array(bmr, activity):
+    bmr = np.asarray(bmr, dtype=np.float64)
+    factor = activity_factor_array(activity)
+
+    # Truncates like int(); NaN BMRs stay NaN
+    return np.trunc(bmr * factor)
@@ -0,0 +1,231 @@
+"""
+Exercise and food catalog behind the rule-based workout and diet planners.
+
+Records are plain namedtuples. The indexes below are built once at import
+into dicts of tuples keyed by the fields the planners filter on, so
+assembling a plan is a few dict lookups.
+"""
+from collections import namedtuple
+
+from backend.calculations import bmi_category
+
+Exercise = namedtuple("Exercise", "name group equipment intensity impact kcal dose")
+# kcal / macros (g) are per serving
+Food = namedtuple("Food", "name meals role kcal protein carbs fat diets")
+
+# Each level includes everything available at the levels before it
+EQUIPMENT_LEVELS = ("none", "home", "gym")
+DEFAULT_EQUIPMENT = "home"
+
+INTENSITY_LEVELS = ("low", "moderate", "high")
+BMI_BANDS = ("Underweight", "Normal", "Overweight", "Obese")
+
+# (highest intensity, highest impact) allowed per BMI band
+BAND_LIMITS = {
+    "Underweight": ("moderate", "high"),
+    "Normal": ("high", "high"),
+    "Overweight": ("high", "low"),
+    "Obese": ("moderate", "low"),
+}
+
+GROUPS = ("cardio", "legs", "chest", "back", "shoulders", "core", "full_body", "mobility")
+
+MEAL_SLOTS = ("Breakfast", "Lunch", "Dinner")
+DIETS = ("Vegetarian", "Non-Vegetarian")
+
+VEG = ("Vegetarian", "Non-Vegetarian")
+NON_VEG = ("Non-Vegetarian",)
+
+
+# -------------------------------------------------
+# EXERCISES
+EXERCISES = (
+    Exercise("Brisk walk", "cardio", "none", "low", "low", 150, "30 min"),
+    Exercise("Low-impact aerobics", "cardio", "none", "low", "low", 180, "30 min"),
+    Exercise("Jogging", "cardio", "none", "moderate", "high", 300, "25 min"),
+    Exercise("Stair climbing", "cardio", "none", "moderate", "high", 220, "15 min"),
+    Exercise("HIIT intervals", "cardio", "none", "high", "high", 320, "20 min"),
+    Exercise("Jump rope", "cardio", "home", "high", "high", 300, "10 × 1 min"),
+    Exercise("Stationary cycling", "cardio", "gym", "moderate", "low", 250, "30 min"),
+    Exercise("Rowing machine", "cardio", "gym", "moderate", "low", 260, "20 min"),
+    Exercise("Swimming", "cardio", "gym", "moderate", "low", 280, "30 min"),
+
+    Exercise("Bodyweight squats", "legs", "none", "moderate", "low", 80, "3 × 15"),
+    Exercise("Glute bridges", "legs", "none", "low", "low", 50, "3 × 15"),
+    Exercise("Step-ups", "legs", "none", "low", "low", 70, "3 × 12 each leg"),
+    Exercise("Walking lunges", "legs", "none", "moderate", "low", 80, "3 × 12 each leg"),
+    Exercise("Jump squats", "legs", "none", "high", "high", 100, "3 × 12"),
+    Exercise("Goblet squats", "legs", "home", "moderate", "low", 90, "3 × 12"),
+    Exercise("Romanian deadlifts", "legs", "home", "moderate", "low", 90, "3 × 10"),
+    Exercise("Leg press", "legs", "gym", "moderate", "low", 90, "4 × 10"),
+    Exercise("Barbell back squats", "legs", "gym", "high", "low", 120, "4 × 8"),
+
+    Exercise("Push-ups", "chest", "none", "moderate", "low", 60, "3 × 12"),
+    Exercise("Incline push-ups", "chest", "none", "low", "low", 40, "3 × 12"),
+    Exercise("Dumbbell bench press", "chest", "home", "moderate", "low", 80, "4 × 10"),
+    Exercise("Machine chest fly", "chest", "gym", "low", "low", 60, "3 × 12"),
+    Exercise("Barbell bench press", "chest", "gym", "high", "low", 100, "4 × 8"),
+
+    Exercise("Superman holds", "back", "none", "low", "low", 40, "3 × 30 s"),
+    Exercise("Resistance band rows", "back", "home", "low", "low", 50, "3 × 15"),
+    Exercise("Dumbbell rows", "back", "home", "moderate", "low", 70, "4 × 10"),
+    Exercise("Lat pulldown", "back", "gym", "moderate", "low", 70, "4 × 10"),
+    Exercise("Pull-ups", "back", "gym", "high", "low", 90, "4 × 6–8"),
+    Exercise("Deadlifts", "back", "gym", "high", "low", 130, "4 × 6"),
+
+    Exercise("Pike push-ups", "shoulders", "none", "moderate", "low", 50, "3 × 10"),
+    Exercise("Band pull-aparts", "shoulders", "home", "low", "low", 30, "3 × 20"),
+    Exercise("Lateral raises", "shoulders", "home", "low", "low", 40, "3 × 15"),
+    Exercise("Dumbbell shoulder press", "shoulders", "home", "moderate", "low", 60, "4 × 10"),
+    Exercise("Overhead barbell press", "shoulders", "gym", "high", "low", 80, "4 × 8"),
+
+    Exercise("Plank", "core", "none", "low", "low", 30, "3 × 45 s"),
+    Exercise("Dead bugs", "core", "none", "low", "low", 30, "3 × 12"),
+    Exercise("Bicycle crunches", "core", "none", "moderate", "low", 50, "3 × 20"),
+    Exercise("Russian twists", "core", "none", "moderate", "low", 40, "3 × 20"),
+    Exercise("Mountain climbers", "core", "none", "high", "high", 90, "3 × 40 s"),
+    Exercise("Hanging knee raises", "core", "gym", "moderate", "low", 50, "3 × 12"),
+
+    Exercise("Bodyweight circuit (squat, push-up, row)", "full_body", "none", "moderate", "low", 150, "3 rounds"),
+    Exercise("Burpees", "full_body", "none", "high", "high", 120, "4 × 10"),
+    Exercise("Light resistance training", "full_body", "home", "low", "low", 120, "30 min"),
+    Exercise("Dumbbell thrusters", "full_body", "home", "moderate", "low", 100, "3 × 12"),
+    Exercise("Kettlebell swings", "full_body", "home", "high", "low", 110, "4 × 15"),
+    Exercise("Machine circuit", "full_body", "gym", "moderate", "low", 180, "30 min"),
+
+    Exercise("Yoga flow", "mobility", "none", "low", "low", 120, "30 min"),
+    Exercise("Full-body stretching", "mobility", "none", "low", "low", 60, "15 min"),
+    Exercise("Pilates mat work", "mobility", "none", "low", "low", 150, "30 min"),
+    Exercise("Tai chi", "mobility", "none", "low", "low", 100, "30 min"),
+    Exercise("Foam rolling", "mobility", "home", "low", "low", 40, "10 min"),
+)
+
+
+# -------------------------------------------------
+# FOODS
+FOODS = (
+    Food("Oats & fruits", ("Breakfast",), "base", 300, 9, 55, 6, VEG),
+    Food("Poha with peanuts", ("Breakfast",), "base", 270, 6, 45, 8, VEG),
+    Food("Whole-wheat toast & banana", ("Breakfast",), "base", 280, 9, 52, 4, VEG),
+    Food("Vegetable upma", ("Breakfast",), "base", 250, 6, 40, 7, VEG),
+    Food("Idli & sambar", ("Breakfast", "Dinner"), "base", 280, 10, 52, 3, VEG),
+    Food("Rice/Roti", ("Lunch", "Dinner"), "base", 340, 8, 70, 3, VEG),
+    Food("Brown rice & vegetables", ("Lunch", "Dinner"), "base", 320, 7, 62, 4, VEG),
+    Food("Quinoa bowl", ("Lunch", "Dinner"), "base", 300, 11, 52, 5, VEG),
+    Food("Millet roti & sabzi", ("Lunch", "Dinner"), "base", 310, 8, 50, 8, VEG),
+    Food("Whole-wheat pasta & vegetables", ("Lunch", "Dinner"), "base", 360, 12, 65, 5, VEG),
+    Food("Salad", ("Lunch", "Dinner"), "base", 120, 4, 15, 5, VEG),
+    Food("Vegetable soup", ("Dinner",), "base", 110, 4, 18, 2, VEG),
+
+    Food("Paneer", ("Lunch", "Dinner"), "protein", 265, 18, 4, 20, VEG),
+    Food("Dal", ("Lunch", "Dinner"), "protein", 180, 12, 30, 1, VEG),
+    Food("Tofu", ("Lunch", "Dinner"), "protein", 145, 16, 3, 8, VEG),
+    Food("Greek yogurt", ("Breakfast",), "protein", 130, 15, 8, 4, VEG),
+    Food("Chickpeas", ("Lunch", "Dinner"), "protein", 210, 11, 35, 3, VEG),
+    Food("Rajma", ("Lunch", "Dinner"), "protein", 200, 12, 34, 1, VEG),
+    Food("Sprouts", ("Breakfast", "Lunch"), "protein", 100, 8, 15, 1, VEG),
+    Food("Milk", ("Breakfast",), "protein", 150, 8, 12, 8, VEG),
+
+    Food("Eggs", ("Breakfast", "Dinner"), "protein", 155, 13, 1, 11, NON_VEG),
+    Food("Chicken", ("Lunch", "Dinner"), "protein", 190, 36, 0, 4, NON_VEG),
+    Food("Fish", ("Lunch", "Dinner"), "protein", 180, 30, 0, 6, NON_VEG),
+    Food("Egg whites", ("Breakfast",), "protein", 70, 14, 1, 0, NON_VEG),
+    Food("Prawns", ("Lunch", "Dinner"), "protein", 120, 24, 1, 2, NON_VEG),
+    Food("Tuna", ("Lunch",), "protein", 130, 28, 0, 1, NON_VEG),
+
+    # Snacks are never placed in a meal slot; the meal solver adds them to close macro gaps
+    Food("Almonds", ("Snack",), "snack", 170, 6, 6, 15, VEG),
+    Food("Peanut butter toast", ("Snack",), "snack", 250, 9, 24, 14, VEG),
+    Food("Roasted chana", ("Snack",), "snack", 120, 7, 20, 2, VEG),
+    Food("Banana", ("Snack",), "snack", 105, 1, 27, 0, VEG),
+    Food("Fruit bowl", ("Snack",), "snack", 120, 2, 30, 0, VEG),
+    Food("Whey shake", ("Snack",), "snack", 120, 24, 3, 1, VEG),
+    Food("Ghee (1 tbsp)", ("Snack",), "snack", 120, 0, 0, 14, VEG),
+    Food("Soya chunks", ("Snack",), "snack", 170, 26, 17, 1, VEG),
+    Food("Hung curd", ("Snack",), "snack", 120, 12, 6, 5, VEG),
+    Food("Boiled eggs", ("Snack",), "snack", 155, 13, 1, 11, NON_VEG),
+)
+
+
+# -------------------------------------------------
+# INDEXES
+def _allowed(exercise, band, equipment):
+    max_intensity, max_impact = BAND_LIMITS[band]
+    return (
+        EQUIPMENT_LEVELS.index(exercise.equipment) <= EQUIPMENT_LEVELS.index(equipment)
+        and INTENSITY_LEVELS.index(exercise.intensity) <= INTENSITY_LEVELS.index(max_intensity)
+        and (exercise.impact == "low" or max_impact == "high")
+    )
+
+
+def _build_exercise_index():
+    index = {}
+    for group in GROUPS:
+        for band in BMI_BANDS:
+            for equipment in EQUIPMENT_LEVELS:
+                options = tuple(
+                    e for e in EXERCISES
+                    if e.group == group and _allowed(e, band, equipment)
+                )
+                if not options:
+                    raise RuntimeError(f"Catalog has no {group} exercise for {band} / {equipment}")
+                index[group, band, equipment] = options
+    return index
+
+
+def _build_food_index():
+    index = {}
+    for meal in MEAL_SLOTS:
+        for role in ("base", "protein"):
+            for diet in DIETS:
+                index[meal, role, diet] = tuple(
+                    f for f in FOODS
+                    if meal in f.meals and f.role == role and diet in f.diets
+                )
+    return index
+
+
+# (group, bmi band, equipment) -> exercises
+EXERCISES_BY = _build_exercise_index()
+# (meal, role, diet) -> foods
+FOODS_BY = _build_food_index()
+# Protein sources listed for a diet: only the ones specific to it
+PROTEIN_SOURCES = {
+    diet: tuple(f for f in FOODS if f.role == "protein" and f.diets[0] == diet)
+    for diet in DIETS
+}
+
+
+# -------------------------------------------------
+# LOOKUPS
+def bmi_band(bmi):
+    return "Normal" if bmi is None else bmi_category(bmi)
+
+
+def exercises_for(group, bmi, equipment=DEFAULT_EQUIPMENT):
+    if equipment not in EQUIPMENT_LEVELS:
+        raise ValueError(f"Unknown equipment level: {equipment}")
+    return EXERCISES_BY[group, bmi_band(bmi), equipment]
+
+
+def foods_for(meal, role, diet):
+    # Anything that is not explicitly vegetarian gets the full catalog
+    return FOODS_BY[meal, role, diet if diet in DIETS else "Non-Vegetarian"]
+
+
+def pick(options, seed, count=1, exclude=()):
+    """
+    count distinct items from options, rotated by seed (deterministic).
+    Items named in exclude are skipped while there are others left.
+    """
+    size = len(options)
+    picked = []
+    for allow_excluded in (False, True):
+        for i in range(size):
+            item = options[(seed + i) % size]
+            if item in picked or (item.name in exclude and not allow_excluded):
+                continue
+            picked.append(item)
+            if len(picked) == count:
+                return picked
+    return picked
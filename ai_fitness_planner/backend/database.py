@@ -1,13 +1,152 @@
+import atexit
+import os
+import queue
 import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 
-def connect_db():
-    return sqlite3.connect("fitness.db", check_same_thread=False)
+from backend import metrics
 
-def create_table():
-    conn = connect_db()
-    cursor = conn.cursor()
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One fixed location, independent of the directory streamlit was started from
+DB_PATH = os.getenv("FITNESS_DB_PATH", os.path.join(BASE_DIR, "data", "fitness.db"))
+POOL_SIZE = int(os.getenv("FITNESS_DB_POOL_SIZE", "4"))
+# Closed months of progress data compacted to Parquet (see backend/progress_archive.py)
+ARCHIVE_DIR = os.getenv("FITNESS_ARCHIVE_DIR", os.path.join(os.path.dirname(DB_PATH), "progress_archive"))
+
+# Write-behind: queued progress rows are committed together once either
+# threshold is reached
+WRITE_BATCH_SIZE = int(os.getenv("FITNESS_DB_WRITE_BATCH_SIZE", "50"))
+WRITE_FLUSH_SECONDS = float(os.getenv("FITNESS_DB_WRITE_FLUSH_SECONDS", "1.0"))
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",       # readers never block the writer
+    "PRAGMA synchronous=NORMAL",     # safe with WAL, one fsync per checkpoint
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",    # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+]
+
+# Legacy rows written before per-user tracking are assigned to this id
+LEGACY_USER_ID = "legacy"
+
+# -------------------------------------------------
+# PREPARED STATEMENTS (cached per connection by sqlite3)
+INSERT_PROGRESS_SQL = """
+    INSERT INTO progress (user_id, age, gender, height, weight, goal, calories, date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SELECT_PROGRESS_SQL = """
+    SELECT date, weight FROM progress
+    WHERE user_id = ? AND date >= ? AND date <= ?
+    ORDER BY date, id
+"""
+
+SELECT_PROGRESS_WITH_ID_SQL = """
+    SELECT date, weight, id FROM progress
+    WHERE user_id = ? AND date >= ? AND date <= ?
+    ORDER BY date, id
+"""
+
+SELECT_DAILY_SQL = """
+    SELECT date, last_weight, min_weight, max_weight, entries, calories FROM progress_daily
+    WHERE user_id = ? AND date >= ? AND date <= ?
+    ORDER BY date
+"""
+
+
+@metrics.timed("db_connect_seconds")
+def connect_db(path=None):
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False, timeout=5)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of tuned connections shared by every session thread.
+    A connection is used by one thread at a time and returned afterwards.
+    """
+
+    def __init__(self, path=None, size=POOL_SIZE):
+        self.path = path or DB_PATH
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return connect_db(self.path)
+
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
 
-    cursor.execute("""
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_pid
+
+    # Connections must not cross a fork, so each process builds its own pool
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+                pool = ConnectionPool()
+                with pool.connection() as conn:
+                    _create_schema(conn)
+                _pool, _pool_pid = pool, os.getpid()
+
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+
+# -------------------------------------------------
+# SCHEMA
+# Each migration moves PRAGMA user_version one step forward
+def _migrate_v1(conn):
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS progress (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         age INTEGER,
@@ -20,18 +159,594 @@ def create_table():
     )
     """)
 
-    conn.commit()
-    conn.close()
+
+def _migrate_v2(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(progress)")]
+    if "user_id" not in columns:
+        conn.execute("ALTER TABLE progress ADD COLUMN user_id TEXT")
+
+    conn.execute(
+        "UPDATE progress SET user_id = ? WHERE user_id IS NULL",
+        (LEGACY_USER_ID,)
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_progress_user_date ON progress (user_id, date)"
+    )
+
+
+def _migrate_v3(conn):
+    # One row per user per day, maintained by a trigger on every insert path
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS progress_daily (
+        user_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        last_weight REAL,
+        min_weight REAL,
+        max_weight REAL,
+        entries INTEGER NOT NULL,
+        calories INTEGER,
+        PRIMARY KEY (user_id, date)
+    ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_progress_daily
+    AFTER INSERT ON progress
+    WHEN NEW.weight IS NOT NULL AND NEW.date IS NOT NULL
+    BEGIN
+        INSERT INTO progress_daily
+            (user_id, date, last_weight, min_weight, max_weight, entries, calories)
+        VALUES
+            (NEW.user_id, NEW.date, NEW.weight, NEW.weight, NEW.weight, 1, NEW.calories)
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            last_weight = excluded.last_weight,
+            min_weight = MIN(min_weight, excluded.min_weight),
+            max_weight = MAX(max_weight, excluded.max_weight),
+            entries = entries + 1,
+            calories = excluded.calories;
+    END
+    """)
+
+    # Backfill from existing rows; "last" means highest id on that day
+    conn.execute("DELETE FROM progress_daily")
+    conn.execute("""
+        INSERT INTO progress_daily
+            (user_id, date, last_weight, min_weight, max_weight, entries, calories)
+        SELECT p.user_id, p.date, last.weight, MIN(p.weight), MAX(p.weight), COUNT(*), last.calories
+        FROM progress p
+        JOIN progress last ON last.id = (
+            SELECT MAX(id) FROM progress
+            WHERE user_id = p.user_id AND date = p.date AND weight IS NOT NULL
+        )
+        WHERE p.weight IS NOT NULL AND p.date IS NOT NULL
+        GROUP BY p.user_id, p.date
+    """)
+
+
+def _migrate_v4(conn):
+    # Pre-generated AI plans, one per profile bucket and plan type
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS plan_store (
+        bucket TEXT NOT NULL,
+        plan_type TEXT NOT NULL,
+        prompt_hash TEXT NOT NULL,
+        plan TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (bucket, plan_type)
+    ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS plan_store_stats (
+        bucket TEXT NOT NULL,
+        plan_type TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, plan_type)
+    ) WITHOUT ROWID
+    """)
+
+
+def _migrate_v5(conn):
+    # Manifest of the Parquet archive: one live file per kind ("raw" / "daily") and month
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS progress_archive (
+        kind TEXT NOT NULL,
+        month TEXT NOT NULL,
+        path TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (kind, month)
+    ) WITHOUT ROWID
+    """)
+
+    # Archived month range per user, so most reads never touch the archive
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS progress_archive_users (
+        user_id TEXT PRIMARY KEY,
+        first_month TEXT NOT NULL,
+        last_month TEXT NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+
+def _migrate_v6(conn):
+    # Every plan a user was shown, zlib-compressed; sessions only keep the id
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS plan_history (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        plan_type TEXT NOT NULL,
+        source TEXT NOT NULL,
+        prompt_hash TEXT,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        body BLOB NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """)
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_plan_history_user "
+        "ON plan_history (user_id, plan_type, created_at)"
+    )
+
+
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6]
+
+
+def _create_schema(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for number, migrate in enumerate(MIGRATIONS, start=1):
+        if version < number:
+            with conn:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+
+
+def create_table():
+    get_pool()
+
+
+def import_legacy_db(path, user_id=LEGACY_USER_ID):
+    """Copies progress rows from an older cwd-relative fitness.db into DB_PATH."""
+    with get_connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS legacy", (path,))
+        try:
+            with conn:
+                cursor = conn.execute("""
+                    INSERT INTO progress (user_id, age, gender, height, weight, goal, calories, date)
+                    SELECT ?, age, gender, height, weight, goal, calories, date
+                    FROM legacy.progress
+                """, (user_id,))
+            return cursor.rowcount
+        finally:
+            conn.execute("DETACH DATABASE legacy")
+
+
+# -------------------------------------------------
+# PROGRESS
+@metrics.timed("db_query_seconds", query="insert_progress")
+def insert_progress(user_id, age, gender, height, weight, goal, calories, date):
+    with get_connection() as conn:
+        with conn:
+            conn.execute(
+                INSERT_PROGRESS_SQL,
+                (user_id, age, gender, height, weight, goal, calories, date)
+            )
+
+
+@metrics.timed("db_query_seconds", query="insert_progress_many")
+def insert_progress_many(rows):
+    """rows: (user_id, age, gender, height, weight, goal, calories, date) tuples"""
+    with get_connection() as conn:
+        with conn:
+            conn.executemany(INSERT_PROGRESS_SQL, rows)
 
 
+# -------------------------------------------------
+# WRITE-BEHIND QUEUE
+class ProgressWriter:
+    """
+    Buffers progress rows and commits them in one executemany transaction
+    when batch_size rows are pending or the oldest has waited flush_seconds.
+    Pending rows are flushed at interpreter exit.
+    """
+
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, flush_seconds=WRITE_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+
+        self._pending = []
+        self._pending_users = set()
+        self._oldest = None
+        self._cond = threading.Condition()
+        # Serializes flushes so batches commit in the order they were queued
+        self._flush_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        with self._cond:
+            # The first row starts the flush interval; a full batch flushes now
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append(row)
+            self._pending_users.add(row[0])
+            if first or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def has_pending(self, user_id=None):
+        # A batch being committed right now counts as pending too
+        if self._flush_lock.locked():
+            return True
+        with self._cond:
+            if user_id is None:
+                return bool(self._pending)
+            return user_id in self._pending_users
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                rows = self._pending
+                self._pending = []
+                self._pending_users = set()
+                self._oldest = None
+
+            if not rows:
+                return 0
+
+            try:
+                insert_progress_many(rows)
+            except Exception:
+                # Put the batch back in front so nothing is lost or reordered
+                with self._cond:
+                    self._pending[:0] = rows
+                    self._pending_users.update(row[0] for row in rows)
+                    self._oldest = time.monotonic()
+                metrics.increment("db_write_behind_errors_total")
+                raise
+
+        metrics.observe("db_write_behind_batch_rows", len(rows))
+        return len(rows)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if len(self._pending) >= self.batch_size:
+                        break
+                    if self._pending:
+                        remaining = self._oldest + self.flush_seconds - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+
+            try:
+                self.flush()
+            except Exception:
+                # Retried on the next threshold; the error is counted in flush()
+                time.sleep(self.flush_seconds)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer, _writer_pid
+
+    # The flusher thread does not survive a fork either
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer, _writer_pid = ProgressWriter(), os.getpid()
+
+    return _writer
+
+
+def queue_progress(user_id, age, gender, height, weight, goal, calories, date):
+    """Like insert_progress, but returns at once; the row is committed in the next batch."""
+    get_writer().put((user_id, age, gender, height, weight, goal, calories, date))
+
+
+def flush_progress(user_id=None):
+    """
+    Commits queued rows now. With a user_id this is a no-op unless that
+    user has rows waiting, so readers can call it on every query.
+    """
+    if _writer is None or _writer_pid != os.getpid():
+        return 0
+    if not _writer.has_pending(user_id):
+        return 0
+    return _writer.flush()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_progress()
+    except Exception:
+        pass
+
 
 #Fetch Progress Data
-def get_progress():
-    conn = connect_db()
-    cursor = conn.cursor()
+@metrics.timed("db_query_seconds", query="get_progress")
+def get_progress(user_id, start_date=None, end_date=None):
+    """
+    (date, weight) rows for one user, oldest first.
+    start_date / end_date are inclusive ISO dates; the (user_id, date)
+    index keeps this proportional to the user's own history.
+    """
+    # Read-your-writes for rows still in the write-behind queue
+    flush_progress(user_id)
+
+    params = (user_id, start_date or "", end_date or "9999-12-31")
+    with get_connection() as conn:
+        parts = archive_parts(conn, "raw", start_date, end_date, user_id)
+        if not parts:
+            return conn.execute(SELECT_PROGRESS_SQL, params).fetchall()
+
+        hot = conn.execute(SELECT_PROGRESS_WITH_ID_SQL, params).fetchall()
+
+    from backend import progress_archive
+    return progress_archive.read_progress(parts, user_id, start_date, end_date, hot)
+
+
+def get_progress_since(user_id, last_seen_date):
+    # Inclusive: the last seen day may have received more entries since
+    return get_progress(user_id, start_date=last_seen_date)
+
+
+# -------------------------------------------------
+# DAILY ROLLUP
+# Every bucket is labelled with its first day, so a bucket never starts
+# before its own label (incremental reads from a label stay correct)
+BUCKET_EXPRESSIONS = {
+    "day": "date",
+    "week": "date(date, '-6 days', 'weekday 1')",
+    "month": "substr(date, 1, 7) || '-01'",
+}
+
+
+@metrics.timed("db_query_seconds", query="get_daily_progress")
+def get_daily_progress(user_id, start_date=None, end_date=None, bucket="day"):
+    """
+    (date, weight, min_weight, max_weight, entries, calories) rows, oldest first.
+    weight / calories are the last values recorded in each bucket.
+    """
+    if bucket not in BUCKET_EXPRESSIONS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    flush_progress(user_id)
+
+    with get_connection() as conn:
+        parts = archive_parts(conn, "daily", start_date, end_date, user_id)
+        if parts:
+            hot = conn.execute(
+                SELECT_DAILY_SQL, (user_id, start_date or "", end_date or "9999-12-31")
+            ).fetchall()
+
+    if parts:
+        from backend import progress_archive
+        return progress_archive.read_daily(parts, user_id, start_date, end_date, hot, bucket)
+
+    # Aggregate per bucket, then look up the bucket's last day by primary key
+    sql = f"""
+        SELECT b.period, d.last_weight, b.min_weight, b.max_weight, b.entries, d.calories
+        FROM (
+            SELECT {BUCKET_EXPRESSIONS[bucket]} AS period,
+                   MIN(min_weight) AS min_weight,
+                   MAX(max_weight) AS max_weight,
+                   SUM(entries) AS entries,
+                   MAX(date) AS last_date
+            FROM progress_daily
+            WHERE user_id = ? AND date >= ? AND date <= ?
+            GROUP BY period
+        ) b
+        JOIN progress_daily d ON d.user_id = ? AND d.date = b.last_date
+        ORDER BY b.period
+    """
+
+    with get_connection() as conn:
+        return conn.execute(
+            sql,
+            (user_id, start_date or "", end_date or "9999-12-31", user_id)
+        ).fetchall()
+
+
+@metrics.timed("db_query_seconds", query="get_progress_summary")
+def get_progress_summary(user_id):
+    """First/last day, their weights and number of tracked days, or None."""
+    flush_progress(user_id)
+
+    with get_connection() as conn:
+        archived = archive_parts(conn, "daily", user_id=user_id)
+
+    if archived:
+        days = get_daily_progress(user_id)
+        if not days:
+            return None
+        return {
+            "first_date": days[0][0],
+            "first_weight": days[0][1],
+            "last_date": days[-1][0],
+            "last_weight": days[-1][1],
+            "days": len(days)
+        }
+
+    with get_connection() as conn:
+        first = conn.execute("""
+            SELECT date, last_weight FROM progress_daily
+            WHERE user_id = ? ORDER BY date LIMIT 1
+        """, (user_id,)).fetchone()
+
+        if first is None:
+            return None
+
+        last = conn.execute("""
+            SELECT date, last_weight FROM progress_daily
+            WHERE user_id = ? ORDER BY date DESC LIMIT 1
+        """, (user_id,)).fetchone()
+
+        days = conn.execute(
+            "SELECT COUNT(*) FROM progress_daily WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()[0]
+
+    return {
+        "first_date": first[0],
+        "first_weight": first[1],
+        "last_date": last[0],
+        "last_weight": last[1],
+        "days": days
+    }
+
+
+def archive_parts(conn, kind, start_date=None, end_date=None, user_id=None):
+    """
+    Archive file paths (relative to ARCHIVE_DIR) of one kind for the months
+    overlapping [start_date, end_date], limited to the user's archived months.
+    """
+    low, high = (start_date or "")[:7], (end_date or "9999-12")[:7]
+
+    if user_id is not None:
+        row = conn.execute(
+            "SELECT first_month, last_month FROM progress_archive_users WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        if row is None:
+            return []
+        low, high = max(low, row[0]), min(high, row[1])
+
+    return [path for (path,) in conn.execute("""
+        SELECT path FROM progress_archive
+        WHERE kind = ? AND month >= ? AND month <= ?
+        ORDER BY month
+    """, (kind, low, high))]
+
+
+# -------------------------------------------------
+# PLAN STORE (see backend/plan_buckets.py)
+@metrics.timed("db_query_seconds", query="get_stored_plan")
+def get_stored_plan(bucket, plan_type):
+    """(prompt_hash, plan) or None."""
+    with get_connection() as conn:
+        return conn.execute(
+            "SELECT prompt_hash, plan FROM plan_store WHERE bucket = ? AND plan_type = ?",
+            (bucket, plan_type)
+        ).fetchone()
+
+
+def save_stored_plan(bucket, plan_type, prompt_hash, plan):
+    with get_connection() as conn:
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO plan_store (bucket, plan_type, prompt_hash, plan, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (bucket, plan_type, prompt_hash, plan, time.time()))
+
+
+def record_plan_lookup(bucket, plan_type, hit):
+    with get_connection() as conn:
+        with conn:
+            conn.execute("""
+                INSERT INTO plan_store_stats (bucket, plan_type, hits, misses)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (bucket, plan_type) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    misses = misses + excluded.misses
+            """, (bucket, plan_type, int(hit), int(not hit)))
+
+
+def get_plan_bucket_stats(limit=None):
+    """(bucket, plan_type, hits, misses, stored) rows, most requested first."""
+    with get_connection() as conn:
+        return conn.execute("""
+            SELECT s.bucket, s.plan_type, s.hits, s.misses, p.bucket IS NOT NULL
+            FROM plan_store_stats s
+            LEFT JOIN plan_store p ON p.bucket = s.bucket AND p.plan_type = s.plan_type
+            ORDER BY s.hits + s.misses DESC, s.bucket
+            LIMIT ?
+        """, (-1 if limit is None else limit,)).fetchall()
+
+
+# -------------------------------------------------
+# PLAN HISTORY (see backend/plan_history.py)
+PLAN_HISTORY_COMPRESSION_LEVEL = 6
+
+
+def save_plan_history(user_id, plan_type, source, prompt_hash, digest, plan):
+    """
+    (id, created) of the user's stored copy of this plan; a new row only
+    for new text. Showing the same text again moves it to the top of the
+    history and files it under the new prompt.
+    """
+    with get_connection() as conn:
+        with conn:
+            row = conn.execute("""
+                SELECT id FROM plan_history
+                WHERE user_id = ? AND plan_type = ? AND digest = ?
+                ORDER BY id DESC LIMIT 1
+            """, (user_id, plan_type, digest)).fetchone()
+            if row is not None:
+                conn.execute("""
+                    UPDATE plan_history SET source = ?, prompt_hash = ?, created_at = ?
+                    WHERE id = ?
+                """, (source, prompt_hash, time.time(), row[0]))
+                return row[0], False
+
+            body = zlib.compress(plan.encode("utf-8"), PLAN_HISTORY_COMPRESSION_LEVEL)
+            cursor = conn.execute("""
+                INSERT INTO plan_history
+                    (user_id, plan_type, source, prompt_hash, digest, size, body, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, plan_type, source, prompt_hash, digest, len(plan), body, time.time()))
+            return cursor.lastrowid, True
+
+
+@metrics.timed("db_query_seconds", query="get_plan_history_body")
+def get_plan_history_body(plan_id):
+    """Decompressed plan text, or None."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT body FROM plan_history WHERE id = ?", (plan_id,)).fetchone()
+    return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+
+def latest_plan_history_id(user_id, plan_type, source, prompt_hash):
+    with get_connection() as conn:
+        row = conn.execute("""
+            SELECT id FROM plan_history
+            WHERE user_id = ? AND plan_type = ? AND source = ? AND prompt_hash = ?
+            ORDER BY created_at DESC, id DESC LIMIT 1
+        """, (user_id, plan_type, source, prompt_hash)).fetchone()
+    return row[0] if row else None
+
 
-    cursor.execute("SELECT date, weight FROM progress")
-    data = cursor.fetchall()
+@metrics.timed("db_query_seconds", query="get_plan_history")
+def get_plan_history(user_id, plan_type=None, before=None, limit=10):
+    """
+    One page of (id, plan_type, source, created_at, size) rows, newest first.
+    before is the (created_at, id) of the last row of the previous page.
+    """
+    filters, params = ["user_id = ?"], [user_id]
+    if plan_type is not None:
+        filters.append("plan_type = ?")
+        params.append(plan_type)
+    if before is not None:
+        filters.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params += [before[0], before[0], before[1]]
 
-    conn.close()
-    return data
+    with get_connection() as conn:
+        return conn.execute(f"""
+            SELECT id, plan_type, source, created_at, size FROM plan_history
+            WHERE {" AND ".join(filters)}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, params + [limit]).fetchall()
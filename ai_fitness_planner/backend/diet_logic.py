@@ -1,21 +1,54 @@
-def diet_plan(goal, calories, diet_type):
+from backend.catalog import MEAL_SLOTS, PROTEIN_SOURCES, foods_for, pick
+
+
+def plan_meals(calories, diet_type, seed=None):
+    """
+    (slot, base food, protein food) per meal slot for an adjusted calorie
+    target. No food is served twice in one day unless a slot has nothing else.
+    """
+    if seed is None:
+        seed = int(calories) // 50
+
+    meals = []
+    used = set()
+    for slot_no, slot in enumerate(MEAL_SLOTS):
+        base = pick(foods_for(slot, "base", diet_type), seed + slot_no, exclude=used)[0]
+        main = pick(foods_for(slot, "protein", diet_type), seed + slot_no, exclude=used)[0]
+        used.update((base.name, main.name))
+        meals.append((slot, base, main))
+
+    return meals
+
+
+def adjust_calories(goal, calories):
     if goal == "Weight Loss":
         calories -= 400
     elif goal == "Muscle Gain":
         calories += 300
+    return calories
+
+
+def diet_plan(goal, calories, diet_type, seed=None):
+    """
+    Calorie target adjusted for the goal, plus meals assembled from the
+    food catalog. The default seed comes from the calories, so a profile
+    always gets the same plan.
+    """
+    calories = adjust_calories(goal, calories)
+
+    if seed is None:
+        seed = int(calories) // 50
+
+    sources = PROTEIN_SOURCES.get(diet_type, PROTEIN_SOURCES["Non-Vegetarian"])
+    protein = ", ".join(f.name for f in pick(sources, seed, 3))
 
-    protein = (
-        "Paneer, Dal, Tofu"
-        if diet_type == "Vegetarian"
-        else "Eggs, Chicken, Fish"
-    )
+    meals = [
+        f"{slot}: {base.name} + {main.name}"
+        for slot, base, main in plan_meals(calories, diet_type, seed)
+    ]
 
     return {
         "Calories": int(calories),
         "Protein": protein,
-        "Meals": [
-            "Breakfast: Oats & fruits",
-            "Lunch: Rice/Roti + protein",
-            "Dinner: Salad + protein"
-        ]
+        "Meals": meals
     }
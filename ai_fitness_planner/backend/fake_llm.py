@@ -0,0 +1,183 @@
+"""
+Offline stand-in for the HuggingFace InferenceClient, for load tests.
+
+Mimics chat_completion (blocking and streaming) with a simple latency
+model: a time to first token, then a steady token rate. Errors, truncated
+answers (no END) and rate limiting can be injected. Select it with
+LLM_BACKEND=fake; no HF_API_TOKEN is needed.
+
+Environment:
+    FAKE_LLM_TTFT_SECONDS=0.8        time to first token
+    FAKE_LLM_TOKENS_PER_SECOND=40    generation speed after the first token
+    FAKE_LLM_COMPLETION_TOKENS=600   typical answer length (+-25%)
+    FAKE_LLM_ERROR_RATE=0            share of requests failing with a 503
+    FAKE_LLM_TRUNCATION_RATE=0       share of answers stopping before END
+    FAKE_LLM_RATE_LIMIT_RATE=0       share of requests rejected with a 429
+    FAKE_LLM_MAX_CONCURRENCY=0       more concurrent requests than this get a 429 (0 = no limit)
+    FAKE_LLM_SEED                    make the injected failures repeatable
+"""
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+WORDS = (
+    "squats", "push-ups", "plank", "brisk", "walk", "rest", "stretch", "oats", "dal",
+    "salad", "protein", "water", "sets", "reps", "minutes", "light", "cardio", "warm-up",
+)
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+class FakeBackendError(RuntimeError):
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+
+
+class FakeRateLimitError(FakeBackendError):
+    def __init__(self):
+        super().__init__(429, "Too Many Requests (fake backend)")
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+class _Stream:
+    """
+    A streamed answer holding one concurrency slot until it is read to the
+    end or closed. Unlike a generator's finally, close() also releases a
+    stream that was never iterated.
+    """
+
+    def __init__(self, chunks, release):
+        self._chunks = chunks
+        self._release = release
+        self._lock = threading.Lock()
+        self._open = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        with self._lock:
+            if not self._open:
+                return
+            self._open = False
+        self._chunks.close()
+        self._release()
+
+    def __del__(self):
+        # A stream dropped without close() must not keep its slot
+        self.close()
+
+
+class FakeInferenceClient:
+    def __init__(self, ttft=None, tokens_per_second=None, completion_tokens=None,
+                 error_rate=None, truncation_rate=None, rate_limit_rate=None,
+                 max_concurrency=None, seed=None):
+        self.ttft = ttft if ttft is not None else _env_float("FAKE_LLM_TTFT_SECONDS", 0.8)
+        self.tokens_per_second = (
+            tokens_per_second if tokens_per_second is not None
+            else _env_float("FAKE_LLM_TOKENS_PER_SECOND", 40)
+        )
+        self.completion_tokens = int(
+            completion_tokens if completion_tokens is not None
+            else _env_float("FAKE_LLM_COMPLETION_TOKENS", 600)
+        )
+        self.error_rate = error_rate if error_rate is not None else _env_float("FAKE_LLM_ERROR_RATE", 0)
+        self.truncation_rate = (
+            truncation_rate if truncation_rate is not None
+            else _env_float("FAKE_LLM_TRUNCATION_RATE", 0)
+        )
+        self.rate_limit_rate = (
+            rate_limit_rate if rate_limit_rate is not None
+            else _env_float("FAKE_LLM_RATE_LIMIT_RATE", 0)
+        )
+        self.max_concurrency = int(
+            max_concurrency if max_concurrency is not None
+            else _env_float("FAKE_LLM_MAX_CONCURRENCY", 0)
+        )
+
+        seed = seed if seed is not None else os.getenv("FAKE_LLM_SEED")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.requests = 0
+
+    # -------------------------------------------------
+    # REQUEST OUTCOME
+    def _admit(self):
+        """Decides how the request ends; raises for rejected requests."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            truncated = self._random.random() < self.truncation_rate
+            length = int(self.completion_tokens * self._random.uniform(0.75, 1.25))
+
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                raise FakeRateLimitError()
+            if roll < self.rate_limit_rate:
+                raise FakeRateLimitError()
+            if roll < self.rate_limit_rate + self.error_rate:
+                raise FakeBackendError(503, "Service Unavailable (fake backend)")
+
+            self._in_flight += 1
+
+        return truncated, length
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _tokens(self, messages, max_tokens, truncated, length):
+        # A continuation request only needs the remainder of the answer
+        if len(messages) > 1:
+            length = max(length // 6, 20)
+
+        count = min(length, max_tokens)
+        tokens = []
+        for i in range(count):
+            if i % 12 == 0:
+                tokens.append(f"\n- {DAYS[(i // 12) % 7]}:")
+            else:
+                tokens.append(" " + WORDS[(i * 7 + len(messages)) % len(WORDS)])
+
+        # The model only writes END when it had room to finish
+        if length <= max_tokens and not truncated:
+            tokens.append("\nEND")
+        return tokens
+
+    # -------------------------------------------------
+    # chat_completion
+    def chat_completion(self, messages, max_tokens=900, temperature=None, stream=False, **kwargs):
+        truncated, length = self._admit()
+        tokens = self._tokens(messages, max_tokens, truncated, length)
+
+        if stream:
+            return _Stream(self._stream(tokens), self._release)
+
+        try:
+            time.sleep(self.ttft + len(tokens) / self.tokens_per_second)
+        finally:
+            self._release()
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message={"role": "assistant", "content": "".join(tokens)})],
+            usage=SimpleNamespace(prompt_tokens=sum(len(m["content"]) // 4 for m in messages),
+                                  completion_tokens=len(tokens))
+        )
+
+    def _stream(self, tokens):
+        time.sleep(self.ttft)
+        for token in tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+            time.sleep(1 / self.tokens_per_second)
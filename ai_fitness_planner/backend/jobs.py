@@ -0,0 +1,138 @@
+"""
+Process-wide background jobs for AI generation.
+
+Pages submit a job, keep only its id in session_state and poll it from an
+auto-refreshing fragment, so no script thread waits on the model and a
+rerun or page switch does not lose the result. Finished jobs are kept
+for AI_JOB_TTL_SECONDS.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import metrics
+
+MAX_WORKERS = int(os.getenv("AI_JOB_WORKERS", os.getenv("LLM_MAX_CONCURRENCY", "4")))
+TTL_SECONDS = float(os.getenv("AI_JOB_TTL_SECONDS", "3600"))
+# How often a page's fragment checks on its job
+POLL_SECONDS = float(os.getenv("AI_JOB_POLL_SECONDS", "1.0"))
+
+
+class Job:
+    def __init__(self, key=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.partial = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "error")
+
+
+class JobExecutor:
+    """
+    Thread pool plus a registry of jobs by id. A job submitted with the key
+    of an unfinished job returns that job instead of starting another one.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, ttl_seconds=TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+
+    def submit(self, fn, *args, key=None):
+        """Runs fn(job, *args) in the background and returns the job id."""
+        with self._lock:
+            self._purge(time.time())
+
+            active = self._active.get(key) if key is not None else None
+            if active is not None:
+                metrics.increment("ai_jobs_total", result="joined")
+                return active.id
+
+            job = Job(key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active[key] = job
+
+        metrics.increment("ai_jobs_total", result="submitted")
+        self._pool.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job, fn, args):
+        job.status = "running"
+        start = time.perf_counter()
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as exc:
+            job.error = str(exc)
+            job.status = "error"
+            metrics.increment("ai_jobs_failed_total")
+        finally:
+            job.finished_at = time.time()
+            metrics.observe("ai_job_seconds", time.perf_counter() - start)
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self, now):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "error")}
+
+
+# One executor per process: every Streamlit session shares it
+executor = JobExecutor()
+
+
+# -------------------------------------------------
+# AI PLAN JOBS
+def _generate_plan(job, plan_type, bucket, prompt):
+    from backend.llm_service import TRUNCATION_NOTE, stream_response
+    from backend.plan_buckets import save_plan
+
+    text = ""
+    for piece in stream_response(prompt, plan_type=plan_type):
+        text += piece
+        job.partial = text
+
+    # An answer with nothing but the truncation note is no plan
+    if not text.replace(TRUNCATION_NOTE, "").strip():
+        raise RuntimeError("The AI returned an empty plan. Please try again.")
+
+    save_plan(bucket, plan_type, text)
+    return text
+
+
+def submit_plan(plan_type, bucket, prompt):
+    return executor.submit(_generate_plan, plan_type, bucket, prompt, key=(plan_type, prompt))
+
+
+def get_job(job_id):
+    return executor.get(job_id)
+
+
+def get_job_stats():
+    return executor.stats()
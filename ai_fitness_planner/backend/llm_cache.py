@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(BASE_DIR, "data", "llm_cache.db")
+)
+
+# Defaults can be tuned per deployment without code changes
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def normalize_prompt(prompt):
+    # Pages build prompts from indented f-strings, so whitespace differences
+    # must not produce different cache keys
+    lines = [re.sub(r"\s+", " ", line).strip() for line in prompt.strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(prompt, model, max_tokens, temperature):
+    raw = "\x1f".join([
+        normalize_prompt(prompt),
+        model,
+        str(int(max_tokens)),
+        f"{float(temperature):.3f}"
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Disk-backed LLM response cache.
+    Entries expire after ttl_seconds; the least recently used entries
+    are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key, response):
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access)
+                VALUES (?, ?, ?, ?)
+            """, (key, response, now, now))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+        self._conn.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache
+                ORDER BY last_access DESC
+                LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
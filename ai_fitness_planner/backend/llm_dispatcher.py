@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "120"))
+
+
+class DispatcherBusyError(RuntimeError):
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class LLMDispatcher:
+    """
+    Process-wide gate in front of the inference provider.
+    At most max_concurrency upstream calls run at once, at most max_queue
+    callers wait for a slot, and concurrent callers with the same key share
+    a single upstream call.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        self._queued = 0
+        self._running = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._coalesced = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=1000)
+
+    # ---------------------------------------
+    # CONCURRENCY LIMIT
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise DispatcherBusyError("LLM queue is full. Please try again shortly.")
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self._queued -= 1
+            self._wait_times.append(waited)
+            if not acquired:
+                self._rejected += 1
+            else:
+                self._running += 1
+
+        if not acquired:
+            raise DispatcherBusyError("Timed out waiting for a free LLM slot.")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            self._slots.release()
+
+    # ---------------------------------------
+    # SINGLE-FLIGHT
+    def join(self, key):
+        """Returns (call, is_leader). Only the leader performs the upstream call."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self._coalesced += 1
+                return call, False
+
+            call = _Call()
+            self._calls[key] = call
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        if isinstance(error, GeneratorExit):
+            error = RuntimeError("The shared LLM request was cancelled.")
+
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def run(self, key, fn):
+        call, leader = self.join(key)
+        if not leader:
+            return call.wait()
+
+        try:
+            with self.slot():
+                result = fn()
+        except BaseException as exc:
+            self.finish(key, call, error=exc)
+            raise
+
+        self.finish(key, call, result=result)
+        return result
+
+    # ---------------------------------------
+    # STATS
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._wait_times)
+            stats = {
+                "max_concurrency": self.max_concurrency,
+                "running": self._running,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queued,
+                "in_flight_keys": len(self._calls),
+                "completed": self._completed,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+            }
+
+        if waits:
+            stats["avg_wait_s"] = round(sum(waits) / len(waits), 4)
+            stats["p95_wait_s"] = round(waits[int(0.95 * (len(waits) - 1))], 4)
+            stats["max_wait_s"] = round(waits[-1], 4)
+        else:
+            stats["avg_wait_s"] = stats["p95_wait_s"] = stats["max_wait_s"] = 0.0
+
+        return stats
+
+
+# One dispatcher per process: every Streamlit session shares it
+dispatcher = LLMDispatcher()
@@ -1,19 +1,110 @@
-from huggingface_hub import InferenceClient
 import os
+import re
+import threading
+import time
+from collections import deque
 
-HF_TOKEN = os.getenv("HF_API_TOKEN")
+from backend import metrics
+from backend.llm_cache import ResponseCache, make_cache_key
+from backend.llm_dispatcher import dispatcher
 
-if not HF_TOKEN:
-    raise RuntimeError("HF_API_KEY is missing. Set it as an environment variable.")
+MODEL_ID = "meta-llama/Llama-3.1-8B-Instruct"
+TEMPERATURE = 0.7
 
+END_MARKER = "END"
+TRUNCATION_NOTE = "\n\n[Note: Response ended early by the model]"
 
-client = InferenceClient(
-    model="meta-llama/Llama-3.1-8B-Instruct",
-    token=HF_TOKEN
+# "END" as a whole word, so WEEKEND / ENDURANCE never stop the stream
+END_PATTERN = re.compile(r"\bEND\b")
+
+DEFAULT_MAX_TOKENS = 900
+
+# A response without END is continued instead of regenerated, within a budget
+MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "2"))
+CONTINUATION_TOKEN_BUDGET = int(os.getenv("LLM_CONTINUATION_TOKEN_BUDGET", "600"))
+CONTINUATION_PROMPT = (
+    "Continue exactly where you stopped. Do not repeat earlier text. "
+    "End the response with the word: END"
 )
 
-def generate_response(prompt, max_tokens=900):
-    messages = [{
+# max_tokens per plan type follows the observed length of complete answers
+ADAPTIVE_MIN_SAMPLES = 20
+ADAPTIVE_HEADROOM = 1.15
+ADAPTIVE_MIN_TOKENS = int(os.getenv("LLM_ADAPTIVE_MIN_TOKENS", "300"))
+ADAPTIVE_MAX_TOKENS = int(os.getenv("LLM_ADAPTIVE_MAX_TOKENS", "1500"))
+
+# Built on first use, so importing this module (every page load) stays cheap
+# and a missing token only fails when AI mode is actually used
+_client = None
+_response_cache = None
+_init_lock = threading.Lock()
+
+
+# -------------------------------------------------
+# BACKENDS
+# Anything with a huggingface_hub-style chat_completion() can serve requests
+def _huggingface_client():
+    hf_token = os.getenv("HF_API_TOKEN")
+    if not hf_token:
+        raise RuntimeError("HF_API_TOKEN is missing. Set it as an environment variable.")
+
+    from huggingface_hub import InferenceClient
+
+    return InferenceClient(
+        model=MODEL_ID,
+        token=hf_token
+    )
+
+
+def _fake_client():
+    # Offline stand-in with a latency model, for load tests (see backend/fake_llm.py)
+    from backend.fake_llm import FakeInferenceClient
+
+    return FakeInferenceClient()
+
+
+BACKENDS = {
+    "huggingface": _huggingface_client,
+    "fake": _fake_client,
+}
+BACKEND = os.getenv("LLM_BACKEND", "huggingface")
+
+
+def get_client():
+    global _client
+
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                factory = BACKENDS.get(BACKEND)
+                if factory is None:
+                    raise RuntimeError(
+                        f"Unknown LLM_BACKEND '{BACKEND}'. Use one of: {', '.join(BACKENDS)}."
+                    )
+                _client = factory()
+
+    return _client
+
+
+def _cache_model():
+    # Fake answers must never be served to real requests from the cache
+    return MODEL_ID if BACKEND == "huggingface" else f"{BACKEND}:{MODEL_ID}"
+
+
+def get_response_cache():
+    global _response_cache
+
+    if _response_cache is None:
+        with _init_lock:
+            if _response_cache is None:
+                # Shared on-disk cache: identical profiles produce identical prompts
+                _response_cache = ResponseCache()
+
+    return _response_cache
+
+
+def build_messages(prompt):
+    return [{
         "role": "user",
         "content": prompt + """
         
@@ -24,10 +115,323 @@ Please follow these rules strictly:
 """
     }]
 
-    response = client.chat_completion(
-        messages=messages,
-        max_tokens=max_tokens,
-        temperature=0.7
-    )
 
-    return response.choices[0].message["content"]
+def build_continuation_messages(prompt, partial):
+    return build_messages(prompt) + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUATION_PROMPT},
+    ]
+
+
+def is_complete(text):
+    return bool(text) and text.strip().endswith(END_MARKER)
+
+
+# -------------------------------------------------
+# ADAPTIVE MAX_TOKENS
+_completion_lengths = {}
+_lengths_lock = threading.Lock()
+
+
+def record_completion_length(plan_type, tokens):
+    """Completion tokens of a complete answer (continuations included)."""
+    if plan_type is None or tokens <= 0:
+        return
+    with _lengths_lock:
+        _completion_lengths.setdefault(plan_type, deque(maxlen=200)).append(tokens)
+
+
+def adaptive_max_tokens(plan_type, default=DEFAULT_MAX_TOKENS):
+    """p95 of observed complete answers plus headroom, once enough are seen."""
+    with _lengths_lock:
+        lengths = sorted(_completion_lengths.get(plan_type, ()))
+
+    if len(lengths) < ADAPTIVE_MIN_SAMPLES:
+        return default
+
+    p95 = lengths[int(0.95 * (len(lengths) - 1))]
+    return max(ADAPTIVE_MIN_TOKENS, min(ADAPTIVE_MAX_TOKENS, int(p95 * ADAPTIVE_HEADROOM)))
+
+
+def _resolve_max_tokens(max_tokens, plan_type):
+    """(max_tokens for the request, max_tokens for the cache key)."""
+    if max_tokens is not None:
+        return max_tokens, max_tokens
+    # Only complete answers are cached, so the adaptive limit stays out of the key
+    return adaptive_max_tokens(plan_type), DEFAULT_MAX_TOKENS
+
+
+def _separator(text, more):
+    # Continuations are joined on whitespace, never glued onto the last word
+    if text and more and not text[-1].isspace() and not more[0].isspace():
+        return " "
+    return ""
+
+
+def _word_boundary(text):
+    """text up to and including its last whitespace: a cut-off word is asked for again."""
+    cut = max(text.rfind(" "), text.rfind("\n"))
+    return text[:cut + 1] if cut > 0 else text
+
+
+def _continuation_tokens(spent):
+    """max_tokens for the next continuation: an even share of the budget, never past it."""
+    if MAX_CONTINUATIONS <= 0:
+        return 0
+    return min(CONTINUATION_TOKEN_BUDGET - spent, CONTINUATION_TOKEN_BUDGET // MAX_CONTINUATIONS)
+
+
+# -------------------------------------------------
+# BLOCKING
+def _complete_once(messages, max_tokens):
+    start = time.perf_counter()
+    try:
+        response = get_client().chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE
+        )
+    except Exception:
+        metrics.increment("llm_errors_total", mode="blocking")
+        raise
+
+    metrics.observe("llm_request_seconds", time.perf_counter() - start, mode="blocking")
+
+    tokens = 0
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        tokens = usage.completion_tokens or 0
+        metrics.increment("llm_prompt_tokens_total", usage.prompt_tokens or 0)
+        metrics.increment("llm_completion_tokens_total", tokens)
+
+    return response.choices[0].message["content"] or "", tokens
+
+
+def generate_response(prompt, max_tokens=None, use_cache=True, plan_type=None):
+    """
+    Full response text. Without an explicit max_tokens the limit adapts
+    to plan_type. A response that stops before END is continued (up to
+    LLM_MAX_CONTINUATIONS requests within LLM_CONTINUATION_TOKEN_BUDGET).
+    Like stream_response(), the text ends at END, or with the truncation
+    note when it is still unfinished.
+    """
+    max_tokens, key_tokens = _resolve_max_tokens(max_tokens, plan_type)
+    cache_key = make_cache_key(prompt, _cache_model(), key_tokens, TEMPERATURE)
+
+    if use_cache:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            metrics.increment("llm_requests_total", mode="blocking", source="cache")
+            return cached
+
+    def call_model():
+        metrics.increment("llm_requests_total", mode="blocking", source="upstream")
+
+        text, tokens = _complete_once(build_messages(prompt), max_tokens)
+        end_at = _find_end(text, 0, final=True)
+
+        spent = 0
+        for _ in range(MAX_CONTINUATIONS):
+            budget = _continuation_tokens(spent)
+            if end_at is not None or budget <= 0:
+                break
+
+            metrics.increment("llm_continuations_total", mode="blocking")
+            text = _word_boundary(text)
+            more, more_tokens = _complete_once(build_continuation_messages(prompt, text), budget)
+            # Only the continuation can hold the first END
+            end_at = _find_end(more, 0, final=True)
+            if end_at is not None:
+                end_at += len(text) + len(_separator(text, more))
+            text += _separator(text, more) + more
+            # Without usage data the whole budget is assumed spent
+            spent += more_tokens or budget
+            tokens += more_tokens
+            metrics.increment("llm_continuation_tokens_total", more_tokens or budget)
+
+        # Same result as the stream: cut after END, or flagged as unfinished
+        if end_at is not None:
+            text = text[:end_at]
+            record_completion_length(plan_type, tokens)
+        else:
+            metrics.increment("llm_truncated_total")
+            text += TRUNCATION_NOTE
+
+        # Only complete answers are cached, so a truncated plan is never replayed
+        if use_cache and is_complete(text):
+            get_response_cache().set(cache_key, text)
+
+        return text
+
+    # Bounded concurrency + identical in-flight prompts share one call
+    return dispatcher.run(cache_key, call_model)
+
+
+def _find_end(text, start, final):
+    # A match touching the end of the buffer is ambiguous ("END" + "URANCE")
+    # until more tokens arrive or the stream finishes
+    for match in END_PATTERN.finditer(text, start):
+        if match.end() < len(text) or final:
+            return match.end()
+    return None
+
+
+def _stream_once(messages, max_tokens, start_emitted=""):
+    """
+    Streams one request, yielding text as it becomes safe to show.
+    Returns (text, ended, tokens) when the stream is done.
+    """
+    start = time.perf_counter()
+    try:
+        stream = get_client().chat_completion(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE,
+            stream=True
+        )
+    except Exception:
+        metrics.increment("llm_errors_total", mode="stream")
+        raise
+
+    text = ""
+    emitted = 0
+    end_at = None
+    # Each stream chunk carries one generated token
+    tokens = 0
+
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+
+            if tokens == 0:
+                metrics.observe("llm_time_to_first_token_seconds", time.perf_counter() - start)
+            tokens += 1
+
+            text += chunk.choices[0].delta.content or ""
+
+            end_at = _find_end(text, max(emitted - len(END_MARKER), 0), final=False)
+            if end_at is not None:
+                break
+
+            # Hold back a possible partial marker at the tail
+            safe = len(text) - len(END_MARKER)
+            if safe > emitted:
+                yield text[emitted:safe]
+                emitted = safe
+    except Exception:
+        metrics.increment("llm_errors_total", mode="stream")
+        raise
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, mode="stream")
+        metrics.increment("llm_completion_tokens_total", tokens)
+
+    if end_at is None:
+        end_at = _find_end(text, max(emitted - len(END_MARKER), 0), final=True)
+
+    if end_at is not None:
+        text = text[:end_at]
+
+    if len(text) > emitted:
+        yield text[emitted:]
+
+    return text, end_at is not None, tokens
+
+
+def _spaced(pieces, text):
+    """Passes a streamed continuation through, with the separator before its first text."""
+    separator = None
+    try:
+        while True:
+            try:
+                piece = next(pieces)
+            except StopIteration as done:
+                more, ended, tokens = done.value
+                return (separator or "") + more, ended, tokens
+
+            if separator is None and piece:
+                separator = _separator(text, piece)
+                piece = separator + piece
+            yield piece
+    finally:
+        pieces.close()
+
+
+def _stream_until_end(prompt, max_tokens, plan_type=None):
+    text, ended, tokens = yield from _stream_once(build_messages(prompt), max_tokens)
+
+    spent = 0
+    for _ in range(MAX_CONTINUATIONS):
+        budget = _continuation_tokens(spent)
+        if ended or budget <= 0:
+            break
+
+        # Ask for the rest instead of regenerating the whole plan
+        metrics.increment("llm_continuations_total", mode="stream")
+        more, ended, more_tokens = yield from _spaced(
+            _stream_once(build_continuation_messages(prompt, text), budget), text
+        )
+        text += more
+        spent += more_tokens
+        tokens += more_tokens
+        metrics.increment("llm_continuation_tokens_total", more_tokens)
+
+    if ended:
+        record_completion_length(plan_type, tokens)
+    else:
+        metrics.increment("llm_truncated_total")
+        yield TRUNCATION_NOTE
+
+
+def stream_response(prompt, max_tokens=None, use_cache=True, plan_type=None):
+    """
+    Yields the response in chunks and stops reading the stream as soon as
+    the END marker appears. A response that stops before END is continued
+    like in generate_response(); if it is still unfinished, the truncation
+    note is yielded as the final chunk.
+    """
+    max_tokens, key_tokens = _resolve_max_tokens(max_tokens, plan_type)
+    cache_key = make_cache_key(prompt, _cache_model(), key_tokens, TEMPERATURE)
+
+    if use_cache:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            metrics.increment("llm_requests_total", mode="stream", source="cache")
+            yield cached
+            return
+
+    call, leader = dispatcher.join(cache_key)
+    if not leader:
+        # Another session is already generating this exact prompt
+        metrics.increment("llm_requests_total", mode="stream", source="coalesced")
+        yield call.wait()
+        return
+
+    metrics.increment("llm_requests_total", mode="stream", source="upstream")
+
+    text = ""
+    try:
+        with dispatcher.slot():
+            for piece in _stream_until_end(prompt, max_tokens, plan_type):
+                text += piece
+                yield piece
+    except BaseException as exc:
+        dispatcher.finish(cache_key, call, error=exc)
+        raise
+
+    dispatcher.finish(cache_key, call, result=text)
+
+    if use_cache and is_complete(text):
+        get_response_cache().set(cache_key, text)
+
+
+def get_dispatcher_stats():
+    return dispatcher.stats()
+
+
+def get_cache_stats():
+    return get_response_cache().stats()
@@ -0,0 +1,237 @@
+"""
+Portion solver for the rule-based diet plan.
+
+Given an (already goal-adjusted) calorie target and a diet preference, it
+chooses servings of the plan's meal foods plus optional snacks so that the
+day hits the calorie target and the 30/45/25 protein/carbs/fats split.
+
+Bounded least squares is solved with accelerated projected gradient
+(FISTA) on numpy arrays. Only the MAX_SNACKS largest snacks are kept and
+the problem is solved again, then servings are rounded to quarter portions
+and repaired greedily. Every step works on a (profiles x foods) matrix,
+so solve_batch() handles a whole cohort in one pass. A target of zero or
+less (or NaN) has no plan: no servings and never within tolerance.
+
+Portions reach the tolerance for targets in SUPPORTED_CALORIES. Outside
+it the closest portions are still returned and solve_meal_plan() says
+so ("in_range"), so the page can tell the user.
+"""
+import numpy as np
+
+from backend.catalog import DIETS, FOODS
+from backend.diet_logic import plan_meals
+
+# Share of calories per macro and kcal per gram
+MACRO_SPLIT = {"Protein": 0.30, "Carbs": 0.45, "Fats": 0.25}
+KCAL_PER_GRAM = {"Protein": 4, "Carbs": 4, "Fats": 9}
+
+CALORIE_TOLERANCE = 0.05   # +-5% of the calorie target
+SHARE_TOLERANCE = 0.05     # +-5 percentage points per macro share
+# kcal/day the meal and snack servings can cover within tolerance
+SUPPORTED_CALORIES = (900, 4500)
+
+MEAL_SERVINGS = (0.5, 4.0)
+SNACK_SERVINGS = (0.0, 3.0)
+MAX_SNACKS = 3
+STEP = 0.25
+
+ITERATIONS = 80
+REPAIR_PASSES = 3
+
+# Calories count double compared with each macro
+WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])
+
+FOOD_INDEX = {food.name: i for i, food in enumerate(FOODS)}
+# (foods x 4): kcal, protein g, carbs g, fat g per serving
+NUTRIENTS = np.array(
+    [[f.kcal, f.protein, f.carbs, f.fat] for f in FOODS], dtype=np.float64
+)
+# Target per kcal of the calorie goal, in the same columns
+TARGET_PER_KCAL = np.array([1.0] + [
+    MACRO_SPLIT[m] / KCAL_PER_GRAM[m] for m in ("Protein", "Carbs", "Fats")
+])
+
+# Normalized so every column's target is 1 per kcal of the goal
+_SCALED = NUTRIENTS / TARGET_PER_KCAL * WEIGHTS
+_LIPSCHITZ = 2 * np.linalg.eigvalsh(_SCALED @ _SCALED.T).max()
+
+_SNACKS = {
+    diet: np.array([f.role == "snack" and diet in f.diets for f in FOODS])
+    for diet in DIETS
+}
+_SNACK_COLS = np.flatnonzero([f.role == "snack" for f in FOODS])
+
+
+# -------------------------------------------------
+# BOUNDS
+def _bounds(calories, diet_types):
+    n = len(calories)
+    lower = np.zeros((n, len(FOODS)))
+    upper = np.zeros((n, len(FOODS)))
+    slots = []
+
+    for row, (kcal, diet) in enumerate(zip(calories, diet_types)):
+        upper[row, _SNACKS.get(diet, _SNACKS["Non-Vegetarian"])] = SNACK_SERVINGS[1]
+
+        meals = plan_meals(kcal, diet)
+        for slot, base, main in meals:
+            for food in (base, main):
+                j = FOOD_INDEX[food.name]
+                lower[row, j], upper[row, j] = MEAL_SERVINGS
+        slots.append(meals)
+
+    return lower, upper, slots
+
+
+def _residual(servings, calories):
+    # Relative miss per column, weighted
+    return servings @ _SCALED / calories[:, None] - WEIGHTS
+
+
+# -------------------------------------------------
+# SOLVER
+def _fista(calories, lower, upper):
+    step = (calories ** 2 / _LIPSCHITZ)[:, None]
+
+    x = np.clip(calories[:, None] / NUTRIENTS[:, 0].sum(), lower, upper)
+    y = x.copy()
+    t = 1.0
+
+    for _ in range(ITERATIONS):
+        grad = 2 * _residual(y, calories) @ _SCALED.T / calories[:, None]
+        x_next = np.clip(y - step * grad, lower, upper)
+
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = x_next + ((t - 1) / t_next) * (x_next - x)
+        x, t = x_next, t_next
+
+    return x
+
+
+def _error(servings, calories):
+    return (_residual(servings, calories) ** 2).sum(axis=1)
+
+
+def _round_and_repair(servings, calories, lower, upper):
+    x = np.clip(np.round(servings / STEP) * STEP, lower, upper)
+    error = _error(x, calories)
+
+    # Only foods some profile may actually use
+    candidates = np.flatnonzero((upper > 0).any(axis=0))
+
+    for _ in range(REPAIR_PASSES):
+        improved = False
+        for j in candidates:
+            for delta in (STEP, -STEP):
+                trial = x.copy()
+                trial[:, j] = np.clip(trial[:, j] + delta, lower[:, j], upper[:, j])
+                trial_error = _error(trial, calories)
+
+                better = trial_error < error - 1e-12
+                if better.any():
+                    x[better] = trial[better]
+                    error[better] = trial_error[better]
+                    improved = True
+        if not improved:
+            break
+
+    return x
+
+
+def solve_batch(calories, diet_types):
+    """
+    Vectorized solve for many profiles.
+    Returns (servings, achieved, ok, slots): servings is (n x len(FOODS)),
+    achieved is (n x 4) kcal / protein / carbs / fat grams, ok flags the
+    rows within tolerance, slots are the meal picks from diet_logic.
+    """
+    calories = np.asarray(calories, dtype=np.float64)
+    diet_types = list(diet_types)
+
+    valid = np.isfinite(calories) & (calories > 0)
+    if not valid.all():
+        servings = np.zeros((len(calories), len(FOODS)))
+        achieved = np.zeros((len(calories), 4))
+        ok = np.zeros(len(calories), dtype=bool)
+        slots = [[] for _ in range(len(calories))]
+
+        rows = np.flatnonzero(valid)
+        if len(rows):
+            solved = solve_batch(calories[rows], [diet_types[i] for i in rows])
+            servings[rows], achieved[rows], ok[rows] = solved[:3]
+            for i, meals in zip(rows, solved[3]):
+                slots[i] = meals
+        return servings, achieved, ok, slots
+
+    lower, upper, slots = _bounds(calories, diet_types)
+
+    servings = _fista(calories, lower, upper)
+
+    # Keep the largest snacks only, then re-solve with the others removed
+    snack_kcal = servings[:, _SNACK_COLS] * NUTRIENTS[_SNACK_COLS, 0]
+    dropped = np.argsort(-snack_kcal, axis=1)[:, MAX_SNACKS:]
+    snack_upper = upper[:, _SNACK_COLS]
+    np.put_along_axis(snack_upper, dropped, 0.0, axis=1)
+    upper[:, _SNACK_COLS] = snack_upper
+
+    servings = _round_and_repair(_fista(calories, lower, upper), calories, lower, upper)
+    achieved = servings @ NUTRIENTS
+
+    macro_kcal = achieved[:, 1:] * np.array([KCAL_PER_GRAM[m] for m in ("Protein", "Carbs", "Fats")])
+    shares = macro_kcal / macro_kcal.sum(axis=1, keepdims=True)
+    target_shares = np.array(list(MACRO_SPLIT.values()))
+
+    ok = (
+        (np.abs(achieved[:, 0] / calories - 1) <= CALORIE_TOLERANCE)
+        & (np.abs(shares - target_shares) <= SHARE_TOLERANCE).all(axis=1)
+    )
+    return servings, achieved, ok, slots
+
+
+def macro_targets(calories):
+    # NaN compares False, so it is treated like a zero target
+    calories = calories if calories > 0 else 0
+    targets = {"Calories": int(calories)}
+    for macro, share in MACRO_SPLIT.items():
+        targets[macro] = round(calories * share / KCAL_PER_GRAM[macro])
+    return targets
+
+
+def solve_meal_plan(calories, diet_type):
+    """
+    Portions for one profile:
+    {"portions": [(slot, food, servings)], "targets": {...}, "achieved": {...},
+     "within_tolerance": bool, "in_range": bool}
+    """
+    servings, achieved, ok, slots = solve_batch([calories], [diet_type])
+    servings, achieved = servings[0], achieved[0]
+
+    portions = []
+    for slot, base, main in slots[0]:
+        for food in (base, main):
+            portions.append((slot, food.name, float(servings[FOOD_INDEX[food.name]])))
+
+    for j in np.flatnonzero(_SNACKS.get(diet_type, _SNACKS["Non-Vegetarian"])):
+        if servings[j] > 0:
+            portions.append(("Snack", FOODS[j].name, float(servings[j])))
+
+    return {
+        "portions": portions,
+        "targets": macro_targets(calories),
+        "achieved": {
+            "Calories": int(round(achieved[0])),
+            "Protein": int(round(achieved[1])),
+            "Carbs": int(round(achieved[2])),
+            "Fats": int(round(achieved[3]))
+        },
+        "within_tolerance": bool(ok[0]),
+        "in_range": bool(SUPPORTED_CALORIES[0] <= calories <= SUPPORTED_CALORIES[1])
+    }
+
+
+def format_portions(solution):
+    """One "Slot: 1.5 × Food + 1 × Food" line per meal slot, snacks last."""
+    by_slot = {}
+    for slot, food, servings in solution["portions"]:
+        by_slot.setdefault(slot, []).append(f"{servings:g} × {food}")
+    return [f"{slot}: {' + '.join(items)}" for slot, items in by_slot.items()]
@@ -0,0 +1,326 @@
+"""
+Lightweight in-process instrumentation: counters, latency histograms,
+Prometheus / JSON export and an opt-in sampling profiler for slow page runs.
+
+Environment:
+    METRICS_ENABLED=0            turn recording off entirely
+    METRICS_FILE=path.json       periodically write a JSON snapshot
+    METRICS_FLUSH_SECONDS=15     snapshot interval
+    METRICS_PORT=9464            serve Prometheus text at http://host:port/metrics
+    METRICS_HOST=127.0.0.1       address the metrics endpoint binds to (0.0.0.0 = all interfaces)
+    METRICS_PROFILE_SLOW_MS=800  sample page runs, keep stacks of runs slower than this
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_FILE = os.getenv("METRICS_FILE")
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "15"))
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+PROFILE_SLOW_MS = os.getenv("METRICS_PROFILE_SLOW_MS")
+PROFILE_DIR = os.getenv("METRICS_PROFILE_DIR", os.path.join(BASE_DIR, "data", "profiles"))
+
+# Percentiles come from the most recent samples of each series
+HISTOGRAM_WINDOW = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {"count": self.count, "sum": round(self.total, 6)}
+        for q in QUANTILES:
+            value = ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+            summary[f"p{int(q * 100)}"] = round(value, 6)
+        return summary
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.summary()}
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+
+registry = Registry()
+
+
+# ---------------------------------------
+# RECORDING API
+def increment(name, value=1, **labels):
+    if ENABLED:
+        registry.increment(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        registry.observe(name, value, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    """Decorator form of timer()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------
+# EXPORT
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render_prometheus():
+    snapshot = registry.snapshot()
+    lines = []
+
+    seen = set()
+    for counter in snapshot["counters"]:
+        if counter["name"] not in seen:
+            lines.append(f"# TYPE {counter['name']} counter")
+            seen.add(counter["name"])
+        lines.append(f"{counter['name']}{_format_labels(counter['labels'])} {counter['value']}")
+
+    for histogram in snapshot["histograms"]:
+        name, labels = histogram["name"], histogram["labels"]
+        if name not in seen:
+            lines.append(f"# TYPE {name} summary")
+            seen.add(name)
+        for q in QUANTILES:
+            quantile = _format_labels(labels, {"quantile": q})
+            lines.append(f"{name}{quantile} {histogram[f'p{int(q * 100)}']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=None):
+    path = path or METRICS_FILE
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except OSError:
+            pass
+
+
+def start_metrics_server(port, host=None):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    # Local only unless METRICS_HOST says otherwise
+    server = ThreadingHTTPServer((host or METRICS_HOST, int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Starts the file flusher / HTTP endpoint configured by env, once per process."""
+    global _exporters_started
+
+    if _exporters_started or not ENABLED:
+        return
+
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+        if METRICS_FILE:
+            threading.Thread(
+                target=_flush_loop, args=(METRICS_FILE, FLUSH_SECONDS),
+                name="metrics-flush", daemon=True
+            ).start()
+
+        if METRICS_PORT:
+            try:
+                start_metrics_server(METRICS_PORT)
+            except OSError:
+                # Another worker process already serves this port
+                pass
+
+
+# ---------------------------------------
+# SAMPLING PROFILER (OPT-IN)
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval=0.005, max_seconds=60):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        # Collapsed-stack format, readable by flamegraph.pl / speedscope
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# ---------------------------------------
+# PAGE RUNS
+_page_runs = threading.local()
+
+
+def begin_page_run(page):
+    """
+    Call at the top of a page script; end_page_run() at the bottom.
+    Runs cut short by st.stop() are not timed.
+    """
+    if not ENABLED:
+        return
+
+    start_exporters()
+
+    previous = getattr(_page_runs, "profiler", None)
+    if previous is not None:
+        previous.stop()
+
+    _page_runs.page = page
+    _page_runs.start = time.perf_counter()
+    _page_runs.profiler = (
+        SamplingProfiler(threading.get_ident()).start() if PROFILE_SLOW_MS else None
+    )
+
+
+def end_page_run():
+    page = getattr(_page_runs, "page", None)
+    if page is None:
+        return
+
+    elapsed = time.perf_counter() - _page_runs.start
+    observe("page_run_seconds", elapsed, page=page)
+
+    profiler = _page_runs.profiler
+    if profiler is not None:
+        profiler.stop()
+        if elapsed * 1000 >= float(PROFILE_SLOW_MS) and profiler.stacks:
+            increment("page_slow_runs_total", page=page)
+            profiler.dump(os.path.join(
+                PROFILE_DIR, f"{page}-{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms.txt"
+            ))
+
+    _page_runs.page = None
+    _page_runs.profiler = None
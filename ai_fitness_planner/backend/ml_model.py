@@ -1,5 +1,16 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(BASE_DIR, "data", "calorie_model.json")
+
+# Bump when the training data or feature set changes
+MODEL_VERSION = 1
+FEATURES = ["age", "weight", "height", "activity"]
 
 # Dummy training dataset (simulated but realistic)
 data = {
@@ -10,13 +21,122 @@ data = {
     "calories": [2000, 2200, 2500, 2600, 2800, 3000]
 }
 
-df = pd.DataFrame(data)
 
-X = df[["age", "weight", "height", "activity"]]
-y = df["calories"]
+class CaloriePredictor:
+    """Linear calorie model evaluated with plain numpy (no sklearn at serving time)."""
+
+    def __init__(self, coef, intercept, version=MODEL_VERSION):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.version = version
+
+    def predict_one(self, age, weight, height, activity):
+        # 1-D dot keeps results bit-identical to the old sklearn single-row path
+        row = np.array([age, weight, height, activity], dtype=np.float64)
+        return float(np.dot(row, self.coef) + self.intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "features": FEATURES,
+            "coef": [float(c) for c in self.coef],
+            "intercept": self.intercept
+        }
+
+
+# -------------------------------------------------
+# TRAINING / ARTIFACT
+def train_model():
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
+    df = pd.DataFrame(data)
+
+    X = df[FEATURES]
+    y = df["calories"]
+
+    model = LinearRegression()
+    model.fit(X, y)
+
+    return CaloriePredictor(model.coef_, model.intercept_)
+
+
+def save_model(predictor, path=MODEL_PATH):
+    # Written next to the target and renamed, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(predictor.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
 
-model = LinearRegression()
-model.fit(X, y)
+def load_model(path=MODEL_PATH):
+    with open(path) as f:
+        artifact = json.load(f)
 
+    if artifact.get("version") != MODEL_VERSION or artifact.get("features") != FEATURES:
+        raise ValueError(f"Calorie model artifact {path} is out of date.")
+
+    return CaloriePredictor(artifact["coef"], artifact["intercept"], artifact["version"])
+
+
+# Loaded once per process from the shipped artifact (rebuilt with
+# `python -m backend.ml_model`); refit in memory if it is missing or stale
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    _model = load_model(MODEL_PATH)
+                except (OSError, ValueError, KeyError):
+                    # Not written back: the app directory may be read-only
+                    _model = train_model()
+
+    return _model
+
+
+# -------------------------------------------------
+# PREDICTION
 def predict_calories(age, weight, height, activity):
-    return int(model.predict([[age, weight, height, activity]])[0])
+    return int(get_model().predict_one(age, weight, height, activity))
+
+
+def _feature_matrix(features):
+    # DataFrame or dict of columns
+    if hasattr(features, "keys"):
+        return np.column_stack([
+            np.asarray(features[name], dtype=np.float64) for name in FEATURES
+        ])
+
+    X = np.asarray(features, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise ValueError(f"Expected an (n, {len(FEATURES)}) array of {', '.join(FEATURES)}.")
+    return X
+
+
+def predict_calories_batch(features):
+    """
+    Vectorized predict_calories.
+    features: DataFrame / dict with age, weight, height, activity columns,
+    or an (n, 4) array in that order.
+    Returns a float array truncated like int(); rows with NaN inputs stay NaN.
+    """
+    return np.trunc(get_model().predict(_feature_matrix(features)))
+
+
+if __name__ == "__main__":
+    predictor = train_model()
+    save_model(predictor)
+    print(f"Saved calorie model v{predictor.version} to {MODEL_PATH}")
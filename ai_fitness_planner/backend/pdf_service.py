@@ -0,0 +1,481 @@
+"""
+PDF export: single plans and the combined report.
+
+Documents are rendered by worker processes (python -m backend.pdf_service,
+talking pickled requests over their pipes), so ReportLab never holds the
+GIL of the Streamlit worker. The *_async functions return the cached
+bytes at once or a Future of the bytes; the blocking functions wait on
+that Future (sleeping, not computing). Identical requests in flight share
+one render.
+
+Plain subprocesses rather than multiprocessing: Streamlit swaps
+sys.modules["__main__"] for the page being run, which spawned
+multiprocessing children would re-import.
+
+Environment:
+    PDF_WORKERS=2                render processes (0 = a background thread instead)
+    PDF_TIMEOUT_SECONDS=120      how long a render may take, and the blocking functions wait
+    PDF_CACHE_MAX_BYTES=33554432 rendered-bytes LRU size
+"""
+import atexit
+import hashlib
+import io
+import json
+import os
+import pickle
+import queue
+import select
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from xml.sax.saxutils import escape
+
+from backend import metrics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bump whenever the layout below changes, so cached PDFs are not reused
+TEMPLATE_VERSION = 2
+MAX_CACHE_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+WORKERS = int(os.getenv("PDF_WORKERS", str(min(2, os.cpu_count() or 1))))
+TIMEOUT_SECONDS = float(os.getenv("PDF_TIMEOUT_SECONDS", "120"))
+
+WRAP_CHARS = 115       # safe wrap for A4
+LINES_PER_BLOCK = 60   # about one page of Normal text
+
+
+# ---------------------------------------
+# PDF GENERATOR (SAFE FOR ANY AI TEXT)
+def _document(buffer):
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=30,
+        leftMargin=30,
+        topMargin=30,
+        bottomMargin=30
+    )
+
+
+def _text_flowables(text, style):
+    """
+    Wrapped text in page-sized Preformatted blocks. ReportLab lays out one
+    block (about a page) at a time instead of splitting a single block
+    holding the whole text over and over. Preformatted never reads markup,
+    so any AI text is safe.
+    """
+    from reportlab.platypus import Preformatted
+
+    lines = []
+    for line in text.split("\n"):
+        lines.extend(textwrap.wrap(line, WRAP_CHARS) or [""])
+
+    return [
+        Preformatted("\n".join(lines[i:i + LINES_PER_BLOCK]), style)
+        for i in range(0, len(lines), LINES_PER_BLOCK)
+    ]
+
+
+def build_plan_pdf(title, explanation):
+    # ReportLab is only imported when a PDF is actually rendered
+    from reportlab.platypus import Preformatted, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    buffer = io.BytesIO()
+    styles = getSampleStyleSheet()
+
+    story = [Preformatted(title, styles["Title"]), Spacer(1, 20)]
+    story += _text_flowables(explanation, styles["Normal"])
+
+    _document(buffer).build(story)
+    return buffer.getvalue()
+
+
+def _progress_chart(rows):
+    """Line chart of (date, weight) rows."""
+    from datetime import date, timedelta
+
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    first = date.fromisoformat(rows[0][0])
+    points = [((date.fromisoformat(day) - first).days, weight) for day, weight in rows]
+
+    drawing = Drawing(530, 220)
+    chart = LinePlot()
+    chart.x, chart.y, chart.width, chart.height = 40, 30, 470, 170
+    chart.data = [points]
+    chart.lines[0].strokeColor = colors.HexColor("#1f77b4")
+    chart.xValueAxis.labelTextFormat = lambda value: (first + timedelta(days=int(value))).isoformat()
+    chart.xValueAxis.maximumTicks = 6
+    chart.yValueAxis.labelTextFormat = "%.0f kg"
+    drawing.add(chart)
+    return drawing
+
+
+def build_report_pdf(title, sections, progress_rows=()):
+    """
+    One document with a section per (heading, text) pair and, with at
+    least two (date, weight) rows, a weight chart at the end.
+    """
+    from reportlab.platypus import Paragraph, Preformatted, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    buffer = io.BytesIO()
+    styles = getSampleStyleSheet()
+
+    story = [Preformatted(title, styles["Title"]), Spacer(1, 20)]
+    for heading, text in sections:
+        if not text:
+            continue
+        story.append(Paragraph(escape(heading), styles["Heading2"]))
+        story += _text_flowables(text, styles["Normal"])
+        story.append(Spacer(1, 16))
+
+    rows = [(day, weight) for day, weight in progress_rows if day and weight is not None]
+    if len(rows) >= 2:
+        story.append(Paragraph("Weight Progress", styles["Heading2"]))
+        story.append(_progress_chart(rows))
+
+    _document(buffer).build(story)
+    return buffer.getvalue()
+
+
+BUILDERS = {
+    "plan": build_plan_pdf,
+    "report": build_report_pdf,
+}
+
+
+def _render(kind, args):
+    # Runs in a pool process; the timing is reported back to the parent
+    start = time.perf_counter()
+    pdf = BUILDERS[kind](*args)
+    return pdf, time.perf_counter() - start
+
+
+def _warm():
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    getSampleStyleSheet()
+
+
+# ---------------------------------------
+# RENDERED-BYTES CACHE
+def pdf_cache_key(title, explanation):
+    raw = f"{TEMPLATE_VERSION}\x1f{title}\x1f{explanation}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """LRU of rendered PDFs, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._items.get(key)
+            if pdf is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return pdf
+
+    def put(self, key, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+
+            self._items[key] = pdf
+            self.total_bytes += len(pdf)
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Shared by every session in the process
+pdf_cache = PdfCache()
+
+
+# ---------------------------------------
+# RENDER POOL
+class RenderTimeout(RuntimeError):
+    pass
+
+
+class RenderWorker:
+    """One render process; a request and its reply are pickled over the pipes."""
+
+    command = [sys.executable, "-m", "backend.pdf_service"]
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            self.command, cwd=BASE_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+
+    def render(self, kind, args, timeout=None):
+        pickle.dump((kind, args), self.process.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+        self.process.stdin.flush()
+
+        # A reply is read whole, so the buffer is empty and select sees the pipe
+        timeout = TIMEOUT_SECONDS if timeout is None else timeout
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise RenderTimeout("PDF rendering timed out. Please try again.")
+
+        status, value = pickle.load(self.process.stdout)
+        if status == "error":
+            raise RuntimeError(f"PDF rendering failed: {value}")
+        return value
+
+    def close(self, kill=False):
+        if kill:
+            self.process.kill()
+            self.process.wait()
+            return
+        try:
+            # The worker exits when its input closes
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+class RenderPool:
+    """
+    Up to `size` render processes, driven by as many threads. The threads
+    only wait on pipes, so they hold no GIL while a document renders.
+    A process that has not replied within TIMEOUT_SECONDS is killed and
+    replaced. With size 0 documents are rendered on one background thread
+    instead, without that deadline.
+    """
+
+    def __init__(self, size=WORKERS):
+        self.size = size
+        self._threads = ThreadPoolExecutor(max_workers=max(size, 1), thread_name_prefix="pdf")
+        self._idle = queue.LifoQueue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = RenderWorker()
+                self._workers.append(worker)
+                return worker
+
+        try:
+            return self._idle.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            raise RenderTimeout("PDF rendering timed out. Please try again.")
+
+    def _discard(self, worker, kill=False):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.close(kill)
+
+    def _run(self, kind, args, deadline):
+        if self.size == 0:
+            return _render(kind, args)
+
+        # Time spent queued for a process counts against the deadline
+        worker = self._acquire(deadline - time.monotonic())
+        try:
+            result = worker.render(kind, args, max(deadline - time.monotonic(), 0))
+        except RenderTimeout:
+            # A hung process would hold its slot forever; a new one replaces it
+            self._discard(worker, kill=True)
+            raise
+        except RuntimeError:
+            self._idle.put(worker)
+            raise
+        except (EOFError, OSError, pickle.UnpicklingError):
+            # The process died mid-request; the next request starts a new one
+            self._discard(worker)
+            raise RuntimeError("The PDF worker exited unexpectedly. Please try again.")
+
+        self._idle.put(worker)
+        return result
+
+    def submit(self, kind, args):
+        """Future of (pdf bytes, render seconds); fails with RenderTimeout after TIMEOUT_SECONDS."""
+        return self._threads.submit(self._run, kind, args, time.monotonic() + TIMEOUT_SECONDS)
+
+    def warm(self):
+        """Starts every render process now; each imports ReportLab on startup."""
+        with self._lock:
+            while len(self._workers) < self.size:
+                worker = RenderWorker()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def close(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_render_pool():
+    global _pool, _pool_pid
+
+    # Pipes and threads do not survive a fork, so each process has its own pool
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool, _pool_pid = RenderPool(), os.getpid()
+
+    return _pool
+
+
+def warm_pool():
+    get_render_pool().warm()
+
+
+@atexit.register
+def _close_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+
+
+def _finish(key, handle, future):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+    try:
+        pdf, seconds = future.result()
+    except BaseException as exc:
+        metrics.increment("pdf_render_errors_total")
+        handle.set_exception(exc)
+        return
+
+    metrics.observe("pdf_render_seconds", seconds)
+    pdf_cache.put(key, pdf)
+    handle.set_result(pdf)
+
+
+def _render_async(key, kind, args):
+    """Cached bytes, or a Future that resolves to the bytes."""
+    pdf = pdf_cache.get(key)
+    metrics.increment("pdf_cache_lookups_total", result="miss" if pdf is None else "hit")
+    if pdf is not None:
+        return pdf
+
+    with _inflight_lock:
+        handle = _inflight.get(key)
+        if handle is not None:
+            return handle
+
+        handle = _inflight[key] = Future()
+
+    try:
+        future = get_render_pool().submit(kind, args)
+    except BaseException as exc:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        handle.set_exception(exc)
+        return handle
+
+    future.add_done_callback(partial(_finish, key, handle))
+    return handle
+
+
+def _wait(result):
+    # The render's own deadline resolves the Future; the margin only covers the handoff
+    return result if isinstance(result, bytes) else result.result(timeout=TIMEOUT_SECONDS + 5)
+
+
+def render_plan_pdf_async(title, explanation):
+    return _render_async(pdf_cache_key(title, explanation), "plan", (title, explanation))
+
+
+def render_plan_pdf(title, explanation):
+    return _wait(render_plan_pdf_async(title, explanation))
+
+
+def render_report_pdf_async(title, sections, progress_rows=()):
+    sections = [tuple(section) for section in sections]
+    progress_rows = [tuple(row) for row in progress_rows]
+    key = pdf_cache_key(title, json.dumps([sections, progress_rows]))
+    return _render_async(key, "report", (title, sections, progress_rows))
+
+
+def render_report_pdf(title, sections, progress_rows=()):
+    return _wait(render_report_pdf_async(title, sections, progress_rows))
+
+
+def get_pdf_cache_stats():
+    return pdf_cache.stats()
+
+
+# ---------------------------------------
+# WORKER PROCESS
+def _serve(requests, replies):
+    while True:
+        try:
+            kind, args = pickle.load(requests)
+        except EOFError:
+            return
+
+        try:
+            reply = ("ok", _render(kind, args))
+        except Exception as exc:
+            reply = ("error", f"{type(exc).__name__}: {exc}")
+
+        pickle.dump(reply, replies, protocol=pickle.HIGHEST_PROTOCOL)
+        replies.flush()
+
+
+if __name__ == "__main__":
+    # Replies own the real stdout; anything printed goes to stderr
+    replies = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    _warm()
+    _serve(sys.stdin.buffer, replies)
@@ -0,0 +1,288 @@
+"""
+Profile bucketing and pre-generated AI plans.
+
+Profiles that fall in the same bucket (age band, gender, BMI band, goal;
+diet buckets also diet, activity and a calorie band) share one stored
+plan. A bucket has exactly the fields its prompt uses, so one prompt is
+one bucket in the plan store and its hit rate.
+The prompt describes the bucket's bands rather than a made-up person, and
+a diet prompt carries the user's own calorie target, so a shared diet plan
+is never more than one calorie band off. Plans generated for a bucket are
+kept in the plan_store table, so later requests for that bucket are a
+lookup.
+
+    python -m backend.plan_buckets warm --top 50               # most requested buckets still missing
+    python -m backend.plan_buckets warm --cohort members.csv   # most common buckets in a cohort
+    python -m backend.plan_buckets report                      # hit rate per bucket
+
+Environment:
+    PLAN_BUCKETS_ENABLED=0       prompt with the exact profile instead
+    PLAN_BUCKET_AGE_YEARS=10     age band width
+    PLAN_BUCKET_BMI_WIDTH=2.5    BMI band width
+    PLAN_BUCKET_CALORIE_WIDTH=100  daily calorie band width (diet plans)
+"""
+import argparse
+import hashlib
+import math
+import os
+import sys
+from collections import Counter
+
+from backend import database, metrics
+from backend.calculations import calculate_bmi, calculate_bmr, calculate_daily_calories
+from backend.diet_logic import adjust_calories
+from backend.llm_cache import normalize_prompt
+from backend.prompts import diet_bucket_prompt, diet_prompt, workout_bucket_prompt, workout_prompt
+
+ENABLED = os.getenv("PLAN_BUCKETS_ENABLED", "1") != "0"
+AGE_BAND_YEARS = int(os.getenv("PLAN_BUCKET_AGE_YEARS", "10"))
+BMI_BAND_WIDTH = float(os.getenv("PLAN_BUCKET_BMI_WIDTH", "2.5"))
+CALORIE_BAND_WIDTH = int(os.getenv("PLAN_BUCKET_CALORIE_WIDTH", "100"))
+
+PLAN_TYPES = ("workout", "diet")
+# Fields in a bucket key per plan type
+KEY_FIELDS = {"workout": 4, "diet": 7}
+
+
+# -------------------------------------------------
+# BUCKETS
+def _band(value, width):
+    low = math.floor(value / width) * width
+    return low, low + width
+
+
+def bucket_for(user, bmi, calories=None):
+    """Workout bucket key; with calories, the diet bucket key (diet, activity, calorie band)."""
+    age_low, age_high = _band(user["age"], AGE_BAND_YEARS)
+    bmi_low, bmi_high = _band(bmi, BMI_BAND_WIDTH)
+
+    fields = [
+        f"{age_low}-{age_high - 1}",
+        user["gender"],
+        f"{bmi_low:g}-{bmi_high:g}",
+        user["goal"],
+    ]
+    if calories is not None:
+        kcal_low, kcal_high = _band(calories, CALORIE_BAND_WIDTH)
+        fields += [user["diet"], user["activity"], f"{kcal_low}-{kcal_high - 1}kcal"]
+
+    return "|".join(fields)
+
+
+def is_current(plan_type, bucket):
+    # Keys recorded under an older bucket layout cannot be turned into a prompt
+    return len(bucket.split("|")) == KEY_FIELDS.get(plan_type)
+
+
+def bucket_bands(bucket):
+    """
+    Field -> band text for a bucket key. Workout keys have no diet,
+    activity or calories (None); "calories" is the calorie band's middle.
+    """
+    ages, gender, bmis, goal, *rest = bucket.split("|")
+    bands = {
+        "age": ages,
+        "gender": gender,
+        "bmi": bmis,
+        "goal": goal,
+        "diet": None,
+        "activity": None,
+        "calories": None,
+    }
+
+    if len(rest) == 3:
+        kcal_low, kcal_high = (int(v) for v in rest[2].removesuffix("kcal").split("-"))
+        bands.update(diet=rest[0], activity=rest[1], calories=(kcal_low + kcal_high + 1) // 2)
+    elif rest:
+        raise ValueError(f"Unknown bucket layout: {bucket}")
+
+    return bands
+
+
+def _diet_calories(user):
+    # Same target as the User Details page, for profiles without one
+    bmr = calculate_bmr(user["gender"], user["weight"], user["height"], user["age"])
+    return int(adjust_calories(user["goal"], calculate_daily_calories(bmr, user["activity"])))
+
+
+def build_prompt(plan_type, user, bmi, calories=None):
+    if plan_type == "workout":
+        return workout_prompt(user, bmi)
+    if plan_type == "diet":
+        return diet_prompt(user, calories if calories is not None else _diet_calories(user))
+    raise ValueError(f"Unknown plan type: {plan_type}")
+
+
+def bucket_prompt(plan_type, bucket, calories=None):
+    """Prompt for a bucket; a diet prompt uses the band's middle unless calories is given."""
+    bands = bucket_bands(bucket)
+    if plan_type == "workout":
+        return workout_bucket_prompt(bands)
+    if plan_type == "diet":
+        if bands["calories"] is None:
+            raise ValueError(f"Diet bucket without a calorie band: {bucket}")
+        return diet_bucket_prompt(bands, calories if calories is not None else bands["calories"])
+    raise ValueError(f"Unknown plan type: {plan_type}")
+
+
+def canonical_prompt(plan_type, user, bmi, calories=None):
+    """
+    (bucket, prompt) for a profile. With bucketing disabled the bucket is
+    None and the prompt is built from the exact profile.
+    """
+    if not ENABLED:
+        return None, build_prompt(plan_type, user, bmi, calories)
+
+    if plan_type == "diet":
+        calories = calories if calories is not None else _diet_calories(user)
+        bucket = bucket_for(user, bmi, calories)
+    else:
+        bucket = bucket_for(user, bmi)
+    return bucket, bucket_prompt(plan_type, bucket, calories)
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+def template_hash(plan_type, bucket):
+    # Same for every profile in the bucket; changes with the prompt template
+    return prompt_hash(bucket_prompt(plan_type, bucket))
+
+
+# -------------------------------------------------
+# STORE
+def find_plan(bucket, plan_type):
+    """Stored plan for the bucket, or None. Counts a hit or miss for the bucket."""
+    if bucket is None:
+        return None
+
+    row = database.get_stored_plan(bucket, plan_type)
+    # A plan stored for an older prompt template is stale
+    hit = row is not None and row[0] == template_hash(plan_type, bucket)
+
+    database.record_plan_lookup(bucket, plan_type, hit)
+    metrics.increment("plan_store_lookups_total", plan_type=plan_type, result="hit" if hit else "miss")
+
+    return row[1] if hit else None
+
+
+def save_plan(bucket, plan_type, plan):
+    """Stores a complete plan for the bucket; truncated plans are ignored."""
+    from backend.llm_service import is_complete
+
+    if bucket is None or not is_complete(plan):
+        return False
+
+    database.save_stored_plan(bucket, plan_type, template_hash(plan_type, bucket), plan)
+    return True
+
+
+def generate_plan(plan_type, user, bmi, calories=None):
+    """Blocking path: the stored plan for the profile's bucket, generated on a miss."""
+    from backend.llm_service import generate_response
+
+    bucket, prompt = canonical_prompt(plan_type, user, bmi, calories)
+
+    plan = find_plan(bucket, plan_type)
+    if plan is None:
+        plan = generate_response(prompt, plan_type=plan_type)
+        save_plan(bucket, plan_type, plan)
+    return plan
+
+
+# -------------------------------------------------
+# WARM-UP
+def cohort_buckets(path):
+    """(plan_type, bucket) counts over a cohort file (CSV or Parquet)."""
+    from backend.bulk_planner import read_cohort
+
+    counts = Counter()
+    for chunk in read_cohort(path):
+        for user in chunk.to_dict("records"):
+            bmi = calculate_bmi(user["weight"], user["height"])
+            if bmi is not None:
+                counts["workout", bucket_for(user, bmi)] += 1
+                counts["diet", bucket_for(user, bmi, _diet_calories(user))] += 1
+    return counts
+
+
+def requested_buckets():
+    """Request counts per (plan_type, bucket), from the lookup stats."""
+    counts = Counter()
+    for bucket, plan_type, hits, misses, _ in database.get_plan_bucket_stats():
+        if not is_current(plan_type, bucket):
+            continue
+        counts[plan_type, bucket] += hits + misses
+    return counts
+
+
+def warm(keys, force=False, log=sys.stderr):
+    """Generates and stores a plan per (plan_type, bucket). Returns the number stored."""
+    from backend.llm_service import generate_response
+
+    stored = 0
+    for plan_type, bucket in keys:
+        row = database.get_stored_plan(bucket, plan_type)
+        if row is not None and row[0] == template_hash(plan_type, bucket) and not force:
+            continue
+
+        try:
+            plan = generate_response(bucket_prompt(plan_type, bucket), plan_type=plan_type)
+        except Exception as exc:
+            log.write(f"{bucket} {plan_type}: {exc}\n")
+            continue
+
+        if save_plan(bucket, plan_type, plan):
+            stored += 1
+        else:
+            log.write(f"{bucket} {plan_type}: truncated response, not stored\n")
+
+    return stored
+
+
+def report(limit=None, out=sys.stdout):
+    rows = database.get_plan_bucket_stats(limit)
+    total_hits = sum(r[2] for r in rows)
+    total = sum(r[2] + r[3] for r in rows)
+
+    out.write(f"{'bucket':<80} {'type':<8} {'hits':>6} {'misses':>6} {'hit rate':>8}  stored\n")
+    for bucket, plan_type, hits, misses, is_stored in rows:
+        rate = hits / (hits + misses) if hits + misses else 0.0
+        out.write(
+            f"{bucket:<80} {plan_type:<8} {hits:>6} {misses:>6} {rate:>8.1%}  {'yes' if is_stored else 'no'}\n"
+        )
+
+    if total:
+        out.write(f"\noverall hit rate: {total_hits / total:.1%} over {total} lookups\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate AI plans per profile bucket")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm_cmd = commands.add_parser("warm", help="generate plans for the most common buckets")
+    warm_cmd.add_argument("--cohort", help="count buckets in this CSV / Parquet file instead of lookup stats")
+    warm_cmd.add_argument("--top", type=int, default=50, help="number of buckets to warm")
+    warm_cmd.add_argument("--force", action="store_true", help="regenerate plans already stored")
+
+    report_cmd = commands.add_parser("report", help="hit rate per bucket")
+    report_cmd.add_argument("--top", type=int, default=None)
+
+    args = parser.parse_args(argv)
+    database.create_table()
+
+    if args.command == "report":
+        report(args.top)
+        return 0
+
+    counts = cohort_buckets(args.cohort) if args.cohort else requested_buckets()
+    keys = [key for key, _ in counts.most_common(args.top)]
+    stored = warm(keys, force=args.force)
+
+    sys.stderr.write(f"warmed {len(keys)} buckets, stored {stored} plans\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
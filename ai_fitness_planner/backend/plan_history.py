@@ -0,0 +1,66 @@
+"""
+Server-side plan history.
+
+Every plan a user is shown is stored once in the plan_history table,
+zlib-compressed. Session state only keeps the plan's id; the text is read
+back through a small in-process LRU (plan bodies never change, so the id
+is a safe cache key). A returning user (same ?uid=) gets their last AI
+plan for the same prompt back without a new AI request.
+
+Environment:
+    PLAN_TEXT_CACHE_SIZE=128   decompressed plans kept in memory
+    PLAN_HISTORY_PAGE_SIZE=10  rows per history page
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+from backend import database, metrics
+from backend.plan_buckets import prompt_hash
+
+CACHE_SIZE = int(os.getenv("PLAN_TEXT_CACHE_SIZE", "128"))
+PAGE_SIZE = int(os.getenv("PLAN_HISTORY_PAGE_SIZE", "10"))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def plan_text(plan_id):
+    if plan_id is None:
+        return None
+    return database.get_plan_history_body(plan_id)
+
+
+def save(user_id, plan_type, plan, source, prompt=None):
+    """Stores the plan for the user (once per distinct text) and returns its id."""
+    digest = hashlib.sha256(plan.encode("utf-8")).hexdigest()
+    plan_id, created = database.save_plan_history(
+        user_id, plan_type, source, prompt_hash(prompt) if prompt else None, digest, plan
+    )
+    metrics.increment("plan_history_saves_total", plan_type=plan_type, result="new" if created else "duplicate")
+    return plan_id
+
+
+def remember(session_state, key, user_id, plan_type, plan, source, prompt=None):
+    """Points session_state[key] at the stored copy of plan; a no-op when it already does."""
+    plan_id = session_state.get(key)
+    if plan_id is None or plan_text(plan_id) != plan:
+        session_state[key] = save(user_id, plan_type, plan, source, prompt)
+    return session_state[key]
+
+
+def active_text(session_state, key):
+    return plan_text(session_state.get(key))
+
+
+def latest_ai_plan(user_id, plan_type, prompt):
+    """Id of the user's newest AI plan for this prompt, from any earlier session."""
+    return database.latest_plan_history_id(user_id, plan_type, "ai", prompt_hash(prompt))
+
+
+def page(user_id, plan_type=None, cursor=None):
+    """(rows, next_cursor); next_cursor is None on the last page."""
+    # One extra row tells whether an older page exists
+    rows = database.get_plan_history(user_id, plan_type, before=cursor, limit=PAGE_SIZE + 1)
+    if len(rows) <= PAGE_SIZE:
+        return rows, None
+    rows = rows[:PAGE_SIZE]
+    return rows, (rows[-1][3], rows[-1][0])
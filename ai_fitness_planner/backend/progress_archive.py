@@ -0,0 +1,430 @@
+"""
+Columnar cold storage for closed months of progress data.
+
+Compaction moves every month before the hot window out of the progress
+and progress_daily tables into one Parquet file per kind and month:
+
+    <archive dir>/raw/month=2024-03/part-<ns>.parquet     one row per weigh-in
+    <archive dir>/daily/month=2024-03/part-<ns>.parquet   one row per user and day
+
+Files are sorted by user and date, with typed date and weight columns.
+A read opens only the months the user has archived (partition skipping),
+only the columns it needs, and only row groups whose user_id range can
+match. The progress_archive table is the manifest of live files; it is
+changed in the same transaction that deletes the compacted hot rows.
+Rows written later for an archived month stay in SQLite and are merged
+on read, or folded into the month's file by the next compaction.
+
+    python -m backend.progress_archive compact                  # months before the hot window
+    python -m backend.progress_archive compact --hot-months 0   # every closed month
+    python -m backend.progress_archive stats
+
+Environment:
+    FITNESS_ARCHIVE_DIR              default: progress_archive next to the database
+    FITNESS_ARCHIVE_HOT_MONTHS=3     closed months kept in SQLite
+    FITNESS_ARCHIVE_ROW_GROUP=65536  rows per Parquet row group
+    FITNESS_ARCHIVE_CACHE_USERS=256  users whose archived daily rows are kept in memory
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from backend import database, metrics
+
+HOT_MONTHS = int(os.getenv("FITNESS_ARCHIVE_HOT_MONTHS", "3"))
+ROW_GROUP_ROWS = int(os.getenv("FITNESS_ARCHIVE_ROW_GROUP", "65536"))
+CACHE_USERS = int(os.getenv("FITNESS_ARCHIVE_CACHE_USERS", "256"))
+
+# (column, pyarrow type) per kind
+COLUMNS = {
+    "raw": [
+        ("id", "int64"), ("user_id", "string"), ("date", "date32"), ("weight", "float64"),
+        ("age", "int32"), ("gender", "string"), ("height", "float64"), ("goal", "string"),
+        ("calories", "int32"),
+    ],
+    "daily": [
+        ("user_id", "string"), ("date", "date32"), ("last_weight", "float64"),
+        ("min_weight", "float64"), ("max_weight", "float64"), ("entries", "int32"),
+        ("calories", "int32"),
+    ],
+}
+SORT_KEYS = {"raw": ["user_id", "date", "id"], "daily": ["user_id", "date"]}
+DAILY_VALUES = ["date", "last_weight", "min_weight", "max_weight", "entries", "calories"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401  (registers pyarrow.compute)
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("The progress archive requires pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def schema(kind):
+    pa = _pyarrow()
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMNS[kind]])
+
+
+# -------------------------------------------------
+# READ
+def _scan(kind, parts, columns, user_id=None, start_date=None, end_date=None):
+    """Arrow table of the given columns from the listed archive files."""
+    pa = _pyarrow()
+    ds = pa.dataset
+
+    condition = None
+    if user_id is not None:
+        condition = ds.field("user_id") == user_id
+    for op, value in ((">=", start_date), ("<=", end_date)):
+        if value:
+            bound = pa.scalar(date.fromisoformat(value), pa.date32())
+            term = ds.field("date") >= bound if op == ">=" else ds.field("date") <= bound
+            condition = term if condition is None else condition & term
+
+    dataset = ds.dataset(
+        [os.path.join(database.ARCHIVE_DIR, path) for path in parts],
+        schema=schema(kind), format="parquet"
+    )
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def _iso_dates(table):
+    pa = _pyarrow()
+    return table.column("date").cast(pa.string())
+
+
+@metrics.timed("db_query_seconds", query="archive_read_progress")
+def read_progress(parts, user_id, start_date, end_date, hot):
+    """get_progress() rows: archived rows merged with hot (date, weight, id) rows."""
+    table = _scan("raw", parts, ["id", "date", "weight"], user_id, start_date, end_date)
+
+    cold = zip(
+        _iso_dates(table).to_pylist(),
+        table.column("weight").to_pylist(),
+        table.column("id").to_pylist(),
+    )
+    # ids never repeat, so (date, id) orders rows across both stores
+    merged = sorted([*cold, *hot], key=lambda row: (row[0], row[2]))
+    return [(day, weight) for day, weight, _ in merged]
+
+
+def combine_daily(rows):
+    """
+    Folds (date, last, min, max, entries, calories) rows for the same day,
+    older rows first: extremes and counts add up, the newest last value wins.
+    """
+    days = {}
+    for day, last, low, high, entries, calories in rows:
+        current = days.get(day)
+        if current is None:
+            days[day] = [last, low, high, entries, calories]
+        else:
+            current[0] = last
+            current[1] = low if current[1] is None else min(current[1], low)
+            current[2] = high if current[2] is None else max(current[2], high)
+            current[3] += entries
+            current[4] = calories
+    return [(day, *values) for day, values in sorted(days.items())]
+
+
+def _period(day, bucket):
+    # Same labels as database.BUCKET_EXPRESSIONS
+    if bucket == "week":
+        start = date.fromisoformat(day)
+        return (start - timedelta(days=start.weekday())).isoformat()
+    if bucket == "month":
+        return day[:7] + "-01"
+    return day
+
+
+# Archive files never change in place (a recompacted month gets a new
+# path), so the file list is a safe cache key
+@functools.lru_cache(maxsize=CACHE_USERS)
+def _archived_days(user_id, parts):
+    table = _scan("daily", parts, DAILY_VALUES, user_id)
+    return list(zip(_iso_dates(table).to_pylist(), *(table.column(c).to_pylist() for c in DAILY_VALUES[1:])))
+
+
+@metrics.timed("db_query_seconds", query="archive_read_daily")
+def read_daily(parts, user_id, start_date, end_date, hot, bucket="day"):
+    """get_daily_progress() rows over the archived and hot daily rollups."""
+    low, high = start_date or "", end_date or "9999-12-31"
+    cold = [row for row in _archived_days(user_id, tuple(parts)) if low <= row[0] <= high]
+    days = combine_daily([*cold, *hot])
+
+    periods = {}
+    for day, last, low, high, entries, calories in days:
+        label = _period(day, bucket)
+        current = periods.get(label)
+        if current is None:
+            periods[label] = [last, low, high, entries, calories]
+        else:
+            # Days arrive in order, so the last day of the bucket wins
+            current[0] = last
+            current[1] = min(current[1], low)
+            current[2] = max(current[2], high)
+            current[3] += entries
+            current[4] = calories
+    return [(label, *values) for label, values in periods.items()]
+
+
+@metrics.timed("db_query_seconds", query="archive_scan_progress")
+def scan_progress(start_date=None, end_date=None, columns=("user_id", "date", "weight"), user_id=None):
+    """
+    Raw progress rows of all users (or one) as a typed Arrow table, hot and
+    archived rows together. Only the requested columns are read.
+    """
+    pa = _pyarrow()
+    columns = list(columns)
+    database.flush_progress(user_id)
+
+    conditions, params = ["date IS NOT NULL", "date >= ?", "date <= ?"], [start_date or "", end_date or "9999-12-31"]
+    if user_id is not None:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+
+    with database.get_connection() as conn:
+        parts = database.archive_parts(conn, "raw", start_date, end_date, user_id)
+        rows = conn.execute(
+            f"SELECT {', '.join(columns)} FROM progress WHERE {' AND '.join(conditions)}", params
+        ).fetchall()
+
+    types = schema("raw")
+    values = list(zip(*rows)) if rows else [[] for _ in columns]
+    hot = {}
+    for name, column in zip(columns, values):
+        if name == "date":
+            column = [date.fromisoformat(value) for value in column]
+        hot[name] = pa.array(column, type=types.field(name).type)
+    hot = pa.table(hot)
+
+    if not parts:
+        return hot
+    return pa.concat_tables([_scan("raw", parts, columns, user_id, start_date, end_date), hot])
+
+
+# -------------------------------------------------
+# COMPACTION
+def _shift_month(month, delta):
+    year, number = (int(v) for v in month.split("-"))
+    index = year * 12 + number - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def compaction_cutoff(hot_months=HOT_MONTHS, today=None):
+    """First month that stays hot: the current month is never closed."""
+    current = (today or date.today()).isoformat()[:7]
+    return _shift_month(current, -max(hot_months, 0))
+
+
+def _to_table(kind, frame):
+    pa = _pyarrow()
+    import pandas as pd
+
+    frame = frame.copy()
+    frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    frame = frame.sort_values(SORT_KEYS[kind], kind="stable")
+    return pa.Table.from_pandas(frame[[name for name, _ in COLUMNS[kind]]], schema=schema(kind),
+                                preserve_index=False)
+
+
+def _merge_with_archive(kind, path, hot):
+    """Table for a month: its current archive file (older) followed by the hot rows."""
+    pa = _pyarrow()
+    import pandas as pd
+
+    frames = []
+    if path is not None:
+        frames.append(pa.parquet.read_table(os.path.join(database.ARCHIVE_DIR, path)).to_pandas())
+    frames.append(hot)
+    frame = pd.concat(frames, ignore_index=True)
+
+    if kind == "daily" and path is not None:
+        # Same fold as combine_daily(), per user and day
+        frame["date"] = pd.to_datetime(frame["date"]).dt.date
+        frame = frame.groupby(["user_id", "date"], as_index=False, sort=False).agg(
+            last_weight=("last_weight", "last"),
+            min_weight=("min_weight", "min"),
+            max_weight=("max_weight", "max"),
+            entries=("entries", "sum"),
+            calories=("calories", "last"),
+        )
+    return _to_table(kind, frame)
+
+
+def _write_part(kind, month, table):
+    pa = _pyarrow()
+
+    path = f"{kind}/month={month}/part-{time.time_ns()}.parquet"
+    full = os.path.join(database.ARCHIVE_DIR, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+
+    # Written under a temporary name so readers never see a partial file
+    pa.parquet.write_table(table, full + ".tmp", row_group_size=ROW_GROUP_ROWS, compression="zstd")
+    os.replace(full + ".tmp", full)
+    return path
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(os.path.join(database.ARCHIVE_DIR, path))
+        except FileNotFoundError:
+            pass
+
+
+def compact_month(conn, month):
+    """Moves one month's hot rows into its archive files. Returns (raw rows, daily rows) moved."""
+    import pandas as pd
+
+    bounds = (f"{month}-01", f"{_shift_month(month, 1)}-01")
+    written = []
+
+    # Writers wait while the month is copied, so no row can slip between copy and delete
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        hot = {
+            "raw": pd.read_sql_query(
+                f"SELECT {', '.join(n for n, _ in COLUMNS['raw'])} FROM progress WHERE date >= ? AND date < ?",
+                conn, params=bounds
+            ),
+            "daily": pd.read_sql_query(
+                f"SELECT {', '.join(n for n, _ in COLUMNS['daily'])} FROM progress_daily WHERE date >= ? AND date < ?",
+                conn, params=bounds
+            ),
+        }
+        old = dict(conn.execute("SELECT kind, path FROM progress_archive WHERE month = ?", (month,)))
+
+        users = set()
+        for kind, frame in hot.items():
+            if frame.empty:
+                continue
+            table = _merge_with_archive(kind, old.get(kind), frame)
+            path = _write_part(kind, month, table)
+            written.append(path)
+            users.update(frame["user_id"])
+
+            conn.execute("""
+                INSERT OR REPLACE INTO progress_archive (kind, month, path, rows, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (kind, month, path, table.num_rows, time.time()))
+
+        conn.executemany("""
+            INSERT INTO progress_archive_users (user_id, first_month, last_month)
+            VALUES (?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                first_month = MIN(first_month, excluded.first_month),
+                last_month = MAX(last_month, excluded.last_month)
+        """, [(user_id, month, month) for user_id in users])
+
+        conn.execute("DELETE FROM progress WHERE date >= ? AND date < ?", bounds)
+        conn.execute("DELETE FROM progress_daily WHERE date >= ? AND date < ?", bounds)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        _remove(written)
+        raise
+
+    # Replaced files are unreferenced once the manifest is committed
+    _remove(path for kind, path in old.items() if hot[kind].shape[0])
+    return len(hot["raw"]), len(hot["daily"])
+
+
+def remove_orphans():
+    """Deletes archive files the manifest does not reference (e.g. from a crashed compaction)."""
+    with database.get_connection() as conn:
+        live = {path for (path,) in conn.execute("SELECT path FROM progress_archive")}
+
+    removed = 0
+    for root, _, files in os.walk(database.ARCHIVE_DIR):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), database.ARCHIVE_DIR).replace(os.sep, "/")
+            if path not in live:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def compact(hot_months=HOT_MONTHS, today=None, log=sys.stderr):
+    """Archives every closed month before the hot window. Returns the months compacted."""
+    _pyarrow()
+    database.create_table()
+    database.flush_progress()
+    cutoff = f"{compaction_cutoff(hot_months, today)}-01"
+
+    with database.get_connection() as conn:
+        months = [month for (month,) in conn.execute("""
+            SELECT DISTINCT substr(date, 1, 7) FROM progress WHERE date < ?
+            UNION
+            SELECT DISTINCT substr(date, 1, 7) FROM progress_daily WHERE date < ?
+            ORDER BY 1
+        """, (cutoff, cutoff))]
+
+        for month in months:
+            start = time.perf_counter()
+            raw, daily = compact_month(conn, month)
+            metrics.observe("archive_compaction_seconds", time.perf_counter() - start)
+            if log is not None:
+                log.write(f"{month}: archived {raw} rows, {daily} daily rows\n")
+
+    remove_orphans()
+    return months
+
+
+def stats():
+    """(kind, months, rows, bytes) per archive kind, plus the hot row counts."""
+    with database.get_connection() as conn:
+        parts = conn.execute("SELECT kind, path, rows FROM progress_archive").fetchall()
+        hot = {
+            "raw": conn.execute("SELECT COUNT(*) FROM progress").fetchone()[0],
+            "daily": conn.execute("SELECT COUNT(*) FROM progress_daily").fetchone()[0],
+        }
+
+    result = []
+    for kind in COLUMNS:
+        mine = [(path, rows) for k, path, rows in parts if k == kind]
+        size = sum(
+            os.path.getsize(os.path.join(database.ARCHIVE_DIR, path))
+            for path, _ in mine
+            if os.path.exists(os.path.join(database.ARCHIVE_DIR, path))
+        )
+        result.append((kind, len(mine), sum(rows for _, rows in mine), size, hot[kind]))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive closed months of progress data to Parquet")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_cmd = commands.add_parser("compact", help="move closed months to the archive")
+    compact_cmd.add_argument("--hot-months", type=int, default=HOT_MONTHS,
+                             help="closed months to keep in SQLite")
+    commands.add_parser("stats", help="archive and hot table sizes")
+
+    args = parser.parse_args(argv)
+    database.create_table()
+
+    if args.command == "compact":
+        try:
+            _pyarrow()
+        except RuntimeError as exc:
+            sys.stderr.write(f"error: {exc}\n")
+            return 1
+        months = compact(args.hot_months)
+        sys.stderr.write(f"compacted {len(months)} months\n")
+        return 0
+
+    print(f"{'kind':<6} {'months':>6} {'archived rows':>14} {'MB':>8} {'hot rows':>10}")
+    for kind, months, rows, size, hot in stats():
+        print(f"{kind:<6} {months:>6} {rows:>14} {size / 1e6:>8.1f} {hot:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Prompt builders shared by the pages and the bulk planner.
+# The text must stay byte-for-byte stable: it is part of the LLM cache key.
+
+def workout_prompt(user, bmi):
+    return f"""
+You are a certified fitness trainer.
+
+Create a structured 7-day workout plan using these details:
+- Age: {user['age']}
+- Gender: {user['gender']}
+- Height: {user['height']} cm
+- Weight: {user['weight']} kg
+- BMI: {bmi:.2f}
+- Fitness Goal: {user['goal']}
+
+Rules:
+- Day-wise plan (Monday–Sunday)
+- Include rest days
+- Beginner friendly
+- Use bullet points
+- End the response with the word END
+"""
+
+
+def diet_prompt(user, calories):
+    return f"""
+You are a certified nutritionist.
+
+Create a daily diet plan using:
+- Age: {user['age']}
+- Gender: {user['gender']}
+- Height: {user['height']} cm
+- Weight: {user['weight']} kg
+- Goal: {user['goal']}
+- Diet Preference: {user['diet']}
+- Activity Level: {user['activity']}
+- Daily Calories: {calories} kcal
+
+Rules:
+- Include breakfast, lunch, snacks, dinner
+- Simple & affordable foods
+- Beginner friendly
+- Brief explanation
+- End with the word END
+"""
+
+
+# Bucketed prompts (see backend/plan_buckets.py) describe a band of
+# profiles, so they give ranges instead of one person's body stats
+def workout_bucket_prompt(band):
+    return f"""
+You are a certified fitness trainer.
+
+Create a structured 7-day workout plan for people with these details:
+- Age: {band['age']} years
+- Gender: {band['gender']}
+- BMI: {band['bmi']}
+- Fitness Goal: {band['goal']}
+
+Rules:
+- Day-wise plan (Monday–Sunday)
+- Include rest days
+- Beginner friendly
+- Use bullet points
+- End the response with the word END
+"""
+
+
+def diet_bucket_prompt(band, calories):
+    return f"""
+You are a certified nutritionist.
+
+Create a daily diet plan for people with these details:
+- Age: {band['age']} years
+- Gender: {band['gender']}
+- BMI: {band['bmi']}
+- Goal: {band['goal']}
+- Diet Preference: {band['diet']}
+- Activity Level: {band['activity']}
+- Daily Calories: {calories} kcal
+
+Rules:
+- Include breakfast, lunch, snacks, dinner
+- Simple & affordable foods
+- Beginner friendly
+- Brief explanation
+- End with the word END
+"""
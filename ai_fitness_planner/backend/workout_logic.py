@@ -1,21 +1,31 @@
-def workout_plan(goal, bmi):
-    if goal == "Weight Loss":
-        return [
-            "30–40 min Cardio",
-            "Jump rope",
-            "Bodyweight squats",
-            "Plank & core exercises"
-        ]
-    elif goal == "Muscle Gain":
-        return [
-            "Strength training",
-            "Chest & Back workouts",
-            "Leg day & shoulder training",
-            "Progressive overload"
-        ]
-    else:
-        return [
-            "Mixed cardio + strength",
-            "Yoga & stretching",
-            "Light resistance training"
-        ]
+from backend.catalog import DEFAULT_EQUIPMENT, exercises_for
+
+# Muscle group of each exercise in the plan, per goal
+WORKOUT_TEMPLATES = {
+    "Weight Loss": ("cardio", "cardio", "legs", "core"),
+    "Muscle Gain": ("chest", "back", "legs", "shoulders"),
+    "Stay Fit": ("cardio", "mobility", "full_body"),
+}
+
+
+def workout_plan(goal, bmi, equipment=DEFAULT_EQUIPMENT, seed=None):
+    """
+    One exercise per template slot, filtered by BMI band and equipment.
+    The default seed comes from the BMI, so a profile always gets the same plan.
+    """
+    template = WORKOUT_TEMPLATES.get(goal, WORKOUT_TEMPLATES["Stay Fit"])
+    if seed is None:
+        seed = int((bmi or 0) * 10)
+
+    plan = []
+    used = {}
+    for group in template:
+        options = exercises_for(group, bmi, equipment)
+        # Repeated groups take the next option instead of the same one
+        nth = used.get(group, 0)
+        used[group] = nth + 1
+
+        exercise = options[(seed + nth) % len(options)]
+        plan.append(f"{exercise.name} – {exercise.dose}")
+
+    return plan
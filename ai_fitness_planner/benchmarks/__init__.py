@@ -0,0 +1 @@
+#Makes benchmarks a package
\ No newline at end of file
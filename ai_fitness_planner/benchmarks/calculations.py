@@ -0,0 +1,95 @@
+"""
+Scalar vs array calculations at 1e3 - 1e6 rows.
+
+    python benchmarks/calculations.py
+    python benchmarks/calculations.py --sizes 1000 100000 --json calc.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.calculations import (  # noqa: E402
+    ACTIVITY_FACTORS,
+    calculate_bmi,
+    calculate_bmi_array,
+    calculate_bmr,
+    calculate_bmr_array,
+    calculate_daily_calories,
+    calculate_daily_calories_array,
+)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def make_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "gender": rng.choice(["Male", "Female"], n),
+        "age": rng.integers(15, 71, n),
+        "weight": rng.integers(20, 301, n).astype(np.float64),
+        "height": rng.integers(50, 251, n).astype(np.float64),
+        "activity": rng.choice(list(ACTIVITY_FACTORS), n),
+    }
+
+
+def run_scalar(p):
+    # Plain Python lists, as a per-row caller would have them
+    rows = zip(p["gender"].tolist(), p["age"].tolist(), p["weight"].tolist(),
+               p["height"].tolist(), p["activity"].tolist())
+    for gender, age, weight, height, activity in rows:
+        calculate_bmi(weight, height)
+        bmr = calculate_bmr(gender, weight, height, age)
+        calculate_daily_calories(bmr, activity)
+
+
+def run_array(p):
+    calculate_bmi_array(p["weight"], p["height"])
+    bmr = calculate_bmr_array(p["gender"], p["weight"], p["height"], p["age"])
+    calculate_daily_calories_array(bmr, p["activity"])
+
+
+def best_of(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(sizes=DEFAULT_SIZES, repeat=3):
+    results = []
+    for n in sizes:
+        profiles = make_profiles(n)
+        scalar = best_of(run_scalar, profiles, 1 if n >= 1_000_000 else repeat)
+        array = best_of(run_array, profiles, repeat)
+        results.append({
+            "rows": n,
+            "scalar_ms": round(scalar * 1000, 2),
+            "array_ms": round(array * 1000, 2),
+            "speedup": round(scalar / array, 1) if array else None,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scalar vs array calculations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes)
+
+    print(f"{'rows':>10} {'scalar ms':>12} {'array ms':>10} {'speedup':>8}")
+    for row in results:
+        print(f"{row['rows']:>10} {row['scalar_ms']:>12} {row['array_ms']:>10} {row['speedup']:>7}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
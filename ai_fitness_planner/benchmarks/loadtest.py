@@ -0,0 +1,585 @@
+"""
+Load test: N simulated browser sessions walking the app journey at once.
+
+    python benchmarks/loadtest.py                          # levels 1,2,4,8,16
+    python benchmarks/loadtest.py --levels 4,8,32 --journeys 3
+    python benchmarks/loadtest.py --ttft 0.8 --tokens-per-second 40 --json load.json
+    python benchmarks/loadtest.py --url http://127.0.0.1:8501   # an already running server
+
+The harness starts a real `streamlit run` server (one worker process)
+and every session is a websocket client speaking Streamlit's browser
+protocol, so page reruns, SQLite reads and writes, the LLM dispatcher,
+the job pool and the PDF pool all see truly concurrent sessions (the
+client needs the websockets package, which newer Streamlit installs
+bring along). A journey is:
+
+    details    submit the User Details form (progress row queued)
+    workout    open the Workout Plan page
+    generate   click Generate; the fragment's auto-reruns poll until the plan is there
+    pdf        click the PDF download: the deferred render, then the file download
+    dashboard  open the Progress Dashboard
+
+The LLM is the offline fake backend (backend/fake_llm.py). Profiles are
+random and bucketing is off, so every journey generates a new plan and a
+new PDF. For each concurrency level the report has throughput and
+p50/p95/p99 per step, plus the server's mean time per subsystem timer
+from backend/metrics.py (scraped from its Prometheus endpoint). Capacity
+is the last level that still raised throughput by MIN_GAIN; the step
+that slowed down most at the next level names the subsystem that
+saturated first.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_LEVELS = [1, 2, 4, 8, 16]
+STEPS = ["details", "workout", "generate", "pdf", "dashboard"]
+# What each step mostly waits on
+STEP_SUBSYSTEM = {
+    "details": "SQLite writes + page rerun",
+    "workout": "page rerun",
+    "generate": "LLM calls (job pool / dispatcher)",
+    "pdf": "PDF render pool",
+    "dashboard": "SQLite reads + page rerun",
+}
+# Server timers reported next to the steps
+SUBSYSTEM_METRICS = [
+    "page_run_seconds",
+    "db_query_seconds",
+    "pdf_render_seconds",
+    "llm_request_seconds",
+    "ai_job_seconds",
+]
+
+# A level "scales" while throughput grows at least this much over the previous one
+MIN_GAIN = 0.10
+RUN_TIMEOUT = 120
+GENERATE_TIMEOUT = 300
+SERVER_START_TIMEOUT = 60
+
+# Page url paths, as listed in the navigation message
+PAGES = {
+    "details": "UserDetails",
+    "workout": "WorkoutPlan",
+    "dashboard": "ProgressDashboard",
+}
+# User Details form: widget label -> profile field
+FORM_FIELDS = {
+    "Age": "age", "Height (cm)": "height", "Weight (kg)": "weight", "Gender": "gender",
+    "Activity Level": "activity", "Fitness Goal": "goal", "Diet Preference": "diet",
+}
+GENERATE_LABEL = "💪🏻 Generate AI Workout Plan"
+PDF_LABEL = "📄 Download Workout Plan (PDF)"
+AI_PLAN_CAPTION = "AI-generated personalized plan"
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def random_profile(rng):
+    return {
+        "age": rng.randint(18, 65),
+        "gender": rng.choice(["Male", "Female"]),
+        "height": rng.randint(150, 195),
+        "weight": rng.randint(45, 120),
+        "activity": rng.choice(["Sedentary", "Lightly Active", "Moderately Active", "Very Active"]),
+        "goal": rng.choice(["Weight Loss", "Muscle Gain", "Stay Fit"]),
+        "diet": rng.choice(["Vegetarian", "Non-Vegetarian"]),
+    }
+
+
+# -------------------------------------------------
+# SERVER
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    """Runs the app with a scratch database and the fake LLM; returns (url, metrics url)."""
+    scratch = tempfile.mkdtemp(prefix="youthfit-load-")
+    port, metrics_port = _free_port(), _free_port()
+
+    env = dict(
+        os.environ,
+        FITNESS_DB_PATH=os.path.join(scratch, "fitness.db"),
+        LLM_CACHE_PATH=os.path.join(scratch, "llm_cache.db"),
+        FITNESS_ARCHIVE_DIR=os.path.join(scratch, "progress_archive"),
+        LLM_BACKEND="fake",
+        PLAN_BUCKETS_ENABLED="0",
+        METRICS_PORT=str(metrics_port),
+        METRICS_HOST="127.0.0.1",
+    )
+    # Read by the fake backend when the client is first built
+    env.setdefault("FAKE_LLM_TTFT_SECONDS", str(args.ttft))
+    env.setdefault("FAKE_LLM_TOKENS_PER_SECOND", str(args.tokens_per_second))
+    env.setdefault("FAKE_LLM_ERROR_RATE", str(args.error_rate))
+    env.setdefault("FAKE_LLM_SEED", str(args.seed))
+
+    log = open(os.path.join(scratch, "server.log"), "w")
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "HomePage.py"),
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(port),
+            # The harness is not a browser: no XSRF cookie to echo back
+            "--server.enableXsrfProtection", "false",
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    def stop():
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    atexit.register(stop)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    break
+        except OSError:
+            pass
+        if server.poll() is not None or time.monotonic() > deadline:
+            with open(log.name) as f:
+                sys.stderr.write(f.read()[-2000:])
+            raise RuntimeError("the Streamlit server did not start")
+        time.sleep(0.2)
+
+    return url, f"http://127.0.0.1:{metrics_port}/metrics"
+
+
+def scrape_metrics(metrics_url):
+    """{metric: (sum, count)} over every label series, or {} without an endpoint."""
+    if not metrics_url:
+        return {}
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=5) as response:
+            text = response.read().decode("utf-8")
+    except OSError:
+        return {}
+
+    totals = {}
+    for line in text.splitlines():
+        match = re.match(r"(\w+)_(sum|count)(?:\{.*\})? (\S+)$", line)
+        if match and match.group(1) in SUBSYSTEM_METRICS:
+            total, count = totals.get(match.group(1), (0.0, 0.0))
+            if match.group(2) == "sum":
+                total += float(match.group(3))
+            else:
+                count += float(match.group(3))
+            totals[match.group(1)] = (total, count)
+    return totals
+
+
+def _subsystem_means(before, after):
+    # Mean seconds per call within the level
+    result = {}
+    for name, (total, count) in after.items():
+        prev_total, prev_count = before.get(name, (0.0, 0.0))
+        if count > prev_count:
+            result[name] = (total - prev_total) / (count - prev_count)
+    return result
+
+
+# -------------------------------------------------
+# SESSION
+class Session:
+    """One simulated browser tab: a websocket session on the server."""
+
+    def __init__(self, index, seed, url):
+        self.index = index
+        self.rng = random.Random(seed)
+        self.url = url
+        self.ws = None
+        self.session_id = ""
+        self.pages = {}
+        self.query_string = ""
+        self.page_hash = ""
+        self.elements = {}
+        self.fragments = {}
+
+    async def connect(self):
+        import websockets
+
+        ws_url = re.sub(r"^http", "ws", self.url) + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+        # The browser's first run: the server answers with the page list
+        await self._rerun()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+
+    async def _receive(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = ForwardMsg()
+        msg.ParseFromString(await self.ws.recv())
+        kind = msg.WhichOneof("type")
+
+        if kind == "navigation":
+            self.pages = {p.url_pathname: p.page_script_hash for p in msg.navigation.app_pages}
+        elif kind == "new_session":
+            if msg.new_session.HasField("initialize"):
+                self.session_id = msg.new_session.initialize.session_id
+            self.page_hash = msg.new_session.page_script_hash
+            # A full run redraws the page; a fragment run only its own part
+            if not msg.new_session.fragment_ids_this_run:
+                self.elements = {}
+                self.fragments = {}
+        elif kind == "page_info_changed":
+            # st.query_params changes, e.g. ?uid=, kept like the browser URL
+            self.query_string = msg.page_info_changed.query_string
+        elif kind == "auto_rerun":
+            self.fragments[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            self.elements[tuple(msg.metadata.delta_path)] = msg.delta.new_element
+        return msg
+
+    async def _rerun(self, page=None, widgets=(), fragment_id=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = self.query_string
+        state.page_script_hash = self.pages.get(page, "") if page else self.page_hash
+        state.widget_states.widgets.extend(widgets)
+        if fragment_id:
+            state.fragment_id = fragment_id
+            state.is_auto_rerun = True
+        await self.ws.send(msg.SerializeToString())
+
+        async def until_finished():
+            while True:
+                reply = await self._receive()
+                # A run ended by st.rerun() is followed by the real one
+                if (reply.WhichOneof("type") == "script_finished"
+                        and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN):
+                    return
+
+        await asyncio.wait_for(until_finished(), RUN_TIMEOUT)
+
+        for element in self.elements.values():
+            if element.WhichOneof("type") == "exception":
+                raise RuntimeError(element.exception.message)
+
+    def _find(self, kind, label=None):
+        for path in sorted(self.elements):
+            element = self.elements[path]
+            if element.WhichOneof("type") == kind:
+                widget = getattr(element, kind)
+                if label is None or getattr(widget, "label", None) == label:
+                    return widget
+        raise RuntimeError(f"no {kind} {label or ''} on the page")
+
+    def _texts(self, kind):
+        return [getattr(e, kind).body for e in self.elements.values() if e.WhichOneof("type") == kind]
+
+    async def details(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        await self._rerun(PAGES["details"])
+
+        profile = random_profile(self.rng)
+        widgets = []
+        for label, field in FORM_FIELDS.items():
+            state = WidgetState()
+            if isinstance(profile[field], int):
+                state.id = self._find("number_input", label).id
+                state.double_value = profile[field]
+            else:
+                kind = "radio" if field == "gender" else "selectbox"
+                state.id = self._find(kind, label).id
+                state.string_value = profile[field]
+            widgets.append(state)
+        submit = WidgetState(id=self._find("button").id, trigger_value=True)
+
+        start = time.perf_counter()
+        await self._rerun(widgets=widgets + [submit])
+        if not any("saved" in body for body in self._texts("alert")):
+            raise RuntimeError("details were not saved")
+        return time.perf_counter() - start
+
+    async def workout(self):
+        start = time.perf_counter()
+        await self._rerun(PAGES["workout"])
+        return time.perf_counter() - start
+
+    async def generate(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        click = WidgetState(id=self._find("button", GENERATE_LABEL).id, trigger_value=True)
+        start = time.perf_counter()
+        await self._rerun(widgets=[click])
+
+        # Like the browser: rerun each auto-rerun fragment on its interval
+        while not any(AI_PLAN_CAPTION in body for body in self._texts("markdown")):
+            errors = [body for body in self._texts("alert") if body.startswith("⚠️")]
+            if errors:
+                raise RuntimeError(errors[0])
+            if not self.fragments:
+                raise RuntimeError("no plan and no job polling")
+            if time.perf_counter() - start > GENERATE_TIMEOUT:
+                raise RuntimeError("plan generation timed out")
+
+            fragment_id, interval = next(iter(self.fragments.items()))
+            await asyncio.sleep(interval)
+            await self._rerun(fragment_id=fragment_id)
+
+        return time.perf_counter() - start
+
+    async def pdf(self):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        file_id = self._find("download_button", PDF_LABEL).deferred_file_id
+        request_id = uuid.uuid4().hex
+
+        msg = BackMsg()
+        msg.backend_operation_request.request_id = request_id
+        msg.backend_operation_request.session_id = self.session_id
+        msg.backend_operation_request.deferred_file.file_id = file_id
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+
+        async def file_url():
+            while True:
+                reply = await self._receive()
+                if (reply.WhichOneof("type") == "backend_operation_response"
+                        and reply.backend_operation_response.request_id == request_id):
+                    response = reply.backend_operation_response
+                    if response.error_msg:
+                        raise RuntimeError(response.error_msg)
+                    return response.deferred_file.url
+
+        url = await asyncio.wait_for(file_url(), RUN_TIMEOUT)
+
+        def download():
+            with urllib.request.urlopen(self.url + url, timeout=RUN_TIMEOUT) as response:
+                return response.read()
+
+        if not (await asyncio.to_thread(download)).startswith(b"%PDF"):
+            raise RuntimeError("the download is not a PDF")
+        return time.perf_counter() - start
+
+    async def dashboard(self):
+        start = time.perf_counter()
+        await self._rerun(PAGES["dashboard"])
+        return time.perf_counter() - start
+
+
+# -------------------------------------------------
+# LEVELS
+async def _run_sessions(sessions, journeys, seed, think_seconds, url, timings, errors, last_errors):
+    async def journey_loop(index, ready):
+        session = Session(index, seed * 100_003 + index, url)
+        try:
+            await session.connect()
+        finally:
+            ready.release()
+        # All sessions start together, like a burst of users
+        await start.wait()
+
+        try:
+            for _ in range(journeys):
+                for step in STEPS:
+                    try:
+                        seconds = await getattr(session, step)()
+                    except Exception as exc:
+                        errors[step] += 1
+                        last_errors[step] = str(exc) or type(exc).__name__
+                        # The rest of the journey depends on this step; start
+                        # over on a fresh connection in the same browser tab
+                        await session.close()
+                        await session.connect()
+                        break
+                    timings[step].append(seconds)
+                    if think_seconds:
+                        await asyncio.sleep(think_seconds)
+        finally:
+            await session.close()
+
+    start = asyncio.Event()
+    ready = asyncio.Semaphore(0)
+    tasks = [asyncio.create_task(journey_loop(i, ready)) for i in range(sessions)]
+    for _ in range(sessions):
+        await ready.acquire()
+
+    began = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - began
+
+
+def run_level(sessions, journeys, url, metrics_url=None, seed=0, think_seconds=0.0):
+    timings = {step: [] for step in STEPS}
+    errors = {step: 0 for step in STEPS}
+    last_errors = {}
+
+    before = scrape_metrics(metrics_url)
+    elapsed = asyncio.run(_run_sessions(
+        sessions, journeys, seed, think_seconds, url, timings, errors, last_errors
+    ))
+    after = scrape_metrics(metrics_url)
+
+    steps = {}
+    for step in STEPS:
+        ordered = sorted(timings[step])
+        steps[step] = {
+            "count": len(ordered),
+            "errors": errors[step],
+            "p50": percentile(ordered, 0.50),
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+        }
+
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "journeys": len(timings[STEPS[-1]]),
+        "throughput": len(timings[STEPS[-1]]) / elapsed,
+        "steps": steps,
+        "subsystems": _subsystem_means(before, after),
+        "last_errors": last_errors,
+    }
+
+
+def find_capacity(levels):
+    """
+    (capacity level, bottleneck step): capacity is the last level whose
+    throughput grew by MIN_GAIN over the previous one; the bottleneck is
+    the step whose p95 grew most, relative to the first level, just past it.
+    """
+    if not levels:
+        return None, None
+
+    capacity = levels[0]
+    saturated = None
+    for previous, level in zip(levels, levels[1:]):
+        if level["throughput"] >= previous["throughput"] * (1 + MIN_GAIN) and not _errors(level):
+            capacity = level
+        else:
+            saturated = level
+            break
+
+    if saturated is None:
+        return capacity["sessions"], None
+
+    base = levels[0]["steps"]
+
+    def slowdown(step):
+        if saturated["steps"][step]["errors"]:
+            return float("inf")
+        before = base[step]["p95"]
+        return saturated["steps"][step]["p95"] / before if before else 0.0
+
+    return capacity["sessions"], max(STEPS, key=slowdown)
+
+
+def _errors(level):
+    return sum(step["errors"] for step in level["steps"].values())
+
+
+# -------------------------------------------------
+# REPORT
+def print_report(levels, out=sys.stdout):
+    for level in levels:
+        out.write(
+            f"\n{level['sessions']} sessions: {level['journeys']} journeys in {level['seconds']:.1f}s"
+            f" = {level['throughput']:.2f} journeys/s, {_errors(level)} errors\n"
+        )
+        out.write(f"  {'step':<10} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}\n")
+        for step, row in level["steps"].items():
+            out.write(
+                f"  {step:<10} {row['count']:>5} {row['errors']:>4}"
+                f" {row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} {row['p99'] * 1000:>9.1f}\n"
+            )
+        if level["subsystems"]:
+            timers = ", ".join(
+                f"{name} {value * 1000:.1f}" for name, value in sorted(level["subsystems"].items())
+            )
+            out.write(f"  server mean ms: {timers}\n")
+        for step, message in level["last_errors"].items():
+            out.write(f"  last {step} error: {message}\n")
+
+    capacity, bottleneck = find_capacity(levels)
+    if capacity is None:
+        return
+
+    out.write(f"\nCapacity: about {capacity} concurrent sessions per worker")
+    if bottleneck is None:
+        out.write(" (still scaling at the highest level tested)\n")
+    else:
+        out.write(f"\nFirst to saturate: {bottleneck} ({STEP_SUBSYSTEM[bottleneck]})\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YOUTHFIT AI multi-session load test")
+    parser.add_argument("--levels", default=",".join(map(str, DEFAULT_LEVELS)),
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--journeys", type=int, default=2, help="journeys per session")
+    parser.add_argument("--think-seconds", type=float, default=0.0, help="pause between steps")
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0, help="fake LLM token rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake LLM 503 share")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="test this running server instead of starting one "
+                                      "(it must run with --server.enableXsrfProtection false)")
+    parser.add_argument("--metrics-url", help="its Prometheus endpoint, for the subsystem timers")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url, metrics_url = args.url.rstrip("/"), args.metrics_url
+    else:
+        url, metrics_url = start_server(args)
+
+    levels = []
+    for sessions in (int(v) for v in args.levels.split(",")):
+        sys.stderr.write(f"running {sessions} sessions...\n")
+        levels.append(run_level(sessions, args.journeys, url, metrics_url, args.seed, args.think_seconds))
+
+    print_report(levels)
+
+    if args.json:
+        capacity, bottleneck = find_capacity(levels)
+        with open(args.json, "w") as f:
+            json.dump({"levels": levels, "capacity": capacity, "bottleneck": bottleneck}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark: import-time breakdown per backend module and
+first-render latency per page. Every measurement runs in a fresh
+interpreter so nothing is warmed up by a previous one.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_MODULES = [
+    "backend.calculations",
+    "backend.database",
+    "backend.diet_logic",
+    "backend.workout_logic",
+    "backend.ml_model",
+    "backend.llm_service",
+]
+
+PAGES = [
+    "HomePage.py",
+    "pages/1_UserDetails.py",
+    "pages/2_WorkoutPlan.py",
+    "pages/3_DietPlan.py",
+    "pages/4_ProgressDashboard.py",
+]
+
+SAMPLE_USER = {
+    "age": 30, "gender": "Male", "height": 175, "weight": 70,
+    "activity": "Moderately Active", "goal": "Stay Fit", "diet": "Vegetarian",
+    "bmi": 22.86, "bmr": 1648.75, "calories": 2555, "user_id": "benchmark-user"
+}
+
+RENDER_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {app_dir!r})
+from backend.database import create_table
+create_table()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=120)
+at.session_state.user = {user!r}
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "exceptions": [e.message for e in at.exception]}}))
+"""
+
+
+def _clean_env():
+    env = dict(os.environ)
+    # Cold start must not depend on the AI token being configured
+    env.pop("HF_API_TOKEN", None)
+    return env
+
+
+def measure_import(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=_clean_env(), capture_output=True, text=True
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        # Leading spaces after the separator encode nesting depth
+        rows.append((name[1:].rstrip(), int(head.split(":")[1]), int(cumulative_us)))
+
+    def depth(name):
+        return len(name) - len(name.lstrip())
+
+    # -X importtime prints children before their parent, one level = 2 spaces
+    index = next((i for i, row in enumerate(rows) if row[0].strip() == module), None)
+    total = rows[index][2] if index is not None else None
+
+    children = []
+    if index is not None:
+        level = depth(rows[index][0])
+        for name, _, cumulative in reversed(rows[:index]):
+            if depth(name) <= level:
+                break
+            if depth(name) == level + 2:
+                children.append((name.strip(), cumulative))
+    children.sort(key=lambda item: item[1], reverse=True)
+
+    return {
+        "module": module,
+        "ok": result.returncode == 0,
+        "cumulative_ms": round(total / 1000, 2) if total is not None else None,
+        "heaviest": [{"module": n, "ms": round(cum / 1000, 2)} for n, cum in children[:5]],
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode else None,
+    }
+
+
+def measure_first_render(page):
+    code = RENDER_SNIPPET.format(
+        app_dir=APP_DIR,
+        path=os.path.join(APP_DIR, page),
+        user=SAMPLE_USER
+    )
+
+    with tempfile.TemporaryDirectory() as cwd:
+        # Scratch database so benchmarking never touches real progress data
+        env = _clean_env()
+        env["FITNESS_DB_PATH"] = os.path.join(cwd, "fitness.db")
+
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=cwd, env=env, capture_output=True, text=True
+        )
+
+    if result.returncode != 0:
+        return {"page": page, "ok": False, "error": result.stderr.strip().splitlines()[-1]}
+
+    payload = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "page": page,
+        "ok": not payload["exceptions"],
+        "first_render_ms": round(payload["seconds"] * 1000, 1),
+        "error": payload["exceptions"][0] if payload["exceptions"] else None,
+    }
+
+
+def run():
+    return {
+        "imports": [measure_import(m) for m in BACKEND_MODULES],
+        "pages": [measure_first_render(p) for p in PAGES],
+    }
+
+
+def print_report(results):
+    print("Import time (cold)")
+    for row in results["imports"]:
+        status = f"{row['cumulative_ms']:>9} ms" if row["ok"] else f"FAILED: {row['error']}"
+        print(f"  {row['module']:<28} {status}")
+        for child in row["heaviest"][:3]:
+            print(f"      {child['module']:<24} {child['ms']:>9} ms")
+
+    print("\nFirst render (cold)")
+    for row in results["pages"]:
+        status = f"{row['first_render_ms']:>9} ms" if row["ok"] else f"FAILED: {row['error']}"
+        print(f"  {row['page']:<28} {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,356 @@
+"""
+Benchmark suite for the app's hot paths, with baseline comparison.
+
+    python benchmarks/suite.py                         # run and print
+    python benchmarks/suite.py --json results.json     # also save results
+    python benchmarks/suite.py --compare               # fail on regressions vs baseline.json
+    python benchmarks/suite.py --save-baseline         # overwrite baseline.json
+    python benchmarks/suite.py --quick                 # smaller progress tables
+
+Each result is the best-of-N wall time in seconds. A result regresses when
+it is slower than baseline * threshold (default 1.5x, per-case overrides
+in THRESHOLDS). All database work happens in a scratch SQLite file.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(APP_DIR, "benchmarks", "baseline.json")
+
+# Must be set before backend.database is imported
+SCRATCH_DIR = tempfile.mkdtemp(prefix="youthfit-bench-")
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ["FITNESS_DB_PATH"] = os.path.join(SCRATCH_DIR, "fitness.db")
+os.environ["LLM_CACHE_PATH"] = os.path.join(SCRATCH_DIR, "llm_cache.db")
+
+sys.path.insert(0, APP_DIR)
+
+DEFAULT_THRESHOLD = 1.5
+# Noisy cases get more headroom
+THRESHOLDS = {
+    "pages.": 2.0,
+}
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 2e-6
+
+PROGRESS_SIZES = [1_000, 100_000, 1_000_000]
+QUICK_PROGRESS_SIZES = [1_000, 10_000]
+
+# Users with three years of daily weigh-ins, compacted to the Parquet archive
+ARCHIVE_USERS = 200
+QUICK_ARCHIVE_USERS = 20
+ARCHIVE_DAYS = 3 * 365
+
+SAMPLE_USER = {
+    "age": 30, "gender": "Male", "height": 175, "weight": 70,
+    "activity": "Moderately Active", "goal": "Stay Fit", "diet": "Vegetarian",
+    "bmi": 22.86, "bmr": 1648.75, "calories": 2555, "user_id": "bench-pages"
+}
+
+STUB_PLAN = "\n".join(
+    f"Day {i}: 3 sets x 12 reps squats, push-ups, plank 60s" for i in range(1, 8)
+) + "\nEND"
+
+
+def best_of(fn, repeat=5, number=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# -------------------------------------------------
+# CASES (each yields (name, seconds) pairs)
+def bench_calculations(quick):
+    import numpy as np
+    from backend.calculations import (
+        calculate_bmi, calculate_bmr, calculate_daily_calories,
+        calculate_bmi_array, calculate_bmr_array, calculate_daily_calories_array,
+    )
+    from backend.ml_model import predict_calories, predict_calories_batch, get_model
+    from benchmarks.calculations import make_profiles
+
+    get_model()
+
+    yield "calculations.bmi", best_of(lambda: calculate_bmi(70, 175), number=100_000, repeat=7)
+    yield "calculations.bmr", best_of(lambda: calculate_bmr("Male", 70, 175, 30), number=100_000, repeat=7)
+    yield "calculations.daily_calories", best_of(
+        lambda: calculate_daily_calories(1650.0, "Moderately Active"), number=100_000, repeat=7
+    )
+    yield "ml.predict_calories", best_of(lambda: predict_calories(30, 70, 175, 1.55), number=100_000, repeat=7)
+
+    n = 10_000 if quick else 100_000
+    p = make_profiles(n)
+    factor = np.full(n, 1.55)
+
+    def arrays():
+        calculate_bmi_array(p["weight"], p["height"])
+        bmr = calculate_bmr_array(p["gender"], p["weight"], p["height"], p["age"])
+        calculate_daily_calories_array(bmr, p["activity"])
+
+    yield f"calculations.arrays_{n}", best_of(arrays)
+    yield f"ml.predict_calories_batch_{n}", best_of(lambda: predict_calories_batch({
+        "age": p["age"], "weight": p["weight"], "height": p["height"], "activity": factor
+    }))
+
+
+def bench_plans(quick):
+    from backend.diet_logic import diet_plan
+    from backend.workout_logic import workout_plan
+
+    yield "plans.workout", best_of(lambda: workout_plan("Weight Loss", 27.3), number=20_000, repeat=7)
+    yield "plans.diet", best_of(lambda: diet_plan("Muscle Gain", 2555, "Vegetarian"), number=20_000, repeat=7)
+
+    from backend.meal_solver import solve_batch, solve_meal_plan
+
+    yield "plans.meal_solver", best_of(lambda: solve_meal_plan(2555, "Vegetarian"), number=20)
+
+    n = 200 if quick else 2000
+    calories = [1400 + (i * 37) % 2400 for i in range(n)]
+    diets = ["Vegetarian" if i % 2 else "Non-Vegetarian" for i in range(n)]
+    yield f"plans.meal_solver_batch_{n}", best_of(lambda: solve_batch(calories, diets), repeat=3)
+
+
+def bench_pdf(quick):
+    from backend.pdf_service import build_plan_pdf, build_report_pdf
+
+    small = STUB_PLAN
+    # ~2000 lines, mostly long enough to wrap
+    long_text = "\n".join(
+        f"Day {i % 7 + 1}: " + "Warm up, compound lifts, accessory work and a cool down. " * 3
+        for i in range(2000)
+    )
+
+    yield "pdf.small", best_of(lambda: build_plan_pdf("Workout Plan", small))
+    yield "pdf.long", best_of(lambda: build_plan_pdf("Workout Plan", long_text), repeat=1 if quick else 3)
+    yield "pdf.report", best_of(lambda: build_report_pdf(
+        "Progress Report",
+        [("Workout Plan", small), ("Diet Plan", small)],
+        [(row[-1], row[4]) for row in _progress_rows("bench-report", 365)]
+    ))
+
+
+def _progress_rows(user_id, n):
+    start = date(2020, 1, 1)
+    return [
+        (user_id, 30, "Male", 175.0, 70.0 + (i % 50) / 10, "Stay Fit", 2500,
+         (start + timedelta(days=i // 3)).isoformat())
+        for i in range(n)
+    ]
+
+
+def bench_progress(quick):
+    from backend.database import (
+        create_table, get_daily_progress, get_progress, insert_progress, insert_progress_many,
+    )
+
+    create_table()
+
+    for n in (QUICK_PROGRESS_SIZES if quick else PROGRESS_SIZES):
+        user_id = f"bench-{n}"
+        rows = _progress_rows(user_id, n)
+
+        start = time.perf_counter()
+        insert_progress_many(rows)
+        yield f"progress.insert_many_{n}", time.perf_counter() - start
+
+        yield f"progress.get_progress_{n}", best_of(lambda: get_progress(user_id), repeat=3)
+        yield f"progress.get_daily_{n}", best_of(lambda: get_daily_progress(user_id), repeat=3)
+
+    yield "progress.insert_one", best_of(
+        lambda: insert_progress("bench-one", 30, "Male", 175, 70, "Stay Fit", 2500, "2024-01-01"),
+        number=50
+    )
+
+
+def bench_archive(quick):
+    import pyarrow as pa
+    from backend.database import create_table, get_connection, get_daily_progress, insert_progress_many
+    from backend.progress_archive import _archived_days, compact, scan_progress
+
+    create_table()
+    users = QUICK_ARCHIVE_USERS if quick else ARCHIVE_USERS
+    start = date(2020, 1, 1)
+
+    rows = [
+        (f"archive-{u}", 30, "Male", 175.0, 70.0 + (d % 50) / 10, "Stay Fit", 2500,
+         (start + timedelta(days=d)).isoformat())
+        for u in range(users) for d in range(ARCHIVE_DAYS)
+    ]
+    insert_progress_many(rows)
+
+    def sqlite_scan():
+        with get_connection() as conn:
+            data = conn.execute(
+                "SELECT user_id, date, weight FROM progress WHERE user_id LIKE 'archive-%'"
+            ).fetchall()
+        return pa.table(dict(zip(["user_id", "date", "weight"], map(list, zip(*data)))))
+
+    yield f"archive.sqlite_scan_{users}u", best_of(sqlite_scan, repeat=3)
+    yield "archive.sqlite_daily_month", best_of(lambda: get_daily_progress("archive-0", bucket="month"), repeat=3)
+
+    began = time.perf_counter()
+    compact(hot_months=0, log=None)
+    yield f"archive.compact_{users}u", time.perf_counter() - began
+
+    yield f"archive.parquet_scan_{users}u", best_of(scan_progress, repeat=3)
+    yield "archive.parquet_daily_month", best_of(lambda: get_daily_progress("archive-0", bucket="month"), repeat=3)
+
+    def uncached():
+        _archived_days.cache_clear()
+        get_daily_progress("archive-0", bucket="month")
+
+    yield "archive.parquet_daily_month_uncached", best_of(uncached, repeat=3)
+
+
+def _stub_llm():
+    import backend.llm_service as llm_service
+
+    def generate_response(prompt, max_tokens=None, use_cache=True, plan_type=None):
+        return STUB_PLAN
+
+    def stream_response(prompt, max_tokens=None, use_cache=True, plan_type=None):
+        for line in STUB_PLAN.splitlines(keepends=True):
+            yield line
+
+    llm_service.generate_response = generate_response
+    llm_service.stream_response = stream_response
+    # Pages check the client before submitting a job; no token is needed here
+    llm_service._client = object()
+
+
+def bench_pages(quick):
+    from streamlit.testing.v1 import AppTest
+    from backend.database import insert_progress_many
+
+    _stub_llm()
+    insert_progress_many(_progress_rows(SAMPLE_USER["user_id"], 365))
+
+    def app(page):
+        at = AppTest.from_file(os.path.join(APP_DIR, page), default_timeout=60)
+        at.session_state.user = dict(SAMPLE_USER)
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].message}")
+        return at
+
+    for page in ["HomePage.py", "pages/1_UserDetails.py", "pages/2_WorkoutPlan.py",
+                 "pages/3_DietPlan.py", "pages/4_ProgressDashboard.py"]:
+        at = app(page)
+        name = os.path.splitext(os.path.basename(page))[0]
+        yield f"pages.{name}.rerun", best_of(at.run, repeat=3 if quick else 5)
+
+    at = app("pages/1_UserDetails.py")
+    yield "pages.1_UserDetails.submit", best_of(lambda: at.button[0].click().run(), repeat=3)
+
+    for page in ["pages/2_WorkoutPlan.py", "pages/3_DietPlan.py"]:
+        at = app(page)
+        name = os.path.splitext(os.path.basename(page))[0]
+        yield f"pages.{name}.generate", best_of(lambda: at.button[0].click().run(), repeat=3)
+
+
+SUITES = {
+    "calculations": bench_calculations,
+    "plans": bench_plans,
+    "pdf": bench_pdf,
+    "progress": bench_progress,
+    "archive": bench_archive,
+    "pages": bench_pages,
+}
+
+
+# -------------------------------------------------
+# RUN / COMPARE
+def run(suites=None, quick=False, log=sys.stdout):
+    results = {}
+    for suite in suites or SUITES:
+        for name, seconds in SUITES[suite](quick):
+            results[name] = seconds
+            if log is not None:
+                log.write(f"  {name:<42} {seconds * 1e6:>14.1f} us\n")
+                log.flush()
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def threshold_for(name, default=DEFAULT_THRESHOLD):
+    for prefix, value in THRESHOLDS.items():
+        if name.startswith(prefix):
+            return value
+    return default
+
+
+def compare(current, baseline, default_threshold=DEFAULT_THRESHOLD):
+    """Returns (name, baseline_s, current_s, ratio) for every regressed case."""
+    regressions = []
+    for name, seconds in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ratio = seconds / before
+        if seconds - before < NOISE_FLOOR_SECONDS:
+            continue
+        if ratio > threshold_for(name, default_threshold):
+            regressions.append((name, before, seconds, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YOUTHFIT AI benchmark suite")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="run only these suites (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smaller progress tables")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--compare", action="store_true", help="exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    current = run(args.suite, args.quick)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(current, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.1f} us -> {after * 1e6:.1f} us ({ratio:.2f}x)")
+
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,17 @@
 import streamlit as st
 import sys
 import os
+import uuid
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.database import connect_db
+from backend.database import queue_progress
 from datetime import date
 
-from backend.calculations import calculate_bmi, calculate_bmr
+from backend.calculations import calculate_bmi, calculate_bmr, calculate_daily_calories
+from backend import app_cache, metrics
 
-activity_factor = {
-    "Sedentary": 1.2,
-    "Lightly Active": 1.375,
-    "Moderately Active": 1.55,
-    "Very Active": 1.725
-}
+# Rerun timing (see backend/metrics.py)
+metrics.begin_page_run("1_UserDetails")
 
 # Sidebar
 st.sidebar.title("💪 YOUTHFIT AI")
@@ -36,6 +34,12 @@ if "user" not in st.session_state:
 
 user = st.session_state.user
 
+# 🆔 PROGRESS IDENTITY (kept in the URL so tracking survives new sessions)
+if "user_id" not in st.session_state:
+    st.session_state.user_id = st.query_params.get("uid") or uuid.uuid4().hex
+
+st.query_params["uid"] = st.session_state.user_id
+
 # 🔐 SESSION STATE SAFETY (schema guard)
 required_keys = ["bmi", "bmr", "calories"]
 
@@ -107,9 +111,10 @@ with st.form("user_form"):
 if submit:
     bmi = calculate_bmi(weight, height)
     bmr = calculate_bmr(gender, weight, height, age)
-    calories = int(bmr * activity_factor[activity])
+    calories = calculate_daily_calories(bmr, activity)
 
-    st.session_state.user = {
+    old_user = st.session_state.user
+    new_user = {
         "age": age,
         "gender": gender,
         "height": height,
@@ -119,18 +124,21 @@ if submit:
         "diet": diet,
         "bmi": bmi,
         "bmr": bmr,
-        "calories": calories
+        "calories": calories,
+        "user_id": st.session_state.user_id
     }
 
+    # New details make the stored plans / cached derived data stale
+    if app_cache.profile_changed(old_user, new_user):
+        app_cache.invalidate_profile(st.session_state)
+
+    st.session_state.user = new_user
+
     today = date.today().isoformat()
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO progress (age, gender, height, weight, goal, calories, date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (age, gender, height, weight, goal, calories, today))
-    conn.commit()
-    conn.close()
+    # Write-behind: committed in a batch; dashboard reads flush it first
+    queue_progress(st.session_state.user_id, age, gender, height, weight, goal, calories, today)
 
     st.success("✅ Details saved successfully!")
     st.info(f"📊 BMI: {bmi:.2f} | 🔥 Daily Calories: {calories}")
+
+metrics.end_page_run()
@@ -1,51 +1,18 @@
 import streamlit as st
 import sys
 import os
-import io
-import textwrap
+from functools import partial
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.workout_logic import workout_plan
-from backend.llm_service import generate_response
-
-from reportlab.platypus import SimpleDocTemplate, Preformatted, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-
-# ---------------------------------------
-# PDF GENERATOR (SAFE FOR AI TEXT)
-def generate_ai_explanation_pdf(title, explanation):
-    buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=30,
-        leftMargin=30,
-        topMargin=30,
-        bottomMargin=30
-    )
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Preformatted(title, styles["Title"]))
-    story.append(Spacer(1, 20))
-
-    wrapped_text = []
-    max_chars = 115  # safe wrap for A4
-
-    for line in explanation.split("\n"):
-        wrapped_lines = textwrap.wrap(line, max_chars) or [""]
-        wrapped_text.extend(wrapped_lines)
-
-    story.append(Preformatted("\n".join(wrapped_text), styles["Normal"]))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+from backend.calculations import bmi_category
+from backend.jobs import POLL_SECONDS, get_job, submit_plan
+from backend.plan_buckets import canonical_prompt, find_plan
+from backend.pdf_service import render_plan_pdf
+from backend import app_cache, metrics, plan_history
 
+# Rerun timing (see backend/metrics.py)
+metrics.begin_page_run("2_WorkoutPlan")
 
 # Sidebar
 st.sidebar.title("💪 YOUTHFIT AI")
@@ -66,18 +33,13 @@ if bmi is None:
     st.warning("⚠️ Please submit your details again.")
     st.stop()
 
+user_id = user.get("user_id")
+if user_id is None:
+    st.warning("⚠️ Please submit your details again.")
+    st.stop()
+
 # ---------------------------------------
 # BMI INFO (ALWAYS SHOWN)
-def bmi_category(bmi):
-    if bmi < 18.5:
-        return "Underweight"
-    elif bmi < 25:
-        return "Normal"
-    elif bmi < 30:
-        return "Overweight"
-    else:
-        return "Obese"
-
 category = bmi_category(bmi)
 
 st.subheader("📏 BMI Analysis")
@@ -95,52 +57,79 @@ use_ai_plan = st.toggle("Generate workout plan using AI", value=True)
 
 # ✅ CLEAR RULE-BASED PLAN WHEN SWITCHING TO AI
 if use_ai_plan and st.session_state.get("plan_source") == "rule":
-    st.session_state.pop("active_workout_plan", None)
+    st.session_state.pop("active_workout_plan_id", None)
     st.session_state.pop("plan_source", None)
 
 # ---------------------------------------
-prompt = f"""
-You are a certified fitness trainer.
-
-Create a structured 7-day workout plan using these details:
-- Age: {user['age']}
-- Gender: {user['gender']}
-- Height: {user['height']} cm
-- Weight: {user['weight']} kg
-- BMI: {bmi:.2f}
-- Fitness Goal: {user['goal']}
-
-Rules:
-- Day-wise plan (Monday–Sunday)
-- Include rest days
-- Beginner friendly
-- Use bullet points
-- End the response with the word END
-"""
+# Similar profiles share one canonical prompt and its stored plan
+bucket, prompt = canonical_prompt("workout", user, bmi)
 # AI MODE
 if use_ai_plan:
     st.subheader("🚀 AI-Generated Workout Plan")
 
-    if "active_workout_plan" not in st.session_state:
-        st.info("Click the button below to generate your AI workout plan.")
-
-    if st.button("💪🏻 Generate AI Workout Plan"):
-        with st.spinner("AI is creating your workout plan..."):
-            ai_plan_text = generate_response(prompt)
+    # A returning user gets their last AI plan for this prompt back
+    if "active_workout_plan_id" not in st.session_state and "workout_job" not in st.session_state:
+        plan_id = plan_history.latest_ai_plan(user_id, "workout", prompt)
+        if plan_id is not None:
+            st.session_state.active_workout_plan_id = plan_id
+            st.session_state.plan_source = "ai"
 
-        if not ai_plan_text.strip().endswith("END"):
-            ai_plan_text += "\n\n[Note: Response ended early by the model]"
+    if "active_workout_plan_id" not in st.session_state and "workout_job" not in st.session_state:
+        st.info("Click the button below to generate your AI workout plan.")
 
-        st.session_state.active_workout_plan = ai_plan_text
-        st.session_state.plan_source = "ai"
+    # Polls the background job; a finished plan triggers one full rerun
+    @st.fragment(run_every=POLL_SECONDS)
+    def show_workout_job():
+        job = get_job(st.session_state.get("workout_job"))
+
+        if job is None or job.done:
+            st.session_state.pop("workout_job", None)
+            if job is None:
+                st.session_state.workout_job_error = "The AI request expired. Please generate again."
+            elif job.status == "error" or not job.result:
+                st.session_state.workout_job_error = (
+                    job.error or "AI service is temporarily busy. Please try again later."
+                )
+            else:
+                st.session_state.active_workout_plan_id = plan_history.save(
+                    user_id, "workout", job.result, "ai", prompt
+                )
+                st.session_state.plan_source = "ai"
+            st.rerun()
+
+        st.info("⏳ AI is creating your workout plan... you can keep using the app meanwhile.")
+        if job.partial:
+            st.write(job.partial)
 
+    if st.button("💪🏻 Generate AI Workout Plan"):
+        try:
+            ai_plan_text = find_plan(bucket, "workout")
+            if ai_plan_text is not None:
+                st.session_state.active_workout_plan_id = plan_history.save(
+                    user_id, "workout", ai_plan_text, "ai", prompt
+                )
+                st.session_state.plan_source = "ai"
+            else:
+                app_cache.llm_client()
+                # Generated in the background, so reruns and page switches keep it
+                st.session_state.workout_job = submit_plan("workout", bucket, prompt)
+        except RuntimeError as exc:
+            st.error(f"⚠️ {exc}")
+            st.stop()
+
+    if "workout_job_error" in st.session_state:
+        st.error(f"⚠️ {st.session_state.pop('workout_job_error')}")
+
+    # ⏳ GENERATION IN PROGRESS
+    if "workout_job" in st.session_state:
+        show_workout_job()
 
     # ✅ DISPLAY STORED PLAN (NO REGENERATION)
-    if (
-        "active_workout_plan" in st.session_state
+    elif (
+        "active_workout_plan_id" in st.session_state
         and st.session_state.get("plan_source") == "ai"
     ):
-        st.write(st.session_state.active_workout_plan)
+        st.write(plan_history.active_text(st.session_state, "active_workout_plan_id"))
 
 
 # ---------------------------------------
@@ -148,8 +137,10 @@ if use_ai_plan:
 else:
     st.subheader("🔹 Recommended Workout Plan (Rule-Based)")
 
-    plan = workout_plan(user["goal"], bmi)
-    st.session_state.active_workout_plan = "\n".join(plan)
+    plan = app_cache.workout_plan_for(user["goal"], bmi)
+    plan_history.remember(
+        st.session_state, "active_workout_plan_id", user_id, "workout", "\n".join(plan), "rule"
+    )
     st.session_state.plan_source = "rule"
 
     for exercise in plan:
@@ -168,16 +159,18 @@ Sunday – Rest
 # ---------------------------------------
 # PDF DOWNLOAD (ACTIVE PLAN ONLY)
 if (
-    "active_workout_plan" in st.session_state
+    "active_workout_plan_id" in st.session_state
     and (
         (use_ai_plan and st.session_state.get("plan_source") == "ai")
         or (not use_ai_plan)
     )
 ):
 
-    pdf = generate_ai_explanation_pdf(
+    # Rendered only when the button is clicked, then cached by content hash
+    pdf = partial(
+        render_plan_pdf,
         "YOUTHFIT AI – Workout Plan",
-        st.session_state.active_workout_plan
+        plan_history.active_text(st.session_state, "active_workout_plan_id")
     )
 
     st.download_button(
@@ -193,3 +186,4 @@ if "plan_source" in st.session_state:
     elif st.session_state.plan_source == "rule":
         st.caption("📋 This is a rule-based (normal) plan")
 
+metrics.end_page_run()
@@ -1,61 +1,28 @@
 import streamlit as st
 import sys
 import os
-import io
-import textwrap
-import pandas as pd
+from functools import partial
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.ml_model import predict_calories
-from backend.diet_logic import diet_plan
-from backend.llm_service import generate_response
+from backend.calculations import ACTIVITY_FACTORS
+from backend.jobs import POLL_SECONDS, get_job, submit_plan
+from backend.plan_buckets import canonical_prompt, find_plan
+from backend.meal_solver import SUPPORTED_CALORIES, format_portions
+from backend.pdf_service import render_plan_pdf
+from backend import app_cache, metrics, plan_history
 
-from reportlab.platypus import SimpleDocTemplate, Preformatted, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
+# Rerun timing (see backend/metrics.py)
+metrics.begin_page_run("3_DietPlan")
 
 # -------------------------------------------------
 # SESSION STATE INITIALIZATION (CRITICAL)
-if "diet_active_plan" not in st.session_state:
-    st.session_state["diet_active_plan"] = None
+if "diet_active_plan_id" not in st.session_state:
+    st.session_state["diet_active_plan_id"] = None
 
 if "diet_plan_source" not in st.session_state:
     st.session_state["diet_plan_source"] = None
 
-# -------------------------------------------------
-# PDF GENERATOR (SAFE FOR ANY AI TEXT)
-def generate_ai_explanation_pdf(title, explanation):
-    buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=30,
-        leftMargin=30,
-        topMargin=30,
-        bottomMargin=30
-    )
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    story.append(Preformatted(title, styles["Title"]))
-    story.append(Spacer(1, 20))
-
-    wrapped_text = []
-    max_chars = 115
-
-    for line in explanation.split("\n"):
-        wrapped_lines = textwrap.wrap(line, max_chars) or [""]
-        wrapped_text.extend(wrapped_lines)
-
-    story.append(Preformatted("\n".join(wrapped_text), styles["Normal"]))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
 # Sidebar
 st.sidebar.title("💪 YOUTHFIT AI")
 st.sidebar.caption("AI-Based Workout & Diet Planner")
@@ -75,22 +42,20 @@ if daily_cal is None:
     st.warning("⚠️ Please submit your details again.")
     st.stop()
 
-# -------------------------------------------------
-# CORE CALCULATION (SAFE)
-diet_core = diet_plan(user["goal"], daily_cal, user["diet"])
+user_id = user.get("user_id")
+if user_id is None:
+    st.warning("⚠️ Please submit your details again.")
+    st.stop()
 
-activity_factor = {
-    "Sedentary": 1.2,
-    "Lightly Active": 1.375,
-    "Moderately Active": 1.55,
-    "Very Active": 1.725
-}
+# -------------------------------------------------
+# CORE CALCULATION (SAFE, CACHED PER PROFILE)
+diet_core = app_cache.diet_plan_for(user["goal"], daily_cal, user["diet"])
 
-ml_calories = predict_calories(
+ml_calories = app_cache.ml_calories_for(
     user["age"],
     user["weight"],
     user["height"],
-    activity_factor[user["activity"]]
+    ACTIVITY_FACTORS[user["activity"]]
 )
 
 # -------------------------------------------------
@@ -105,18 +70,29 @@ st.divider()
 # MACRO GRAPH
 st.subheader("📊 Macronutrient Distribution")
 
-macro_df = pd.DataFrame({
-    "Macronutrient": ["Protein", "Carbs", "Fats"],
-    "Calories": [
-        diet_core["Calories"] * 0.30,
-        diet_core["Calories"] * 0.45,
-        diet_core["Calories"] * 0.25
-    ]
-})
+macro_df = app_cache.macro_table_for(diet_core["Calories"])
 
 st.bar_chart(macro_df.set_index("Macronutrient"))
 st.caption("📌 Macronutrient split is formula-based")
 
+# Portions solved locally to hit the calorie target and the split above
+meal_plan = app_cache.meal_plan_for(diet_core["Calories"], user["diet"])
+
+st.subheader("🎯 Targets vs Rule-Based Plan")
+st.table({
+    "Target": meal_plan["targets"],
+    "Achieved": meal_plan["achieved"]
+})
+if not meal_plan["portions"]:
+    st.warning("⚠️ The calorie target is too low to plan portions. Please check your details.")
+elif meal_plan["within_tolerance"]:
+    st.caption("✅ Rule-based portions are within ±5% of the calorie and macro targets")
+elif not meal_plan["in_range"]:
+    low, high = SUPPORTED_CALORIES
+    st.caption(f"⚠️ Portions are planned for {low}–{high} kcal/day; these are the closest found")
+else:
+    st.caption("⚠️ Closest portions found; some targets are outside ±5%")
+
 st.divider()
 
 # -------------------------------------------------
@@ -126,71 +102,99 @@ use_ai_plan = st.toggle("Generate diet plan using AI", value=True)
 
 # RESET RULE PLAN WHEN SWITCHING TO AI
 if use_ai_plan and st.session_state["diet_plan_source"] == "rule":
-    st.session_state["diet_active_plan"] = None
+    st.session_state["diet_active_plan_id"] = None
     st.session_state["diet_plan_source"] = None
 
 # -------------------------------------------------
 # AI PROMPT
-prompt = f"""
-You are a certified nutritionist.
-
-Create a daily diet plan using:
-- Age: {user['age']}
-- Gender: {user['gender']}
-- Height: {user['height']} cm
-- Weight: {user['weight']} kg
-- Goal: {user['goal']}
-- Diet Preference: {user['diet']}
-- Activity Level: {user['activity']}
-- Daily Calories: {diet_core['Calories']} kcal
-
-Rules:
-- Include breakfast, lunch, snacks, dinner
-- Simple & affordable foods
-- Beginner friendly
-- Brief explanation
-- End with the word END
-"""
+# Similar profiles share one canonical prompt and its stored plan
+bucket, prompt = canonical_prompt("diet", user, user["bmi"], diet_core["Calories"])
 
 # -------------------------------------------------
 # AI MODE
 if use_ai_plan:
     st.subheader("🤖 AI-Generated Diet Plan")
 
-    if st.session_state["diet_active_plan"] is None:
-        st.info("Click below to generate your AI diet plan.")
+    # A returning user gets their last AI plan for this prompt back
+    if st.session_state["diet_active_plan_id"] is None and "diet_job" not in st.session_state:
+        plan_id = plan_history.latest_ai_plan(user_id, "diet", prompt)
+        if plan_id is not None:
+            st.session_state["diet_active_plan_id"] = plan_id
+            st.session_state["diet_plan_source"] = "ai"
 
-    if st.button("🚀 Generate AI Diet Plan"):
-        with st.spinner("AI is creating your diet plan..."):
-            ai_text = generate_response(prompt)
-
-        if ai_text is None:#
-            st.error("⚠️ AI service is temporarily busy. Please try again later.")#
-            st.info("💡 Tip: Free AI APIs have usage limits.")#
-            st.stop()#
-
-        if not ai_text.strip().endswith("END"):
-            ai_text += "\n\n[Note: Response ended early by the model]"
-
-        st.session_state["diet_active_plan"] = ai_text
-        st.session_state["diet_plan_source"] = "ai"
+    if st.session_state["diet_active_plan_id"] is None and "diet_job" not in st.session_state:
+        st.info("Click below to generate your AI diet plan.")
 
+    # Polls the background job; a finished plan triggers one full rerun
+    @st.fragment(run_every=POLL_SECONDS)
+    def show_diet_job():
+        job = get_job(st.session_state.get("diet_job"))
+
+        if job is None or job.done:
+            st.session_state.pop("diet_job", None)
+            if job is None:
+                st.session_state["diet_job_error"] = "The AI request expired. Please generate again."
+            elif job.status == "error" or not job.result:
+                st.session_state["diet_job_error"] = (
+                    job.error or "AI service is temporarily busy. Please try again later."
+                )
+            else:
+                st.session_state["diet_active_plan_id"] = plan_history.save(
+                    user_id, "diet", job.result, "ai", prompt
+                )
+                st.session_state["diet_plan_source"] = "ai"
+            st.rerun()
+
+        st.info("⏳ AI is creating your diet plan... you can keep using the app meanwhile.")
+        if job.partial:
+            st.write(job.partial)
 
-    if (
-        st.session_state["diet_active_plan"]
+    if st.button("🚀 Generate AI Diet Plan"):
+        try:
+            ai_text = find_plan(bucket, "diet")
+            if ai_text is not None:
+                st.session_state["diet_active_plan_id"] = plan_history.save(
+                    user_id, "diet", ai_text, "ai", prompt
+                )
+                st.session_state["diet_plan_source"] = "ai"
+            else:
+                app_cache.llm_client()
+                # Generated in the background, so reruns and page switches keep it
+                st.session_state["diet_job"] = submit_plan("diet", bucket, prompt)
+        except RuntimeError as exc:
+            st.error(f"⚠️ {exc}")
+            st.stop()
+
+    if "diet_job_error" in st.session_state:
+        st.error(f"⚠️ {st.session_state.pop('diet_job_error')}")
+        st.info("💡 Tip: Free AI APIs have usage limits.")
+
+    # ⏳ GENERATION IN PROGRESS
+    if "diet_job" in st.session_state:
+        show_diet_job()
+
+    elif (
+        st.session_state["diet_active_plan_id"]
         and st.session_state["diet_plan_source"] == "ai"
 ):
-        st.write(st.session_state["diet_active_plan"])
+        st.write(plan_history.active_text(st.session_state, "diet_active_plan_id"))
 
 # RULE-BASED MODE
 else:
     st.subheader("🔹 Recommended Diet Plan (Rule-Based)")
 
     st.write("🍗 **Protein Sources:**", diet_core["Protein"])
-    for meal in diet_core["Meals"]:
+    meal_lines = format_portions(meal_plan)
+    for meal in meal_lines:
         st.write("•", meal)
 
-    st.session_state["diet_active_plan"] = "\n".join(diet_core["Meals"])
+    # No portions (target too low) means nothing to keep or download
+    if meal_lines:
+        plan_history.remember(
+            st.session_state, "diet_active_plan_id", user_id, "diet", "\n".join(meal_lines), "rule"
+        )
+    else:
+        st.session_state["diet_active_plan_id"] = None
     st.session_state["diet_plan_source"] = "rule"
 
     st.expander("💡 Nutrition Tips").write("""
@@ -203,16 +207,18 @@ else:
 # -------------------------------------------------
 # PDF DOWNLOAD (STRICT)
 if (
-    st.session_state["diet_active_plan"]
+    st.session_state["diet_active_plan_id"]
     and (
         (use_ai_plan and st.session_state["diet_plan_source"] == "ai")
         or (not use_ai_plan and st.session_state["diet_plan_source"] == "rule")
     )
 ):
 
-    pdf = generate_ai_explanation_pdf(
+    # Rendered only when the button is clicked, then cached by content hash
+    pdf = partial(
+        render_plan_pdf,
         "YOUTHFIT AI – Diet Plan",
-        st.session_state["diet_active_plan"]
+        plan_history.active_text(st.session_state, "diet_active_plan_id")
     )
 
     st.download_button(
@@ -228,3 +234,5 @@ if st.session_state["diet_plan_source"] == "ai":
     st.caption("🤖 AI-generated personalized diet plan")
 elif st.session_state["diet_plan_source"] == "rule":
     st.caption("📋 Rule-based diet plan")
+
+metrics.end_page_run()
@@ -2,10 +2,18 @@ import streamlit as st
 import sys
 import os
 import pandas as pd
+from datetime import date, datetime
+from functools import partial
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.database import get_progress
+from backend.database import get_daily_progress, get_progress_summary
+from backend.calculations import bmi_category
+from backend.pdf_service import render_report_pdf
+from backend import metrics, plan_history
+
+# Rerun timing (see backend/metrics.py)
+metrics.begin_page_run("4_ProgressDashboard")
 
 # Sidebar
 st.sidebar.title("💪 YOUTHFIT AI")
@@ -27,37 +35,55 @@ if bmi is None:
     st.warning("⚠️ Please submit your details again.")
     st.stop()
 
+user_id = user.get("user_id")
+if user_id is None:
+    st.warning("⚠️ Please submit your details again.")
+    st.stop()
+
 # ---------------------------------------
-# FETCH DATA FROM DATABASE
-data = get_progress()
+# FETCH DAILY ROLLUP FROM DATABASE
+summary = get_progress_summary(user_id)
 
 # ✅ SECOND SAFETY CHECK (DB DATA)
-if not data:
+if summary is None:
     st.info("📌 No progress data recorded yet. Submit your details to start tracking.")
     st.stop()
 
-# ---------------------------------------
+# Long histories are charted in weekly / monthly buckets
+span_days = (
+    date.fromisoformat(summary["last_date"]) - date.fromisoformat(summary["first_date"])
+).days
 
-# DATAFRAME
-df = pd.DataFrame(data, columns=["Date", "Weight"])
+if span_days > 3 * 365:
+    bucket = "month"
+elif span_days > 180:
+    bucket = "week"
+else:
+    bucket = "day"
 
-# Convert Date & Weight properly
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-df["Weight"] = pd.to_numeric(df["Weight"], errors="coerce")
+# Only the last seen bucket onward is re-read on a rerun
+cached = st.session_state.get("progress_rows")
 
-# Drop invalid rows
-df.dropna(inplace=True)
+if cached and cached["key"] == (user_id, bucket) and cached["rows"]:
+    last_period = cached["rows"][-1][0]
+    data = [row for row in cached["rows"] if row[0] < last_period]
+    data += get_daily_progress(user_id, start_date=last_period, bucket=bucket)
+else:
+    data = get_daily_progress(user_id, bucket=bucket)
 
-# Sort by date (VERY IMPORTANT)
-df = df.sort_values("Date")
+st.session_state["progress_rows"] = {"key": (user_id, bucket), "rows": data}
 
-# Handle multiple entries on same day (keep latest)
-df = df.groupby("Date", as_index=False).last()
+# ---------------------------------------
+
+# DATAFRAME (already one row per bucket, sorted by date)
+df = pd.DataFrame([row[:2] for row in data], columns=["Date", "Weight"])
+df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+df.dropna(inplace=True)
 
 # ---------------------------------------
 # METRICS
-latest_weight = df["Weight"].iloc[-1]
-start_weight = df["Weight"].iloc[0]
+latest_weight = summary["last_weight"]
+start_weight = summary["first_weight"]
 weight_change = round(latest_weight - start_weight, 2)
 
 # -----------------------------------
@@ -69,16 +95,6 @@ calories = user["calories"]
 goal = user["goal"]
 
 # BMI Category
-def bmi_category(bmi):
-    if bmi < 18.5:
-        return "Underweight"
-    elif bmi < 25:
-        return "Normal"
-    elif bmi < 30:
-        return "Overweight"
-    else:
-        return "Obese"
-
 category = bmi_category(bmi)
 
 col1, col2 = st.columns(2)
@@ -103,7 +119,10 @@ st.line_chart(
     height=350
 )
 
-st.caption("📌 Progress is tracked from user submission")
+if bucket == "day":
+    st.caption("📌 Progress is tracked from user submission")
+else:
+    st.caption(f"📌 Progress is tracked from user submission (last weight per {bucket})")
 
 st.success("🎯 Consistency is the key to success!")
 
@@ -114,4 +133,59 @@ elif weight_change > 0:
 else:
     st.info("⚖️ Your weight is stable. Consistency matters.")
 
-st.metric("📆 Days Tracked", df["Date"].nunique())
+st.metric("📆 Days Tracked", summary["days"])
+
+# ---------------------------------------
+# COMBINED REPORT (WORKOUT + DIET + PROGRESS CHART)
+st.divider()
+
+# Rendered in the PDF pool only when the button is clicked
+report = partial(
+    render_report_pdf,
+    "YOUTHFIT AI – Progress Report",
+    [
+        ("Workout Plan", plan_history.active_text(st.session_state, "active_workout_plan_id")),
+        ("Diet Plan", plan_history.active_text(st.session_state, "diet_active_plan_id")),
+    ],
+    [row[:2] for row in data]
+)
+
+st.download_button(
+    "📄 Download Full Report (PDF)",
+    report,
+    "YOUTHFIT_AI_Report.pdf",
+    "application/pdf"
+)
+st.caption("Includes your current workout and diet plans and the weight chart.")
+
+# ---------------------------------------
+# PLAN HISTORY (NEWEST FIRST, ONE PAGE AT A TIME)
+st.divider()
+st.subheader("🗂️ Plan History")
+
+# Cursor of every page opened so far; the first page has none
+cursors = st.session_state.setdefault("plan_history_cursors", [None])
+history, next_cursor = plan_history.page(user_id, cursor=cursors[-1])
+
+if not history:
+    st.info("📌 No saved plans yet. Plans you generate are kept here.")
+else:
+    labels = {
+        plan_id: (
+            f"{datetime.fromtimestamp(created_at):%d %b %Y %H:%M} – {plan_type.title()} plan"
+            f" ({'AI' if source == 'ai' else 'rule-based'})"
+        )
+        for plan_id, plan_type, source, created_at, _ in history
+    }
+    chosen = st.selectbox("Saved plans", list(labels), format_func=labels.get)
+    st.write(plan_history.plan_text(chosen))
+
+    newer, older = st.columns(2)
+    if newer.button("⬅️ Newer plans", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if older.button("Older plans ➡️", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+metrics.end_page_run()
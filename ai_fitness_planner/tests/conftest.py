@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Same import root as the pages and benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
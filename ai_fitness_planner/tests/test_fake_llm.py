@@ -0,0 +1,48 @@
+import gc
+
+import pytest
+
+from backend.fake_llm import FakeInferenceClient, FakeRateLimitError
+
+MESSAGES = [{"role": "user", "content": "plan"}]
+
+
+@pytest.fixture
+def client():
+    return FakeInferenceClient(ttft=0, tokens_per_second=1e6, completion_tokens=20,
+                               max_concurrency=1, seed=1)
+
+
+def test_unread_stream_releases_on_close(client):
+    stream = client.chat_completion(MESSAGES, stream=True)
+    with pytest.raises(FakeRateLimitError):
+        client.chat_completion(MESSAGES, stream=True)
+
+    stream.close()
+    stream.close()
+    assert client._in_flight == 0
+    client.chat_completion(MESSAGES, stream=True).close()
+
+
+def test_dropped_stream_releases(client):
+    client.chat_completion(MESSAGES, stream=True)
+    gc.collect()
+    assert client._in_flight == 0
+
+
+def test_stream_read_to_end_releases(client):
+    text = "".join(c.choices[0].delta.content for c in client.chat_completion(MESSAGES, stream=True))
+    assert text.endswith("END")
+    assert client._in_flight == 0
+
+
+def test_stream_closed_early_releases(client):
+    stream = client.chat_completion(MESSAGES, stream=True)
+    next(stream)
+    stream.close()
+    assert client._in_flight == 0
+
+
+def test_blocking_call_releases(client):
+    client.chat_completion(MESSAGES)
+    assert client._in_flight == 0
@@ -0,0 +1,68 @@
+import pytest
+
+from backend import llm_cache
+from backend.llm_cache import ResponseCache, make_cache_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(llm_cache, "time", fake)
+    return fake
+
+
+def key(prompt="Give me a plan", max_tokens=500):
+    return make_cache_key(prompt, "model-a", max_tokens, 0.7)
+
+
+def test_hit_after_put(clock):
+    cache = ResponseCache(":memory:", max_entries=10, ttl_seconds=60)
+    assert cache.get(key()) is None
+
+    cache.set(key(), "plan")
+    assert cache.get(key()) == "plan"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_miss_after_ttl(clock):
+    cache = ResponseCache(":memory:", max_entries=10, ttl_seconds=60)
+    cache.set(key(), "plan")
+
+    clock.now += 61
+    assert cache.get(key()) is None
+    assert cache.misses == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_least_recently_used(clock):
+    cache = ResponseCache(":memory:", max_entries=2, ttl_seconds=3600)
+    cache.set(key("a"), "A")
+    clock.now += 1
+    cache.set(key("b"), "B")
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used
+    assert cache.get(key("a")) == "A"
+    clock.now += 1
+    cache.set(key("c"), "C")
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == "A"
+    assert cache.get(key("c")) == "C"
+    assert cache.stats()["entries"] == 2
+
+
+def test_key_normalisation():
+    # Indentation and blank lines from f-strings do not matter
+    assert key("Give me\n    a   plan\n\n") == key("Give me\na plan")
+    assert key(max_tokens=500) != key(max_tokens=800)
+    assert make_cache_key("p", "model-a", 500, 0.7) != make_cache_key("p", "model-b", 500, 0.7)
+    assert make_cache_key("p", "model-a", 500, 0.7) != make_cache_key("p", "model-a", 500, 0.2)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import llm_service
+
+
+class ReplyClient:
+    """Answers each chat_completion with the next reply, blocking or streamed word by word."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def chat_completion(self, messages, max_tokens, temperature, stream=False):
+        self.requests.append(messages)
+        reply = self.replies.pop(0)
+        if not stream:
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message={"role": "assistant", "content": reply})],
+                usage=None,
+            )
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+            for piece in reply.split("|")
+        ])
+
+
+@pytest.fixture
+def client(monkeypatch, request):
+    client = ReplyClient(request.param)
+    monkeypatch.setattr(llm_service, "_client", client)
+    monkeypatch.setattr(llm_service, "MAX_CONTINUATIONS", 2)
+    return client
+
+
+def generate(prompt):
+    return llm_service.generate_response(prompt, max_tokens=100, use_cache=False)
+
+
+def stream(prompt):
+    return "".join(llm_service.stream_response(prompt, max_tokens=100, use_cache=False))
+
+
+@pytest.mark.parametrize("client", [["Monday: squats END\nHope this helps!"]], indirect=True)
+def test_blocking_cuts_at_end(client):
+    assert generate("cut at end") == "Monday: squats END"
+
+
+@pytest.mark.parametrize("client", [["Monday: squats", "Tuesday: rest END"]], indirect=True)
+def test_blocking_joins_continuation_on_whitespace(client):
+    assert generate("join") == "Monday: Tuesday: rest END"
+    # The cut-off word is left out of the partial so the model writes it again
+    assert client.requests[1][1]["content"] == "Monday: "
+
+
+@pytest.mark.parametrize("client", [["Monday:", "squats ", "rest"]], indirect=True)
+def test_blocking_marks_unfinished_text(client):
+    assert generate("unfinished") == "Monday: squats rest" + llm_service.TRUNCATION_NOTE
+    assert len(client.requests) == 3
+
+
+@pytest.mark.parametrize("client", [["Monday:| squats", "rest| END"]], indirect=True)
+def test_stream_joins_continuation_on_whitespace(client):
+    assert stream("stream join") == "Monday: squats rest END"
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from backend.llm_dispatcher import DispatcherBusyError, LLMDispatcher
+
+
+def wait_until(check, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def run_callers(dispatcher, key, fn, count):
+    results, errors = [], []
+
+    def caller():
+        try:
+            results.append(dispatcher.run(key, fn))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=caller) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def followers(dispatcher, key):
+    call = dispatcher._calls.get(key)
+    return call.followers if call else 0
+
+
+def test_identical_calls_share_one_upstream_call():
+    dispatcher = LLMDispatcher(max_concurrency=4, max_queue=8)
+    release = threading.Event()
+    upstream = []
+
+    def fn():
+        upstream.append(1)
+        release.wait(3)
+        return "plan"
+
+    threads, results, errors = run_callers(dispatcher, "k", fn, 8)
+    assert wait_until(lambda: followers(dispatcher, "k") == 7)
+    release.set()
+    for thread in threads:
+        thread.join(3)
+
+    assert len(upstream) == 1
+    assert results == ["plan"] * 8 and not errors
+    assert dispatcher.stats()["coalesced"] == 7
+    assert dispatcher.stats()["in_flight_keys"] == 0
+
+
+def test_leader_error_reaches_followers():
+    dispatcher = LLMDispatcher()
+    release = threading.Event()
+
+    def fn():
+        release.wait(3)
+        raise ValueError("upstream down")
+
+    threads, results, errors = run_callers(dispatcher, "k", fn, 3)
+    assert wait_until(lambda: followers(dispatcher, "k") == 2)
+    release.set()
+    for thread in threads:
+        thread.join(3)
+
+    assert not results
+    assert [str(exc) for exc in errors] == ["upstream down"] * 3
+
+
+def test_finished_key_goes_upstream_again():
+    dispatcher = LLMDispatcher()
+    upstream = []
+
+    def fn():
+        upstream.append(1)
+        return len(upstream)
+
+    assert dispatcher.run("k", fn) == 1
+    assert dispatcher.run("k", fn) == 2
+    assert dispatcher.stats()["in_flight_keys"] == 0
+
+
+def test_full_queue_is_rejected():
+    dispatcher = LLMDispatcher(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    def hold():
+        with dispatcher.slot():
+            release.wait(3)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert wait_until(lambda: dispatcher.stats()["running"] == 1)
+
+    # Fills the one queue place while the slot is busy
+    waiter = threading.Thread(target=hold)
+    waiter.start()
+    assert wait_until(lambda: dispatcher.stats()["queue_depth"] == 1)
+
+    with pytest.raises(DispatcherBusyError):
+        with dispatcher.slot():
+            pass
+
+    release.set()
+    holder.join(3)
+    waiter.join(3)
+    assert dispatcher.stats()["rejected"] == 1
+    assert dispatcher.stats()["completed"] == 2
+
+
+def test_queue_timeout():
+    dispatcher = LLMDispatcher(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+
+    with dispatcher.slot():
+        with pytest.raises(DispatcherBusyError):
+            with dispatcher.slot():
+                pass
+
+    assert dispatcher.stats()["rejected"] == 1
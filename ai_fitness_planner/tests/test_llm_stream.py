@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import llm_service
+
+
+class ChunkClient:
+    """Streams the given pieces as chat_completion chunks and records how many were read."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.read = 0
+
+    def chat_completion(self, messages, max_tokens, temperature, stream=False):
+        def chunks():
+            for piece in self.pieces:
+                self.read += 1
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+        return chunks()
+
+
+def run_stream(monkeypatch, pieces):
+    client = ChunkClient(pieces)
+    monkeypatch.setattr(llm_service, "_client", client)
+
+    shown = []
+    stream = llm_service._stream_once([], max_tokens=100)
+    while True:
+        try:
+            shown.append(next(stream))
+        except StopIteration as done:
+            text, ended, _ = done.value
+            return "".join(shown), text, ended, client
+
+
+def test_end_split_across_chunks(monkeypatch):
+    shown, text, ended, client = run_stream(
+        monkeypatch, ["Day 1: squats\n", "E", "N", "D", "\nHope this helps!", " more"]
+    )
+
+    assert ended
+    assert text == shown == "Day 1: squats\nEND"
+    # Stopped as soon as the chunk after END proved it was a whole word
+    assert client.read == 5
+
+
+def test_end_as_last_chunk(monkeypatch):
+    shown, text, ended, _ = run_stream(monkeypatch, ["Rest day\nE", "ND"])
+
+    assert ended
+    assert text == shown == "Rest day\nEND"
+
+
+@pytest.mark.parametrize("pieces", [
+    ["Rest on the WEEK", "END", " and stretch"],
+    ["Build ", "END", "URANCE slowly"],
+])
+def test_no_false_stop_inside_words(monkeypatch, pieces):
+    shown, text, ended, client = run_stream(monkeypatch, pieces)
+
+    assert not ended
+    assert text == shown == "".join(pieces)
+    assert client.read == len(pieces)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("plan END", 8),
+    ("WEEKEND plan", None),
+    ("plan EN", None),
+])
+def test_find_end_final(text, expected):
+    assert llm_service._find_end(text, 0, final=True) == expected
+
+
+def test_find_end_waits_at_buffer_tail():
+    # "END" at the tail may still grow into "ENDURANCE"
+    assert llm_service._find_end("plan END", 0, final=False) is None
+    assert llm_service._find_end("plan END\n", 0, final=False) == 8
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.catalog import FOODS
+from backend.meal_solver import (
+    MAX_SNACKS, MEAL_SERVINGS, SNACK_SERVINGS, STEP, SUPPORTED_CALORIES, format_portions,
+    solve_batch, solve_meal_plan,
+)
+
+DIETS = ["Vegetarian", "Non-Vegetarian"]
+SNACK_COLS = [j for j, food in enumerate(FOODS) if food.role == "snack"]
+
+
+@pytest.mark.parametrize("diet", DIETS)
+def test_supported_range_within_tolerance(diet):
+    calories = np.arange(SUPPORTED_CALORIES[0], SUPPORTED_CALORIES[1] + 1, 10.0)
+    _, _, ok, _ = solve_batch(calories, [diet] * len(calories))
+    assert ok.all(), calories[~ok]
+
+
+@pytest.mark.parametrize("diet", DIETS)
+def test_servings_respect_bounds(diet):
+    calories = np.arange(1000, 4501, 250.0)
+    servings, achieved, _, slots = solve_batch(calories, [diet] * len(calories))
+
+    # Quarter portions, at most MAX_SNACKS snacks
+    assert np.allclose(servings / STEP, np.round(servings / STEP))
+    assert ((servings[:, SNACK_COLS] > 0).sum(axis=1) <= MAX_SNACKS).all()
+    assert (servings[:, SNACK_COLS] <= SNACK_SERVINGS[1]).all()
+    for row, meals in enumerate(slots):
+        for _, base, main in meals:
+            for food in (base, main):
+                j = FOODS.index(food)
+                assert MEAL_SERVINGS[0] <= servings[row, j] <= MEAL_SERVINGS[1]
+    # Snacks only from the chosen diet
+    for j in SNACK_COLS:
+        if diet not in FOODS[j].diets:
+            assert (servings[:, j] == 0).all()
+    assert np.allclose(achieved[:, 0], servings @ [f.kcal for f in FOODS])
+
+
+def test_batch_matches_single_solves():
+    calories = [1200, 2555, 3800]
+    diets = ["Vegetarian", "Non-Vegetarian", "Vegetarian"]
+    servings, _, ok, _ = solve_batch(calories, diets)
+    for row, (kcal, diet) in enumerate(zip(calories, diets)):
+        single, _, single_ok, _ = solve_batch([kcal], [diet])
+        assert np.array_equal(servings[row], single[0])
+        assert ok[row] == single_ok[0]
+
+
+@pytest.mark.parametrize("calories", [0, -500, math.nan])
+def test_non_positive_and_nan_targets_have_no_plan(calories):
+    servings, achieved, ok, slots = solve_batch([calories, 2000], ["Vegetarian"] * 2)
+    assert not servings[0].any() and not achieved[0].any()
+    assert not ok[0] and slots[0] == []
+    # Other rows are still solved
+    assert ok[1] and slots[1]
+
+    plan = solve_meal_plan(calories, "Vegetarian")
+    assert plan["portions"] == [] and format_portions(plan) == []
+    assert plan["targets"]["Calories"] == 0
+    assert not plan["within_tolerance"] and not plan["in_range"]
+
+
+def test_range_is_reported():
+    assert solve_meal_plan(2555, "Vegetarian")["in_range"]
+    high = solve_meal_plan(7000, "Vegetarian")
+    assert not high["in_range"] and high["portions"]
+
+
+def test_format_portions():
+    lines = format_portions(solve_meal_plan(2555, "Non-Vegetarian"))
+    assert lines and all(":" in line and "×" in line for line in lines)
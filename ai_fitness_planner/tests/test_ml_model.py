@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from backend import ml_model
+
+
+@pytest.fixture
+def fresh_model(monkeypatch):
+    monkeypatch.setattr(ml_model, "_model", None)
+
+
+def test_missing_artifact_trains_without_writing(tmp_path, monkeypatch, fresh_model):
+    path = tmp_path / "calorie_model.json"
+    monkeypatch.setattr(ml_model, "MODEL_PATH", str(path))
+
+    model = ml_model.get_model()
+
+    assert model.version == ml_model.MODEL_VERSION
+    assert not path.exists()
+
+
+def test_save_model_replaces_atomically(tmp_path):
+    path = str(tmp_path / "calorie_model.json")
+    with open(path, "w") as f:
+        f.write("old")
+
+    predictor = ml_model.train_model()
+    ml_model.save_model(predictor, path)
+
+    assert ml_model.load_model(path).to_dict() == predictor.to_dict()
+    assert os.listdir(tmp_path) == ["calorie_model.json"]
+
+
+def test_shipped_artifact_is_current():
+    assert ml_model.load_model().version == ml_model.MODEL_VERSION
@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+
+from backend import pdf_service
+
+
+class HungWorker(pdf_service.RenderWorker):
+    # Reads nothing and never replies
+    command = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-process pool whose first worker hangs; later workers are real."""
+    started = []
+    real = pdf_service.RenderWorker
+
+    def worker():
+        started.append(HungWorker() if not started else real())
+        return started[-1]
+
+    pool = pdf_service.RenderPool(size=1)
+    monkeypatch.setattr(pdf_service, "RenderWorker", worker)
+    monkeypatch.setattr(pdf_service, "TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(pdf_service, "_pool", pool)
+    monkeypatch.setattr(pdf_service, "_pool_pid", pdf_service.os.getpid())
+    monkeypatch.setattr(pdf_service, "_inflight", {})
+    monkeypatch.setattr(pdf_service, "pdf_cache", pdf_service.PdfCache())
+    pool.started = started
+    yield pool
+    pool.close()
+
+
+def test_hung_render_is_killed_and_replaced(pool):
+    key = pdf_service.pdf_cache_key("Plan", "Monday: squats")
+
+    first = pdf_service.render_plan_pdf_async("Plan", "Monday: squats")
+    # A second download of the same document joins the render
+    assert pdf_service.render_plan_pdf_async("Plan", "Monday: squats") is first
+    with pytest.raises(pdf_service.RenderTimeout):
+        pdf_service._wait(first)
+
+    hung = pool.started[0]
+    assert hung.process.poll() is not None
+    assert hung not in pool._workers
+    assert key not in pdf_service._inflight
+
+    # The same document gets a fresh render on a new process
+    pdf = pdf_service.render_plan_pdf("Plan", "Monday: squats")
+    assert pdf.startswith(b"%PDF")
+    assert len(pool.started) == 2
@@ -0,0 +1,63 @@
+import pytest
+
+from backend import plan_buckets
+from backend.calculations import calculate_bmr, calculate_daily_calories
+from backend.diet_logic import adjust_calories
+from backend.plan_buckets import bucket_bands, bucket_for, bucket_prompt, is_current
+
+USER = {
+    "age": 34, "gender": "Female", "height": 165, "weight": 62,
+    "activity": "Lightly Active", "goal": "Stay Fit", "diet": "Vegetarian",
+}
+BMI = 22.8
+
+
+def variant(**changes):
+    return {**USER, **changes}
+
+
+def test_workout_bucket_has_only_prompt_fields():
+    bucket = bucket_for(USER, BMI)
+    assert bucket == "30-39|Female|22.5-25|Stay Fit"
+    # Diet and activity are not in the workout prompt, so not in its key
+    assert bucket_for(variant(diet="Non-Vegetarian", activity="Very Active"), BMI) == bucket
+    assert is_current("workout", bucket)
+
+
+def test_diet_bucket_keeps_diet_activity_and_calories():
+    bucket = bucket_for(USER, BMI, 1930)
+    assert bucket == "30-39|Female|22.5-25|Stay Fit|Vegetarian|Lightly Active|1900-1999kcal"
+    assert bucket_for(variant(diet="Non-Vegetarian"), BMI, 1930) != bucket
+    assert bucket_for(variant(activity="Very Active"), BMI, 1930) != bucket
+    assert bucket_for(USER, BMI, 2030) != bucket
+    assert is_current("diet", bucket)
+
+
+def test_bucket_bands():
+    workout = bucket_bands(bucket_for(USER, BMI))
+    assert workout["age"] == "30-39" and workout["bmi"] == "22.5-25"
+    assert workout["diet"] is workout["activity"] is workout["calories"] is None
+
+    diet = bucket_bands(bucket_for(USER, BMI, 1930))
+    assert (diet["diet"], diet["activity"], diet["calories"]) == ("Vegetarian", "Lightly Active", 1950)
+
+
+def test_old_layouts_are_not_current():
+    # Workout and diet keys from before the per-type layout
+    old_workout = "30-39|Female|22.5-25|Stay Fit|Vegetarian|Lightly Active"
+    assert not is_current("workout", old_workout)
+    assert not is_current("diet", old_workout)
+    with pytest.raises(ValueError):
+        bucket_prompt("workout", old_workout)
+
+
+def test_diet_prompt_uses_users_calories():
+    bucket = bucket_for(USER, BMI, 1930)
+    assert "1930 kcal" in bucket_prompt("diet", bucket, 1930)
+    assert "1950 kcal" in bucket_prompt("diet", bucket)
+
+
+def test_diet_calories_match_user_details_page():
+    bmr = calculate_bmr(USER["gender"], USER["weight"], USER["height"], USER["age"])
+    expected = adjust_calories(USER["goal"], calculate_daily_calories(bmr, USER["activity"]))
+    assert plan_buckets._diet_calories(USER) == expected
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from backend import database, plan_history
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "fitness.db"))
+    monkeypatch.setattr(database, "_pool", None)
+    database.create_table()
+    plan_history.plan_text.cache_clear()
+    yield
+    plan_history.plan_text.cache_clear()
+
+
+def save(plan, prompt, source="ai"):
+    plan_id = plan_history.save("u1", "diet", plan, source, prompt)
+    # created_at must differ between saves
+    time.sleep(0.01)
+    return plan_id
+
+
+def history_ids():
+    rows, _ = plan_history.page("u1", "diet")
+    return [row[0] for row in rows]
+
+
+def test_same_plan_under_a_new_prompt_is_found(db):
+    first = save("Shared bucket plan END", "prompt for 1930 kcal")
+    again = save("Shared bucket plan END", "prompt for 1970 kcal")
+
+    assert again == first
+    assert history_ids() == [first]
+    assert plan_history.latest_ai_plan("u1", "diet", "prompt for 1970 kcal") == first
+
+
+def test_reshown_plan_moves_to_the_top(db):
+    a = save("Plan A END", "prompt a")
+    b = save("Plan B END", "prompt b")
+    assert history_ids() == [b, a]
+
+    assert save("Plan A END", "prompt a") == a
+    assert history_ids() == [a, b]
+    assert plan_history.plan_text(a) == "Plan A END"
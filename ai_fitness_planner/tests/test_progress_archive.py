@@ -0,0 +1,124 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from backend import database
+
+pytest.importorskip("pyarrow")
+
+from backend import progress_archive  # noqa: E402
+
+USERS = ["alice", "bob"]
+START = date(2024, 1, 20)
+
+
+@pytest.fixture
+def archive_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "fitness.db"))
+    monkeypatch.setattr(database, "ARCHIVE_DIR", str(tmp_path / "progress_archive"))
+    monkeypatch.setattr(database, "_pool", None)
+    progress_archive._archived_days.cache_clear()
+    database.create_table()
+    yield
+    progress_archive._archived_days.cache_clear()
+
+
+def progress_rows(user_id, days, first=START, weight=70.0):
+    # Two weigh-ins a day across several months
+    rows = []
+    for d in range(days):
+        day = (first + timedelta(days=d)).isoformat()
+        for offset in (0.0, 0.4):
+            rows.append((user_id, 30, "Male", 175, weight + (d % 9) / 10 + offset, "Stay Fit", 2500 + d, day))
+    return rows
+
+
+def snapshot(user_id):
+    """Everything the app reads for a user, as plain values."""
+    return {
+        "raw": database.get_progress(user_id),
+        "raw_range": database.get_progress(user_id, "2024-02-10", "2024-03-05"),
+        "day": database.get_daily_progress(user_id),
+        "week": database.get_daily_progress(user_id, bucket="week"),
+        "month": database.get_daily_progress(user_id, bucket="month"),
+        "day_range": database.get_daily_progress(user_id, "2024-02-10", "2024-03-05"),
+        "week_range": database.get_daily_progress(user_id, "2024-02-10", "2024-03-05", bucket="week"),
+    }
+
+
+def snapshots():
+    return {user_id: snapshot(user_id) for user_id in USERS}
+
+
+def scan_count(**kwargs):
+    return progress_archive.scan_progress(**kwargs).num_rows
+
+
+def hot_rows(table="progress"):
+    with database.get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_compaction_keeps_reads_unchanged(archive_db):
+    for user_id in USERS:
+        database.insert_progress_many(progress_rows(user_id, 80))
+
+    before = snapshots()
+    counts = (scan_count(), scan_count(user_id="alice"), scan_count(start_date="2024-02-01", end_date="2024-02-29"))
+
+    months = progress_archive.compact(hot_months=0, log=None)
+
+    assert months == ["2024-01", "2024-02", "2024-03", "2024-04"]
+    assert hot_rows() == 0 and hot_rows("progress_daily") == 0
+    assert snapshots() == before
+    assert (scan_count(), scan_count(user_id="alice"),
+            scan_count(start_date="2024-02-01", end_date="2024-02-29")) == counts
+    assert counts[0] == 2 * 80 * 2
+
+
+def test_late_rows_and_second_compaction(archive_db):
+    for user_id in USERS:
+        database.insert_progress_many(progress_rows(user_id, 60))
+    progress_archive.compact(hot_months=0, log=None)
+    archived = snapshots()
+
+    # Late weigh-ins for archived days are merged on read from SQLite
+    database.insert_progress_many(progress_rows("alice", 5, first=date(2024, 2, 1), weight=90.0))
+    merged = snapshots()
+    assert merged["bob"] == archived["bob"]
+    assert merged["alice"] != archived["alice"]
+    assert len(merged["alice"]["raw"]) == len(archived["alice"]["raw"]) + 10
+
+    # Folding them into a new February file must not serve the old cached days
+    misses = progress_archive._archived_days.cache_info().misses
+    with database.get_connection() as conn:
+        old_files = {path for (path,) in conn.execute("SELECT path FROM progress_archive")}
+
+    assert progress_archive.compact(hot_months=0, log=None) == ["2024-02"]
+    assert snapshots() == merged
+    assert progress_archive._archived_days.cache_info().misses > misses
+
+    with database.get_connection() as conn:
+        new_files = {path for (path,) in conn.execute("SELECT path FROM progress_archive")}
+    replaced = old_files - new_files
+    assert len(replaced) == 2
+    assert not any(os.path.exists(os.path.join(database.ARCHIVE_DIR, p)) for p in replaced)
+
+
+def test_remove_orphans(archive_db):
+    database.insert_progress_many(progress_rows("alice", 40))
+    progress_archive.compact(hot_months=0, log=None)
+    before = snapshot("alice")
+
+    # Left behind by a crashed compaction
+    stray = os.path.join(database.ARCHIVE_DIR, "raw", "month=2024-01", "part-1.parquet")
+    with open(stray, "wb") as f:
+        f.write(b"partial")
+    with open(stray + ".tmp", "wb") as f:
+        f.write(b"partial")
+
+    assert progress_archive.remove_orphans() == 2
+    assert not os.path.exists(stray) and not os.path.exists(stray + ".tmp")
+    assert progress_archive.remove_orphans() == 0
+    assert snapshot("alice") == before
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from backend import database
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "fitness.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "_pool", None)
+    return path
+
+
+def row(user_id, weight, day="2026-10-01"):
+    return (user_id, 30, "Male", 175, weight, "Stay Fit", 2500, day)
+
+
+def count_rows(path, table="progress"):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def wait_for_rows(path, expected, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if count_rows(path) >= expected:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_flush_on_batch_size(db_path):
+    database.create_table()
+    writer = database.ProgressWriter(batch_size=3, flush_seconds=60)
+
+    writer.put(row("a", 70))
+    writer.put(row("a", 71))
+    time.sleep(0.1)
+    assert count_rows(db_path) == 0
+    assert writer.has_pending("a") and not writer.has_pending("b")
+
+    writer.put(row("b", 80))
+    assert wait_for_rows(db_path, 3)
+    assert not writer.has_pending()
+
+
+def test_flush_on_interval(db_path):
+    database.create_table()
+    writer = database.ProgressWriter(batch_size=100, flush_seconds=0.3)
+
+    writer.put(row("a", 70))
+    assert count_rows(db_path) == 0
+    assert wait_for_rows(db_path, 1)
+
+
+def test_explicit_flush_updates_daily_rollup(db_path):
+    database.create_table()
+    writer = database.ProgressWriter(batch_size=100, flush_seconds=60)
+
+    for weight in (72, 70, 71):
+        writer.put(row("a", weight))
+    writer.put(row("a", 69, day="2026-10-02"))
+
+    assert writer.flush() == 4
+    with sqlite3.connect(db_path) as conn:
+        daily = conn.execute("""
+            SELECT date, last_weight, min_weight, max_weight, entries
+            FROM progress_daily WHERE user_id = 'a' ORDER BY date
+        """).fetchall()
+    assert daily == [("2026-10-01", 71, 70, 72, 3), ("2026-10-02", 69, 69, 69, 1)]
+
+
+def test_flush_at_exit(tmp_path):
+    path = str(tmp_path / "fitness.db")
+    script = (
+        "from backend import database\n"
+        "database.create_table()\n"
+        "database.queue_progress('a', 30, 'Male', 175, 70, 'Stay Fit', 2500, '2026-10-01')\n"
+        "database.queue_progress('a', 30, 'Male', 175, 68, 'Stay Fit', 2500, '2026-10-01')\n"
+    )
+    env = dict(
+        os.environ,
+        FITNESS_DB_PATH=path,
+        FITNESS_DB_WRITE_BATCH_SIZE="100",
+        FITNESS_DB_WRITE_FLUSH_SECONDS="60",
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, env=env, check=True, timeout=60)
+
+    assert count_rows(path) == 2
+    with sqlite3.connect(path) as conn:
+        assert conn.execute(
+            "SELECT last_weight, entries FROM progress_daily WHERE user_id = 'a'"
+        ).fetchone() == (68, 2)